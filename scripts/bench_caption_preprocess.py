@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Compare caption payload size and latency with and without downscaling.
+
+Usage::
+
+    python scripts/bench_caption_preprocess.py photo1.jpg photo2.heic ...
+
+Without arguments a synthetic 12 MP photo is generated.  Each image is
+captioned twice through the configured ``CAPTION_PROVIDER``: once with
+``CAPTION_MAX_EDGE=0`` (original bytes) and once with the preprocessing stage
+enabled.  The enrichment cache is disabled so every call reaches the model.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ["ENRICH_CACHE"] = "false"
+os.environ.setdefault("PERSONA_DIR", tempfile.mkdtemp(prefix="bench-persona-"))
+
+from digital_persona import ingest  # noqa: E402
+
+
+def _synthetic_photo(folder: Path) -> Path:
+    from PIL import Image
+
+    path = folder / "synthetic-12mp.jpg"
+    Image.effect_noise((4000, 3000), 64).convert("RGB").save(path, quality=92)
+    return path
+
+
+def _run(path: Path, max_edge: str) -> tuple[int, float, str]:
+    os.environ["CAPTION_MAX_EDGE"] = max_edge
+    payload, _ = ingest._caption_image_bytes(path)
+    start = time.perf_counter()
+    caption = ingest._generate_caption(path)
+    return len(payload), time.perf_counter() - start, caption
+
+
+def main() -> None:
+    paths = [Path(p) for p in sys.argv[1:]]
+    if not paths:
+        paths = [_synthetic_photo(Path(tempfile.mkdtemp()))]
+    max_edge = os.getenv("CAPTION_MAX_EDGE", "1024")
+    print(f"{'image':30} {'stage':>6} {'bytes':>12} {'seconds':>8}  caption")
+    for path in paths:
+        for label, edge in (("off", "0"), ("on", max_edge)):
+            size, secs, caption = _run(path, edge)
+            print(f"{path.name[:30]:30} {label:>6} {size:>12,} {secs:>8.2f}  {caption[:40]}")
+
+
+if __name__ == "__main__":
+    main()
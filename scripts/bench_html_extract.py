@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Compare HTML text extraction throughput: old tag regex vs streaming parser.
+
+Usage::
+
+    python scripts/bench_html_extract.py [page.html] [--mb 20]
+
+The page (``data/sample_page.html`` by default) is repeated, with an inline
+script and stylesheet between copies, until the file reaches ``--mb``
+megabytes.  Three extractors are timed on it:
+
+* ``regex``: the previous ``re.sub(r"<[^>]+>", "", text)`` on the whole page,
+* ``parser``: :func:`digital_persona.html_text.html_to_text` on the whole page,
+* ``stream``: :func:`digital_persona.html_text.iter_html_text` reading the
+  file in 64 KiB pieces.
+
+Throughput and peak Python memory (``tracemalloc``, measured in a second
+run) are printed for each.
+"""
+
+import argparse
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from digital_persona.html_text import html_to_text, iter_html_text
+
+ROOT = Path(__file__).resolve().parents[1]
+FILLER = (
+    "<script>window.analytics = {id: 'UA-0000', events: []};</script>\n"
+    "<style>.post { margin: 0 auto; font-family: serif; }</style>\n"
+    "<div class=\"post\"><p>Filler paragraph with &amp; entities &mdash; and "
+    "<a href=\"#\">links</a>.</p></div>\n"
+)
+
+
+def _build_page(template: Path, megabytes: float, folder: Path) -> Path:
+    body = template.read_text(encoding="utf-8") + FILLER
+    target = int(megabytes * 1024 * 1024)
+    path = folder / f"{template.stem}-{megabytes:g}mb.html"
+    written = 0
+    with open(path, "w", encoding="utf-8") as fh:
+        while written < target:
+            fh.write(body)
+            written += len(body)
+    return path
+
+
+def _regex(path: Path) -> int:
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    return len(re.sub(r"<[^>]+>", "", text))
+
+
+def _parser(path: Path) -> int:
+    return len(html_to_text(path.read_text(encoding="utf-8", errors="ignore")))
+
+
+def _stream(path: Path) -> int:
+    with open(path, encoding="utf-8", errors="ignore") as fh:
+        return sum(len(line) for line in iter_html_text(fh))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("page", nargs="?", default=ROOT / "data" / "sample_page.html", type=Path)
+    parser.add_argument("--mb", type=float, default=20.0, help="size of the scaled page")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-html-") as folder:
+        page = _build_page(args.page, args.mb, Path(folder))
+        size = page.stat().st_size
+        print(f"{page.name}: {size / 1e6:.1f} MB")
+        print(f"{'extractor':10} {'seconds':>8} {'MB/s':>8} {'peak MB':>8} {'chars out':>12}")
+        for name, fn in (("regex", _regex), ("parser", _parser), ("stream", _stream)):
+            start = time.perf_counter()
+            chars = fn(page)
+            elapsed = time.perf_counter() - start
+            # tracing slows allocation-heavy code, so measure memory separately
+            tracemalloc.start()
+            fn(page)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{name:10} {elapsed:>8.2f} {size / 1e6 / elapsed:>8.1f} "
+                f"{peak / 1e6:>8.1f} {chars:>12,}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,14 @@ from .secure_storage import (
     save_json_encrypted,
     load_json_encrypted,
 )
+from .memory_store import (
+    bounds,
+    in_range,
+    iter_memories,
+    memory_path,
+    relative_name,
+    resolve_memory,
+)
 
 
 def _valid_openai_key() -> bool:
@@ -49,7 +57,7 @@ def _persona_dir() -> Path:
 
 PERSONA_DIR = _persona_dir()
 
-# where memory JSON files await the interview step
+# where memory JSON files await the interview step, in YYYY/MM/DD shards
 MEMORY_DIR = PERSONA_DIR / "memory"
 INPUT_DIR = PERSONA_DIR / "input"
 PROCESSED_DIR = PERSONA_DIR / "processed"
@@ -129,17 +137,27 @@ def create_app(interviewer: PersonalityInterviewer | None = None) -> FastAPI:
     def memory_save(item: MemoryItem) -> dict:
         ts = item.timestamp or datetime.now(timezone.utc).isoformat()
         safe_ts = secure_filename(ts.replace(":", "-"))
-        path = (MEMORY_DIR / f"{safe_ts}.json").resolve()
+        path = memory_path(MEMORY_DIR, f"{safe_ts}.json", ts).resolve()
         if not str(path).startswith(str(MEMORY_DIR)):
             raise HTTPException(status_code=400, detail="Invalid file path")
         save_json_encrypted({"text": item.text, "timestamp": ts}, path, FERNET)
         return {"status": "saved", "timestamp": ts}
 
     @app.get("/memory/timeline")
-    def memory_timeline() -> List[dict]:
+    def memory_timeline(start: Optional[str] = None, end: Optional[str] = None) -> List[dict]:
+        """Return memories in time order, optionally limited to ``start``..``end``.
+
+        Bounds are ISO dates or datetimes (inclusive; a bare ``end`` date
+        covers that whole day).  Only the date shards in range are read.
+        """
+        lo, hi = bounds(start, end)
+        if (start and lo is None) or (end and hi is None):
+            raise HTTPException(status_code=400, detail="Invalid start or end timestamp")
         memories = []
-        for p in sorted(MEMORY_DIR.glob("*.json")):
-            memories.append(load_json_encrypted(p, FERNET))
+        for p in iter_memories(MEMORY_DIR, lo, hi):
+            mem = load_json_encrypted(p, FERNET)
+            if in_range(mem.get("timestamp"), lo, hi):
+                memories.append(mem)
         memories.sort(key=lambda m: m.get("timestamp", ""))
         return memories
 
@@ -153,19 +171,25 @@ def create_app(interviewer: PersonalityInterviewer | None = None) -> FastAPI:
 
     @app.get("/pending")
     def pending() -> dict:
-        """Return a list of memory JSON files awaiting interview."""
-        files = [p.name for p in MEMORY_DIR.glob("*.json") if p.is_file()]
-        return {"files": sorted(files)}
+        """Return memory files awaiting interview as paths relative to ``memory``."""
+        files = [relative_name(MEMORY_DIR, p) for p in iter_memories(MEMORY_DIR)]
+        return {"files": files}
+
+    def _memory_file(file: str) -> Path:
+        try:
+            path = resolve_memory(MEMORY_DIR, file)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid file path")
+        if path is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        if not str(path.resolve()).startswith(str(MEMORY_DIR.resolve())):
+            raise HTTPException(status_code=400, detail="Invalid file path")
+        return path
 
     @app.get("/start_interview")
     def start_interview(file: str) -> dict:
         """Load a memory JSON file and return its ``content`` field."""
-        sanitized_file = secure_filename(file)
-        path = (MEMORY_DIR / sanitized_file).resolve()
-        if not str(path).startswith(str(MEMORY_DIR)):
-            raise HTTPException(status_code=400, detail="Invalid file path")
-        if not path.exists():
-            raise HTTPException(status_code=404, detail="File not found")
+        path = _memory_file(file)
         try:
             data = load_json_encrypted(path, FERNET)
         except json.JSONDecodeError:
@@ -179,12 +203,8 @@ def create_app(interviewer: PersonalityInterviewer | None = None) -> FastAPI:
     @app.post("/complete_interview")
     def complete_interview(req: CompleteRequest) -> dict:
         """Save interview results and archive the memory file."""
-        sanitized_file = secure_filename(req.file)
-        mem_path = (MEMORY_DIR / sanitized_file).resolve()
-        if not str(mem_path).startswith(str(MEMORY_DIR)):
-            raise HTTPException(status_code=400, detail="Invalid file path")
-        if not mem_path.exists():
-            raise HTTPException(status_code=404, detail="File not found")
+        mem_path = _memory_file(req.file)
+        sanitized_file = mem_path.name
         out_path = (OUTPUT_DIR / (Path(sanitized_file).stem + ".json")).resolve()
         if not str(out_path).startswith(str(OUTPUT_DIR)):
             raise HTTPException(status_code=400, detail="Invalid file path")
@@ -0,0 +1,219 @@
+"""Stream items out of bulk archives without extracting them.
+
+Supported containers are zip files (including Google Takeout exports), tar
+files (optionally gzip/bzip2/xz compressed, read in streaming mode) and mbox
+mailboxes, including mbox files nested inside a zip or tar.
+:func:`iter_archive` yields ``(name, stream)`` pairs one at a time.  Each pair
+is either an archive member to be ingested as-is, or a generated JSON note
+(for example one per email or Keep note).  The caller must consume each
+stream before asking for the next item.  Only the current member or message
+is ever held, so memory use does not grow with the size of the archive.
+"""
+
+from __future__ import annotations
+
+import email
+import email.policy
+import io
+import json
+import logging
+import tarfile
+import zipfile
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import PurePosixPath
+from typing import IO, Any, Dict, Iterator, Optional, Tuple
+
+from .html_text import html_to_text
+
+logger = logging.getLogger(__name__)
+
+TAR_SUFFIXES = (".tar", ".tgz", ".tar.gz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+ARCHIVE_SUFFIXES = (".zip", ".mbox") + TAR_SUFFIXES
+
+# member names that never hold user content
+_SKIP_NAMES = {".ds_store", "thumbs.db", "archive_browser.html"}
+
+ArchiveItem = Tuple[str, IO[bytes]]
+
+
+def is_archive(path: Any) -> bool:
+    """Return ``True`` if ``path`` has a supported archive suffix."""
+    name = str(path).lower()
+    return name.endswith(ARCHIVE_SUFFIXES)
+
+
+def _note(name: str, obj: Dict[str, Any]) -> ArchiveItem:
+    return name, io.BytesIO(json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+
+def message_to_note(raw: bytes) -> Optional[Dict[str, Any]]:
+    """Return a memory-ready note for one RFC 822 message, or ``None`` if empty."""
+    msg = email.message_from_bytes(raw, policy=email.policy.default)
+    body = ""
+    part = msg.get_body(preferencelist=("plain", "html"))
+    if part is not None:
+        try:
+            body = part.get_content()
+        except (LookupError, UnicodeDecodeError):
+            body = part.get_payload(decode=True).decode("utf-8", errors="replace")
+        if part.get_content_subtype() == "html":
+            body = html_to_text(body)
+    subject = str(msg.get("Subject", "") or "").strip()
+    if not body.strip() and not subject:
+        return None
+    note: Dict[str, Any] = {
+        "content": f"Subject: {subject}\n\n{body.strip()}" if subject else body.strip(),
+        "type": "email",
+        "subject": subject,
+        "from": str(msg.get("From", "") or ""),
+        "to": str(msg.get("To", "") or ""),
+    }
+    if msg.get("Message-ID"):
+        note["message_id"] = str(msg["Message-ID"]).strip()
+    try:
+        note["timestamp"] = parsedate_to_datetime(str(msg["Date"])).isoformat()
+    except (TypeError, ValueError):
+        pass
+    return note
+
+
+def iter_mbox_messages(stream: IO[bytes]) -> Iterator[bytes]:
+    """Yield raw messages from an mbox ``stream`` one at a time.
+
+    Messages are separated by ``From `` lines that follow a blank line (or
+    start the file); ``>From `` quoting (mboxrd) is undone.
+    """
+    lines: list[bytes] = []
+    previous_blank = True
+    for line in stream:
+        if line.startswith(b"From ") and previous_blank:
+            if lines:
+                yield b"".join(lines)
+            lines = []
+            previous_blank = False
+            continue
+        if line.startswith(b">") and line.lstrip(b">").startswith(b"From "):
+            line = line[1:]
+        lines.append(line)
+        previous_blank = line in (b"\n", b"\r\n")
+    if lines:
+        yield b"".join(lines)
+
+
+def _iter_mbox(name: str, stream: IO[bytes]) -> Iterator[ArchiveItem]:
+    stem = PurePosixPath(name).stem or "mbox"
+    for index, raw in enumerate(iter_mbox_messages(stream), start=1):
+        try:
+            note = message_to_note(raw)
+        except Exception:
+            logger.warning("Skipping unreadable message %d in %s", index, name)
+            continue
+        if note:
+            yield _note(f"{stem}-{index:06d}.json", note)
+
+
+def _keep_note(name: str, stream: IO[bytes]) -> Optional[ArchiveItem]:
+    """Convert a Google Keep JSON export into a note."""
+    try:
+        obj = json.load(stream)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(obj, dict) or obj.get("isTrashed"):
+        return None
+    parts = [obj.get("title") or "", obj.get("textContent") or ""]
+    for item in obj.get("listContent") or []:
+        if isinstance(item, dict) and item.get("text"):
+            parts.append(("[x] " if item.get("isChecked") else "[ ] ") + item["text"])
+    content = "\n".join(p for p in parts if p).strip()
+    if not content:
+        return None
+    note: Dict[str, Any] = {"content": content, "type": "keep", "title": obj.get("title") or ""}
+    usec = obj.get("userEditedTimestampUsec") or obj.get("createdTimestampUsec")
+    if usec:
+        note["timestamp"] = datetime.fromtimestamp(int(usec) / 1e6, timezone.utc).isoformat()
+    labels = [lbl.get("name") for lbl in obj.get("labels") or [] if isinstance(lbl, dict)]
+    if labels:
+        note["labels"] = labels
+    return _note(PurePosixPath(name).name, note)
+
+
+def _is_photos_sidecar(parts: Tuple[str, ...]) -> bool:
+    # Google Photos writes "<image>.jpg.json" / "metadata.json" next to media
+    name = parts[-1].lower()
+    return name.endswith(".json") and (
+        name.count(".") >= 2 or name.startswith("metadata") or "google photos" in (p.lower() for p in parts)
+    )
+
+
+def _member_items(name: str, opener) -> Iterator[ArchiveItem]:
+    """Yield the items for one archive member; ``opener()`` returns its stream."""
+    path = PurePosixPath(name)
+    parts = path.parts
+    lower = path.name.lower()
+    if not lower or lower.startswith("._") or lower in _SKIP_NAMES or "__MACOSX" in parts:
+        return
+    if lower.endswith(".mbox"):
+        with opener() as stream:
+            yield from _iter_mbox(name, stream)
+        return
+    if lower.endswith((".zip",) + TAR_SUFFIXES):
+        logger.warning("Skipping nested archive %s; import it separately", name)
+        return
+    if "Keep" in parts and lower.endswith(".json"):
+        with opener() as stream:
+            item = _keep_note(name, stream)
+        if item:
+            yield item
+        return
+    if "Takeout" in parts and _is_photos_sidecar(parts):
+        return
+    with opener() as stream:
+        yield path.name, stream
+
+
+def _iter_zip(path: Any) -> Iterator[ArchiveItem]:
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            try:
+                yield from _member_items(info.filename, lambda info=info: zf.open(info))
+            except (zipfile.BadZipFile, NotImplementedError, RuntimeError) as exc:
+                # zip members are indexed, so a bad one does not stop the rest
+                logger.warning("Skipping unreadable member %s: %s", info.filename, exc)
+
+
+def _iter_tar(path: Any) -> Iterator[ArchiveItem]:
+    # "r|*" reads sequentially, so compressed tars are never seeked or buffered
+    with tarfile.open(path, "r|*") as tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            stream = tf.extractfile(member)
+            if stream is None:
+                continue
+            yield from _member_items(member.name, lambda stream=stream: stream)
+
+
+def iter_archive(path: Any) -> Iterator[ArchiveItem]:
+    """Yield ``(name, stream)`` for every ingestible item in the archive at ``path``."""
+    name = str(path).lower()
+    if name.endswith(".zip"):
+        yield from _iter_zip(path)
+    elif name.endswith(TAR_SUFFIXES):
+        yield from _iter_tar(path)
+    elif name.endswith(".mbox"):
+        with open(path, "rb") as stream:
+            yield from _iter_mbox(PurePosixPath(str(path)).name, stream)
+    else:
+        raise ValueError(f"Unsupported archive: {path}")
+
+
+__all__ = [
+    "ARCHIVE_SUFFIXES",
+    "is_archive",
+    "iter_archive",
+    "iter_mbox_messages",
+    "message_to_note",
+]
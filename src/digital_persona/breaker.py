@@ -0,0 +1,118 @@
+"""Circuit breaker used to skip an unhealthy LLM provider.
+
+When Ollama is down every ingest helper used to wait for a connection error
+or timeout before falling back to OpenAI, once per call.  A
+:class:`CircuitBreaker` counts consecutive outage-type failures; after
+``threshold`` of them it opens and :meth:`~CircuitBreaker.allow` returns
+``False`` so callers go straight to their fallback.  While open, a daemon
+thread runs ``probe`` every ``probe_interval`` seconds and closes the breaker
+as soon as the provider answers again.  Without a probe, a single trial call
+is let through after each interval instead.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Track the health of one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = 3,
+        probe: Optional[Callable[[], object]] = None,
+        probe_interval: float = 30.0,
+        should_count: Optional[Callable[[BaseException], bool]] = None,
+    ) -> None:
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.probe = probe
+        self.probe_interval = probe_interval
+        self.should_count = should_count
+        self.failures = 0
+        self.opened = 0
+        self._open = False
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return "open" if self._open else "closed"
+
+    def allow(self) -> bool:
+        """Return ``True`` if a call to the provider should be attempted."""
+        with self._lock:
+            if not self._open:
+                return True
+            if (
+                self.probe is None
+                and not self._trial
+                and time.monotonic() >= self._opened_at + self.probe_interval
+            ):
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            was_open = self._open
+            self.failures = 0
+            self._open = False
+            self._trial = False
+        if was_open:
+            logger.info("%s is reachable again; closing circuit", self.name)
+
+    def record_failure(self, exc: Optional[BaseException] = None) -> None:
+        if exc is not None and self.should_count and not self.should_count(exc):
+            return
+        with self._lock:
+            self.failures += 1
+            if self._open:
+                # failed trial call: wait another interval
+                self._opened_at = time.monotonic()
+                self._trial = False
+                return
+            if self.failures < self.threshold:
+                return
+            self._open = True
+            self._opened_at = time.monotonic()
+            self.opened += 1
+            start_probe = self.probe is not None and not (self._thread and self._thread.is_alive())
+        logger.warning(
+            "%s failed %d times in a row; skipping it for now", self.name, self.failures
+        )
+        if start_probe:
+            self._thread = threading.Thread(
+                target=self._probe_loop, name=f"probe-{self.name}", daemon=True
+            )
+            self._thread.start()
+
+    def _probe_loop(self) -> None:
+        while not self._stop.wait(self.probe_interval):
+            if self.state == "closed":
+                return
+            try:
+                self.probe()
+            except Exception:
+                logger.debug("%s probe failed", self.name)
+                continue
+            self.record_success()
+            return
+
+    def close(self) -> None:
+        """Stop the background probe."""
+        self._stop.set()
+
+
+__all__ = ["CircuitBreaker"]
@@ -0,0 +1,151 @@
+"""Encrypted on-disk cache for LLM enrichment results.
+
+Captions, summaries and sentiment labels are stored under a key derived from
+the input's content hash, the provider, the model and the prompt.  Each value
+is encrypted with :func:`encrypt_bytes` and the cache is bounded by a total
+byte size, evicting the least recently used entries first.
+
+Recency is tracked in memory.  The encrypted index that remembers it across
+runs is written at most every ``flush_interval`` seconds and on
+:meth:`EnrichmentCache.flush`, not on every hit.  Entries written after the
+last flush are picked up from the directory when the cache is reopened.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict
+
+from cryptography.fernet import Fernet
+
+from .secure_storage import (
+    decrypt_bytes,
+    encrypt_bytes,
+    load_json_encrypted,
+    save_json_encrypted,
+)
+
+
+class EnrichmentCache:
+    """Size-bounded LRU cache of enrichment strings stored in ``directory``."""
+
+    def __init__(
+        self, directory: Path, fernet: Fernet, max_bytes: int, flush_interval: float = 30.0
+    ) -> None:
+        self.directory = directory
+        self.fernet = fernet
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index_path = directory / "index.json"
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+        directory.mkdir(exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries: "OrderedDict[str, int]" = OrderedDict()
+        if self._index_path.exists():
+            try:
+                data = load_json_encrypted(self._index_path, self.fernet)
+                entries = OrderedDict(data.get("entries", []))
+            except Exception:
+                entries = OrderedDict()
+        on_disk = {p.stem: p for p in self.directory.glob("*.bin")}
+        # drop entries whose file is gone, then add files written after the
+        # last flush as the most recently used
+        self._entries = OrderedDict((k, n) for k, n in entries.items() if k in on_disk)
+        unindexed = [p for k, p in on_disk.items() if k not in self._entries]
+        for path in sorted(unindexed, key=lambda p: p.stat().st_mtime):
+            self._entries[path.stem] = path.stat().st_size
+        self._total_bytes = sum(self._entries.values())
+        self._dirty = len(self._entries) != len(entries) or bool(unindexed)
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Return a stable key for ``parts``.
+
+        Callers pass the content hash, provider, model and prompt, plus any
+        preprocessing settings that change the model's input.
+        """
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._total_bytes
+
+    def get(self, key: str) -> str | None:
+        """Return the cached value for ``key`` or ``None`` on a miss."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                raw = (self.directory / f"{key}.bin").read_bytes()
+            except OSError:
+                self._total_bytes -= self._entries.pop(key, 0)
+                self._touch()
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._touch()
+        return decrypt_bytes(raw, self.fernet).decode("utf-8")
+
+    def put(self, key: str, value: str) -> None:
+        """Store ``value`` under ``key`` and evict old entries beyond ``max_bytes``."""
+        data = encrypt_bytes(value.encode("utf-8"), self.fernet)
+        with self._lock:
+            (self.directory / f"{key}.bin").write_bytes(data)
+            self._total_bytes += len(data) - self._entries.get(key, 0)
+            self._entries[key] = len(data)
+            self._entries.move_to_end(key)
+            while self._entries and self._total_bytes > self.max_bytes:
+                old, old_size = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                (self.directory / f"{old}.bin").unlink(missing_ok=True)
+            self._touch()
+
+    def flush(self) -> None:
+        """Write the index now if it changed since the last write."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and current occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.size,
+            }
+
+    def _touch(self) -> None:
+        self._dirty = True
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._save_index()
+
+    def _save_index(self) -> None:
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+        tmp = self._index_path.with_name(self._index_path.name + ".tmp")
+        save_json_encrypted({"entries": list(self._entries.items())}, tmp, self.fernet)
+        os.replace(tmp, self._index_path)
+
+
+__all__ = ["EnrichmentCache"]
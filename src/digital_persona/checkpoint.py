@@ -0,0 +1,121 @@
+"""Per-file stage checkpoints for resumable ingest.
+
+``process_file`` runs a file through explicit stages (``extract``,
+``transcribe``, ``caption``, ``summarize``, ``classify``, ``keywords``,
+``chunk`` and ``persist``).  ``keywords`` is only saved when combined
+enrichment asks for them.  Each completed stage's output is saved in an encrypted JSON
+document under the work directory, keyed by the SHA-256 of the original
+bytes (and the file name when deduplication is off).  If a later stage fails, or the process is restarted, the next attempt
+on the same bytes picks up at the first stage that has no saved output.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from cryptography.fernet import Fernet
+
+from .secure_storage import load_json_encrypted, save_json_encrypted
+
+logger = logging.getLogger(__name__)
+
+STAGES = (
+    "extract",
+    "transcribe",
+    "caption",
+    "summarize",
+    "classify",
+    "keywords",
+    "chunk",
+    "persist",
+)
+
+_MISSING = object()
+
+
+class Checkpoint:
+    """Saved stage outputs for one original file."""
+
+    def __init__(self, work_dir: Path, key: str, fernet: Fernet) -> None:
+        self.path = work_dir / f"{key}.json"
+        self.fernet = fernet
+        self._stages: Dict[str, Any] = {}
+        if self.path.exists():
+            try:
+                self._stages = load_json_encrypted(self.path, fernet).get("stages", {})
+            except Exception:
+                logger.warning("Ignoring unreadable checkpoint %s", self.path.name)
+        if self._stages:
+            logger.info("Resuming after stages: %s", ", ".join(self._stages))
+
+    def __contains__(self, stage: str) -> bool:
+        return stage in self._stages
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        return self._stages.get(stage, default)
+
+    def save(self, stage: str, value: Any) -> None:
+        """Record ``value`` as the output of ``stage``."""
+        self._stages[stage] = value
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        save_json_encrypted({"stages": self._stages, "updated": time.time()}, tmp, self.fernet)
+        os.replace(tmp, self.path)
+
+    def run(
+        self,
+        stage: str,
+        compute: Callable[[], Any],
+        done: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """Return the saved output of ``stage`` or compute and save it.
+
+        Results for which ``done`` is false (for example an empty transcript)
+        are returned but not saved, so the stage runs again next time.
+        """
+        value = self._stages.get(stage, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        if done(value):
+            self.save(stage, value)
+        return value
+
+    def discard(self) -> None:
+        """Remove the checkpoint once the file has been fully ingested."""
+        self.path.unlink(missing_ok=True)
+
+
+class NullCheckpoint(Checkpoint):
+    """Checkpoint that never stores anything (checkpointing disabled)."""
+
+    def __init__(self) -> None:
+        self._stages = {}
+
+    def save(self, stage: str, value: Any) -> None:
+        pass
+
+    def discard(self) -> None:
+        pass
+
+
+def prune_checkpoints(work_dir: Path, max_age: float) -> int:
+    """Delete checkpoints not updated for ``max_age`` seconds; return the count."""
+    if max_age <= 0 or not work_dir.exists():
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in work_dir.glob("*.json"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+__all__ = ["Checkpoint", "NullCheckpoint", "STAGES", "prune_checkpoints"]
@@ -0,0 +1,187 @@
+"""Split long documents into boundary-aligned chunks while streaming.
+
+:func:`iter_chunks` reads a document line by line and yields chunks of at
+most ``max_chars`` characters.  It prefers to cut at the strongest nearby
+boundary:
+
+* a dated journal entry (``2024-01-31``, ``Date: Jan 31, 2024``,
+  ``Monday, 31 January 2024`` …) or a Markdown heading always starts a new
+  chunk once the current one holds ``min_chars``;
+* otherwise chunks grow paragraph by paragraph (blank-line separated) until
+  the next paragraph would overflow;
+* a single paragraph longer than ``max_chars`` is cut at sentence ends, then
+  at whitespace.
+
+Each chunk records ``start``/``end`` character offsets into the source text
+plus the heading or entry date it falls under.  Only the current chunk is
+held in memory.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+_MONTH = (
+    r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+)
+_WEEKDAY = r"(?:(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)[a-z]*\.?,?\s+)?"
+_DATE_LINE = re.compile(
+    r"^\s*(?:date:\s*)?(?:"
+    r"\d{4}-\d{1,2}-\d{1,2}"
+    r"|\d{1,2}/\d{1,2}/\d{2,4}"
+    rf"|{_WEEKDAY}{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}"
+    rf"|{_WEEKDAY}\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH},?\s+\d{{4}}"
+    r")\b",
+    re.IGNORECASE,
+)
+_HEADING = re.compile(r"^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+
+# longest line still treated as an entry date rather than prose
+_MAX_DATE_LINE = 80
+
+Chunk = Dict[str, Any]
+
+
+def boundary(line: str) -> Optional[str]:
+    """Return ``"entry"``, ``"heading"`` or ``None`` for a single line."""
+    if _HEADING.match(line):
+        return "heading"
+    if len(line) <= _MAX_DATE_LINE and _DATE_LINE.match(line):
+        return "entry"
+    return None
+
+
+def _cut_point(text: str, limit: int) -> int:
+    """Return where to cut ``text`` to fit ``limit``: a sentence end, else whitespace."""
+    window = text[:limit]
+    cut = 0
+    for match in _SENTENCE_END.finditer(window):
+        cut = match.end()
+    if cut < limit // 2:
+        space = window.rfind(" ", limit // 2)
+        cut = space + 1 if space > 0 else limit
+    return cut
+
+
+class _Builder:
+    """Accumulate paragraphs into chunks and emit them as they fill."""
+
+    def __init__(self, max_chars: int, min_chars: int) -> None:
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.parts: List[str] = []
+        self.size = 0
+        self.start = 0
+        self.end = 0
+        # section in effect now, and the one the current chunk started under
+        self.heading: Optional[str] = None
+        self.date: Optional[str] = None
+        self.chunk_heading: Optional[str] = None
+        self.chunk_date: Optional[str] = None
+        self.next_index = 0
+
+    def flush(self) -> Optional[Chunk]:
+        text = "\n\n".join(self.parts).strip()
+        self.parts = []
+        self.size = 0
+        if not text:
+            return None
+        chunk: Chunk = {
+            "index": self.next_index,
+            "text": text,
+            "start": self.start,
+            "end": self.end,
+        }
+        if self.chunk_heading:
+            chunk["heading"] = self.chunk_heading
+        if self.chunk_date:
+            chunk["date"] = self.chunk_date
+        self.next_index += 1
+        return chunk
+
+    def _append(self, text: str, start: int, end: int) -> None:
+        if not self.parts:
+            self.start = start
+            self.chunk_heading = self.heading
+            self.chunk_date = self.date
+        self.parts.append(text)
+        self.size += len(text) + 2
+        self.end = end
+
+    def add(self, paragraph: str, start: int, end: int) -> Iterator[Chunk]:
+        while len(paragraph) > self.max_chars - self.size:
+            if self.parts and (
+                len(paragraph) <= self.max_chars or self.size >= self.min_chars
+            ):
+                chunk = self.flush()
+                if chunk:
+                    yield chunk
+                continue
+            # oversized paragraph: fill the current chunk with a slice of it
+            cut = _cut_point(paragraph, self.max_chars - self.size)
+            self._append(paragraph[:cut].strip(), start, start + cut)
+            chunk = self.flush()
+            if chunk:
+                yield chunk
+            start += cut
+            paragraph = paragraph[cut:].lstrip()
+        if paragraph:
+            self._append(paragraph, start, end)
+
+    def boundary(self, kind: str, line: str) -> Iterator[Chunk]:
+        if self.size >= self.min_chars:
+            chunk = self.flush()
+            if chunk:
+                yield chunk
+        title = line.strip()
+        if kind == "heading":
+            match = _HEADING.match(line)
+            self.heading = match.group(1) if match else title
+            self.date = None
+        else:
+            self.date = title
+
+
+def iter_chunks(
+    lines: Iterable[str], max_chars: int = 4000, min_chars: int = 500
+) -> Iterator[Chunk]:
+    """Yield ``{"index", "text", "start", "end", "heading"?, "date"?}`` chunks.
+
+    ``lines`` may be an open text file; lines are consumed lazily.
+    """
+    max_chars = max(1, max_chars)
+    builder = _Builder(max_chars, min(min_chars, max_chars))
+    paragraph: List[str] = []
+    para_start = 0
+    offset = 0
+
+    def end_paragraph(end: int) -> Iterator[Chunk]:
+        if paragraph:
+            text = "".join(paragraph).strip()
+            paragraph.clear()
+            if text:
+                yield from builder.add(text, para_start, end)
+
+    for line in lines:
+        length = len(line)
+        if not line.strip():
+            yield from end_paragraph(offset)
+        else:
+            kind = boundary(line)
+            if kind:
+                yield from end_paragraph(offset)
+                yield from builder.boundary(kind, line)
+            if not paragraph:
+                para_start = offset
+            # a heading or date line stays with the text that follows it
+            paragraph.append(line)
+        offset += length
+    yield from end_paragraph(offset)
+    chunk = builder.flush()
+    if chunk:
+        yield chunk
+
+
+__all__ = ["boundary", "iter_chunks"]
@@ -2,18 +2,29 @@ import json
 import os
 from argparse import ArgumentParser
 from pathlib import Path
+from typing import Optional
 
 from .secure_storage import (
     get_fernet,
     load_json_encrypted,
-    decrypt_bytes,
+    decrypt_file,
 )
+from .memory_store import iter_memories
 
 # Define shared constants for subdirectory names
 SUBDIRECTORIES = ("memory", "output", "archive", "processed")
 
-def decrypt_persona(base_dir: Path, out_dir: Path) -> None:
-    """Decrypt all JSON files from *base_dir* into *out_dir*."""
+def decrypt_persona(
+    base_dir: Path,
+    out_dir: Path,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> None:
+    """Decrypt all JSON files from *base_dir* into *out_dir*.
+
+    Date shards under ``memory`` keep their ``YYYY/MM/DD`` layout.  *since*
+    and *until* limit the memory folder to the shards in that date range.
+    """
     fernet = get_fernet(base_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
@@ -23,13 +34,19 @@ def decrypt_persona(base_dir: Path, out_dir: Path) -> None:
         if not src_dir.exists():
             continue
         dest_dir.mkdir(exist_ok=True)
-        for path in src_dir.iterdir():
+        if sub == "memory":
+            paths = iter_memories(src_dir, since, until)
+        else:
+            # ``.part`` files are unfinished writes, not originals
+            paths = (p for p in src_dir.rglob("*") if p.is_file() and p.suffix != ".part")
+        for path in paths:
+            dest = dest_dir / path.relative_to(src_dir)
+            dest.parent.mkdir(parents=True, exist_ok=True)
             if path.suffix == ".json":
                 data = load_json_encrypted(path, fernet)
-                (dest_dir / path.name).write_text(json.dumps(data, indent=2), encoding="utf-8")
+                dest.write_text(json.dumps(data, indent=2), encoding="utf-8")
             else:
-                out_path = dest_dir / path.name
-                out_path.write_bytes(decrypt_bytes(path.read_bytes(), fernet))
+                decrypt_file(path, dest, fernet)
 
 
 def _cli() -> None:
@@ -41,8 +58,10 @@ def _cli() -> None:
         default=_persona_dir(),
         help="Base persona directory (default: determined by _persona_dir())",
     )
+    parser.add_argument("--since", help="Only decrypt memories on or after this date")
+    parser.add_argument("--until", help="Only decrypt memories on or before this date")
     args = parser.parse_args()
-    decrypt_persona(args.persona_dir, args.out)
+    decrypt_persona(args.persona_dir, args.out, args.since, args.until)
 
 
 def _persona_dir() -> Path:
@@ -0,0 +1,149 @@
+"""Content-addressed index of ingested originals.
+
+Each original file is identified by the SHA-256 of its bytes.  The index maps
+that digest to the memory created for it so a later arrival with identical
+content can be linked to the existing memory instead of being captioned or
+transcribed again.  The index and its change journal are encrypted at rest
+like the memories they point to.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+from cryptography.fernet import Fernet
+
+from .secure_storage import (
+    decrypt_bytes,
+    encrypt_bytes,
+    load_json_encrypted,
+    save_json_encrypted,
+)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    """Return the hex SHA-256 digest of ``path`` read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DedupIndex:
+    """Persistent ``digest -> memory`` mapping shared by ingest workers.
+
+    Changes are appended to an encrypted journal next to ``path``, one token
+    per line, and folded into the snapshot at ``path`` once the journal holds
+    ``compact_after`` lines, so recording a file does not rewrite the whole
+    index.  :meth:`link` also reserves unknown digests: a second worker
+    holding identical bytes waits for the first to :meth:`record` (or
+    :meth:`release`) it instead of enriching the same content in parallel.
+    """
+
+    def __init__(self, path: Path, fernet: Fernet, compact_after: int = 1000) -> None:
+        self.path = path
+        self.fernet = fernet
+        self.compact_after = compact_after
+        self.journal_path = path.with_name(path.name + ".log")
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._pending: set[str] = set()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._journal_lines = 0
+        if path.exists():
+            data = load_json_encrypted(path, fernet)
+            self._entries = data.get("entries", {})
+        self._replay()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, digest: str) -> Dict[str, Any] | None:
+        """Return the entry recorded for ``digest`` if any."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            return dict(entry) if entry else None
+
+    def record(self, digest: str, memory: str, source: str, name: str, timestamp: str) -> None:
+        """Remember that ``digest`` produced ``memory`` from ``source``."""
+        entry = {
+            "memory": memory,
+            "source": source,
+            "name": name,
+            "timestamp": timestamp,
+            "aliases": [],
+        }
+        with self._lock:
+            self._append({"record": digest, "entry": entry})
+            self._entries[digest] = entry
+            self._pending.discard(digest)
+            self._released.notify_all()
+
+    def link(self, digest: str, name: str, timestamp: str) -> Dict[str, Any] | None:
+        """Attach a duplicate arrival to the entry for ``digest``.
+
+        Returns the updated entry, or ``None`` if the digest is unknown.  In
+        that case the digest is reserved for the caller, who must call
+        :meth:`record` or :meth:`release`; other callers linking the same
+        digest wait until then.
+        """
+        with self._lock:
+            while digest in self._pending:
+                self._released.wait()
+            entry = self._entries.get(digest)
+            if entry is None:
+                self._pending.add(digest)
+                return None
+            alias = {"name": name, "timestamp": timestamp}
+            self._append({"link": digest, "alias": alias})
+            entry.setdefault("aliases", []).append(alias)
+            return dict(entry)
+
+    def release(self, digest: str) -> None:
+        """Drop the reservation on ``digest`` without recording it."""
+        with self._lock:
+            if digest in self._pending:
+                self._pending.discard(digest)
+                self._released.notify_all()
+
+    def _replay(self) -> None:
+        if not self.journal_path.exists():
+            return
+        for line in self.journal_path.read_bytes().splitlines():
+            try:
+                change = json.loads(decrypt_bytes(line, self.fernet))
+            except Exception:
+                continue  # a line torn by a crash mid-write
+            if "record" in change:
+                self._entries[change["record"]] = change["entry"]
+            elif change.get("link") in self._entries:
+                self._entries[change["link"]].setdefault("aliases", []).append(change["alias"])
+            self._journal_lines += 1
+
+    def _append(self, change: Dict[str, Any]) -> None:
+        # called before ``change`` is applied, so a compaction here
+        # snapshots the entries the journal does not yet cover
+        if self._journal_lines >= self.compact_after:
+            self._compact()
+        token = encrypt_bytes(json.dumps(change).encode("utf-8"), self.fernet)
+        with open(self.journal_path, "ab") as fh:
+            fh.write(token + b"\n")
+        self._journal_lines += 1
+
+    def _compact(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        save_json_encrypted({"entries": self._entries}, tmp, self.fernet)
+        os.replace(tmp, self.path)
+        self.journal_path.unlink(missing_ok=True)
+        self._journal_lines = 0
+
+
+__all__ = ["DedupIndex", "file_sha256"]
@@ -0,0 +1,277 @@
+"""Incremental HTML-to-text extraction.
+
+:class:`HTMLTextExtractor` is fed HTML in pieces of any size and hands back
+finished lines as soon as they are complete, so a saved page never has to be
+held in memory as a whole.  Compared with stripping tags by regex it
+
+* drops the bodies of non-content elements (``script``, ``style``, ``svg`` …),
+* decodes character references (``&amp;``, ``&#8217;``, ``&nbsp;``),
+* keeps block structure: paragraphs and other blocks are separated by blank
+  lines, ``<br>`` and list items start new lines, headings are written as
+  Markdown ``#`` lines and ``<pre>`` text keeps its line breaks.
+"""
+
+from __future__ import annotations
+
+import re
+from html import unescape
+from typing import IO, Iterator, List, Optional
+
+# elements whose contents are never user-visible text
+SKIP_TAGS = frozenset(
+    {"script", "style", "noscript", "template", "svg", "math", "iframe", "object", "canvas"}
+)
+# elements whose body is raw text up to the matching end tag
+_RAW_TAGS = frozenset({"script", "style"})
+# elements that end the current line and are set off by a blank line
+_PARAGRAPH_TAGS = frozenset(
+    {
+        "p", "div", "section", "article", "main", "header", "footer", "aside", "nav",
+        "blockquote", "pre", "table", "ul", "ol", "dl", "figure", "figcaption",
+        "form", "fieldset", "address", "details", "summary", "hr", "title",
+    }
+)
+# elements that only end the current line
+_LINE_TAGS = frozenset({"br", "li", "tr", "dt", "dd", "option", "caption"})
+_HEADINGS = {f"h{n}": n for n in range(1, 7)}
+
+# text runs, then comments, doctypes/processing instructions and start/end
+# tags; quoted attribute values may contain ">"
+_TOKEN = re.compile(
+    r"([^<]+)"
+    r"|<(?:!--.*?--\s*>"
+    r"|(?!!--)[!?][^>]*>"
+    r"|(/?)([a-zA-Z][a-zA-Z0-9:-]*)([^>\"']*(?:(?:\"[^\"]*\"|'[^']*')[^>\"']*)*)>)",
+    re.DOTALL,
+)
+_TAG_START = re.compile(r"[a-zA-Z/!?]")
+_COMMENT_END = re.compile(r"--\s*>")
+# inside an oversized tag: its end, or a quoted attribute value to step over
+_TAG_END = re.compile("[>\"']")
+_QUOTE_END = {'"': re.compile('"'), "'": re.compile("'")}
+_STRUCTURAL = (
+    SKIP_TAGS | _PARAGRAPH_TAGS | _LINE_TAGS | frozenset(_HEADINGS) | {"td", "th"}
+)
+# longest unterminated tag or entity carried over to the next :meth:`feed`
+_MAX_CARRY = 64 * 1024
+_MAX_ENTITY = 32
+
+DEFAULT_READ_SIZE = 64 * 1024
+
+
+class HTMLTextExtractor:
+    """Streaming HTML tokenizer that collects readable text line by line.
+
+    Call :meth:`feed` with successive pieces of the document and
+    :meth:`take` to collect the lines finished so far; :meth:`close` flushes
+    the last line.  Text runs and tags are matched with one compiled pattern
+    and raw ``script``/``style`` bodies are skipped with a single search for
+    their end tag.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        # end of the script/style body, comment or tag being skipped
+        self._raw: Optional[re.Pattern[str]] = None
+        self._skip: List[str] = []
+        self._pre = 0
+        self._line: List[str] = []
+        self._line_pre = False
+        self._ready: List[str] = []
+        self._emitted = False
+        self._blank_pending = False
+
+    # output ---------------------------------------------------------------
+
+    def _flush_line(self) -> bool:
+        text = "".join(self._line)
+        self._line = []
+        text = text.rstrip() if self._line_pre else " ".join(text.split())
+        self._line_pre = False
+        if not text:
+            return False
+        if self._blank_pending and self._emitted:
+            self._ready.append("\n")
+        self._ready.append(text + "\n")
+        self._emitted = True
+        self._blank_pending = False
+        return True
+
+    def _break(self, blank: bool = False, hard: bool = False) -> None:
+        if not self._flush_line() and hard:
+            # a hard break on an empty line (``<br><br>``, a blank line in
+            # ``<pre>``) separates paragraphs
+            blank = self._emitted
+        if blank:
+            self._blank_pending = True
+
+    def take(self) -> str:
+        """Return and clear the text of every line completed so far."""
+        text = "".join(self._ready)
+        self._ready = []
+        return text
+
+    # tokens ---------------------------------------------------------------
+
+    def _text(self, data: str) -> None:
+        if self._skip or not data:
+            return
+        if "&" in data:
+            data = unescape(data)
+        if not self._pre:
+            self._line.append(data)
+            return
+        for i, piece in enumerate(data.split("\n")):
+            if i:
+                self._line_pre = True
+                self._break(hard=True)
+            self._line.append(piece)
+        self._line_pre = True
+
+    def _start(self, tag: str, self_closing: bool) -> None:
+        if tag in SKIP_TAGS:
+            if tag in _RAW_TAGS:
+                if not self_closing:
+                    self._raw = re.compile(rf"</{tag}\s*>", re.IGNORECASE)
+            elif not self_closing:
+                self._skip.append(tag)
+            return
+        if self._skip:
+            return
+        if tag in _HEADINGS:
+            self._break(blank=True)
+            self._line.append("#" * _HEADINGS[tag] + " ")
+        elif tag in _PARAGRAPH_TAGS:
+            self._break(blank=True)
+            if tag == "pre" and not self_closing:
+                self._pre += 1
+        elif tag in _LINE_TAGS:
+            self._break(hard=tag == "br")
+            if tag == "li":
+                self._line.append("- ")
+        elif tag in ("td", "th"):
+            self._line.append(" ")
+
+    def _end(self, tag: str) -> None:
+        if self._skip:
+            if tag == self._skip[-1]:
+                self._skip.pop()
+            return
+        if tag in _HEADINGS or tag in _PARAGRAPH_TAGS:
+            if tag == "pre" and self._pre:
+                self._pre -= 1
+            self._break(blank=True)
+        elif tag in _LINE_TAGS:
+            self._break()
+
+    def _parse(self, final: bool) -> None:
+        buf = self._buf
+        n = len(buf)
+        pos = 0
+        while pos < n:
+            if self._raw is not None:
+                match = self._raw.search(buf, pos)
+                if match is None:
+                    # keep enough of the tail to catch an end tag split in two
+                    pos = n if final else max(pos, n - 16)
+                    break
+                pos = match.end()
+                found = match.group()
+                if self._raw is _TAG_END and found != ">":
+                    self._raw = _QUOTE_END[found]
+                elif found in _QUOTE_END and self._raw is _QUOTE_END[found]:
+                    self._raw = _TAG_END
+                else:
+                    self._raw = None
+                continue
+            for match in _TOKEN.finditer(buf, pos):
+                if match.start() != pos:
+                    break  # an unmatched "<" at ``pos``
+                text, slash, name, attrs = match.groups()
+                if text is not None:
+                    end = match.end()
+                    if end == n and not final:
+                        # hold back a possibly incomplete character reference
+                        amp = buf.rfind("&", max(pos, n - _MAX_ENTITY))
+                        if amp >= 0 and ";" not in buf[amp:]:
+                            end = amp
+                    self._text(buf[pos:end])
+                    pos = end
+                    continue
+                pos = match.end()
+                if name is None:
+                    continue  # comment, doctype or processing instruction
+                tag = name.lower()
+                if tag not in _STRUCTURAL:
+                    continue
+                if slash:
+                    self._end(tag)
+                    continue
+                self_closing = attrs.rstrip().endswith("/")
+                self._start(tag, self_closing)
+                if self_closing and tag not in SKIP_TAGS:
+                    self._end(tag)
+                if self._raw is not None:
+                    break
+            else:
+                if pos >= n or buf[pos] != "<":
+                    break  # done, or holding back a partial entity
+            if self._raw is not None:
+                continue
+            if buf.startswith("<!--", pos):
+                # unterminated so far: skip the body as it arrives instead
+                # of holding it back to re-match
+                self._raw = _COMMENT_END
+                pos += 4
+                continue
+            incomplete = pos + 1 == n or _TAG_START.match(buf, pos + 1)
+            if incomplete and not final:
+                if n - pos < _MAX_CARRY:
+                    break
+                if pos + 1 < n:
+                    # an oversized tag: drop it rather than emit its markup
+                    self._raw = _TAG_END
+                    pos += 1
+                    continue
+            # a literal "<" such as "a < b"
+            self._text("<")
+            pos += 1
+        self._buf = buf[pos:]
+
+    def feed(self, data: str) -> None:
+        """Parse the next piece of the document."""
+        self._buf += data
+        self._parse(final=False)
+
+    def close(self) -> None:
+        """Parse whatever is left and finish the last line."""
+        self._parse(final=True)
+        self._flush_line()
+
+
+def iter_html_text(stream: IO[str], read_size: int = DEFAULT_READ_SIZE) -> Iterator[str]:
+    """Yield the text of an HTML ``stream`` one line at a time."""
+    parser = HTMLTextExtractor()
+    while True:
+        data = stream.read(read_size)
+        if not data:
+            break
+        parser.feed(data)
+        text = parser.take()
+        if text:
+            yield from text.splitlines(keepends=True)
+    parser.close()
+    text = parser.take()
+    if text:
+        yield from text.splitlines(keepends=True)
+
+
+def html_to_text(html: str) -> str:
+    """Return the readable text of ``html`` without a trailing newline."""
+    parser = HTMLTextExtractor()
+    parser.feed(html)
+    parser.close()
+    return parser.take().rstrip("\n")
+
+
+__all__ = ["HTMLTextExtractor", "SKIP_TAGS", "html_to_text", "iter_html_text"]
@@ -1,32 +1,46 @@
 from __future__ import annotations
 
-import base64
+import hashlib
 import json
 import os
 import re
+from collections import Counter
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterable, Dict, Any
+from typing import Any, Callable, Dict
 import io
 import subprocess
 import shutil
 import tempfile
 import logging
+import threading
+import weakref
+import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from .secure_storage import (
     get_fernet,
     save_json_encrypted,
     encrypt_bytes,
+    encrypt_file,
 )
-
-def _ollama_client():
-    """Return an Ollama client respecting OLLAMA_HOST."""
-    host = os.getenv("OLLAMA_HOST")
-    if host:
-        import ollama
-        return ollama.Client(host=host)
-    import ollama
-    return ollama
+from .watcher import create_watcher
+from .dedup import DedupIndex, file_sha256
+from .cache import EnrichmentCache
+from .model_registry import ModelRegistry
+from .llm_clients import openai_client
+from .scheduler import LaneScheduler
+from .ratelimit import AdaptiveLimiter
+from .llm_gateway import LLMGateway, default_limits
+from .metrics import MetricsRegistry, serve_metrics
+from .checkpoint import Checkpoint, NullCheckpoint, prune_checkpoints
+from .archives import is_archive, iter_archive
+from .chunking import iter_chunks
+from .html_text import html_to_text, iter_html_text
+from .memory_store import memory_path, relative_name, shard_dir
+from .sanitizer import load_rules
 
 try:
     from mutagen import File as MutagenFile
@@ -34,7 +48,7 @@ except Exception:  # pragma: no cover - optional dependency may be missing
     MutagenFile = None  # type: ignore
 
 try:
-    from PIL import Image, ExifTags
+    from PIL import Image, ExifTags, ImageOps
     try:
         from pillow_heif import register_heif_opener
         register_heif_opener()  # enables HEIC/HEIF support if available
@@ -43,6 +57,7 @@ try:
 except Exception:  # pragma: no cover - optional dependency may be missing
     Image = None  # type: ignore
     ExifTags = None  # type: ignore
+    ImageOps = None  # type: ignore
 
 
 def _persona_dir() -> Path:
@@ -57,42 +72,181 @@ INPUT_DIR = PERSONA_DIR / "input"
 PROCESSED_DIR = PERSONA_DIR / "processed"
 MEMORY_DIR = PERSONA_DIR / "memory"
 TROUBLE_DIR = PERSONA_DIR / "troubleshooting"
+# encrypted per-file stage checkpoints used to resume interrupted ingest
+WORK_DIR = PERSONA_DIR / "work"
+# members streamed out of zip/tar/mbox archives wait here for their lane
+STAGING_DIR = PERSONA_DIR / "staging"
 
-for d in (PERSONA_DIR, INPUT_DIR, PROCESSED_DIR, MEMORY_DIR, TROUBLE_DIR):
+for d in (PERSONA_DIR, INPUT_DIR, PROCESSED_DIR, MEMORY_DIR, TROUBLE_DIR, WORK_DIR, STAGING_DIR):
     d.mkdir(exist_ok=True)
 
 FERNET = get_fernet(PERSONA_DIR)
 
+CHECKPOINTS_ENABLED = os.getenv("INGEST_CHECKPOINTS", "true").lower() in {"1", "true", "yes"}
+
+# SHA-256 index of originals so repeated drops reuse the existing memory
+DEDUP_ENABLED = os.getenv("INGEST_DEDUP", "true").lower() in {"1", "true", "yes"}
+DEDUP_INDEX = DedupIndex(PERSONA_DIR / "dedup_index.json", FERNET)
+
+# encrypted LRU cache of captions, summaries and sentiment labels
+ENRICH_CACHE_ENABLED = os.getenv("ENRICH_CACHE", "true").lower() in {"1", "true", "yes"}
+ENRICH_CACHE = EnrichmentCache(
+    PERSONA_DIR / "cache",
+    FERNET,
+    int(os.getenv("ENRICH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
 
 logger = logging.getLogger(__name__)
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
 
-# Patterns that should be sanitized from user inputs
-_SANITIZE_PATTERNS: Iterable[re.Pattern[str]] = [
-    re.compile(r"ignore\s+previous\s+instructions", re.IGNORECASE),
-]
+# prompt-injection phrases removed from user inputs; SANITIZE_RULES points at
+# a rules file replacing the packaged sanitize_rules.txt
+_rules_file = os.getenv("SANITIZE_RULES")
+SANITIZER = load_rules(Path(_rules_file) if _rules_file else None)
 
 IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff", ".heic", ".heif"}
 AUDIO_SUFFIXES = {".mp3", ".wav", ".flac", ".ogg", ".m4a"}
 VIDEO_SUFFIXES = {".mp4", ".mkv", ".mov", ".avi"}
 
+# text documents longer than this many characters are split at paragraph,
+# heading and journal-entry boundaries into linked child memories; 0 disables
+TEXT_CHUNK_CHARS = int(os.getenv("TEXT_CHUNK_CHARS", "4000"))
+# smallest chunk worth ending early at a heading or dated entry
+TEXT_CHUNK_MIN_CHARS = int(os.getenv("TEXT_CHUNK_MIN_CHARS", "500"))
+
 # prompt used for LLM image captioning
 CAPTION_PROMPT = "Describe the image in one concise sentence."
 SUMMARY_PROMPT = "Summarize the audio transcript in one short paragraph."
 SENTIMENT_PROMPT = (
     "Classify the sentiment of the following text as positive, negative, or neutral."
 )
+BATCH_SENTIMENT_PROMPT = (
+    "Classify the sentiment of each numbered text below as positive, negative, or "
+    "neutral. Respond only with a JSON object of the form "
+    '{"results": [{"id": 1, "sentiment": "positive"}, ...]} with one entry per text.'
+)
+ENRICH_PROMPT = (
+    "Summarize the audio transcript below in one short paragraph and classify its "
+    "sentiment as positive, negative, or neutral. Respond only with a JSON object "
+    'of the form {"summary": "...", "sentiment": "positive|negative|neutral"}.'
+)
+ENRICH_KEYWORDS_PROMPT = (
+    ' Also include "keywords": a list of up to five short topic keywords.'
+)
 
+# number of files processed in parallel by ``process_pending_files``
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+
+# files processed at once in each media lane; lanes run side by side so quick
+# notes are not queued behind long videos
+LANE_LIMITS = {
+    "text": int(os.getenv("TEXT_LANE_WORKERS", str(max(2, INGEST_WORKERS)))),
+    "image": int(os.getenv("IMAGE_LANE_WORKERS", str(INGEST_WORKERS))),
+    "audio": int(os.getenv("AUDIO_LANE_WORKERS", str(INGEST_WORKERS))),
+    "video": int(os.getenv("VIDEO_LANE_WORKERS", str(INGEST_WORKERS))),
+    "archive": int(os.getenv("ARCHIVE_LANE_WORKERS", "1")),
+}
+
+# archive members extracted to STAGING_DIR but not yet processed, per archive;
+# bounds disk use and keeps a huge export from flooding the other lanes
+ARCHIVE_MAX_STAGED = int(os.getenv("ARCHIVE_MAX_STAGED", "8"))
+
+# maximum simultaneous requests per provider, independent of INGEST_WORKERS
+PROVIDER_LIMITS = default_limits()
+
+# provider selection, fallback, rate limits and circuit breakers for LLM calls
+GATEWAY = LLMGateway(PROVIDER_LIMITS)
+
+# live schedulers, read by the queue depth gauge
+_SCHEDULERS: "weakref.WeakSet[LaneScheduler]" = weakref.WeakSet()
+
+
+def _queue_depth() -> Dict[tuple, float]:
+    depth = {(lane,): 0.0 for lane in LANE_LIMITS}
+    for scheduler in list(_SCHEDULERS):
+        for lane, count in scheduler.pending_by_lane().items():
+            depth[(lane,)] = depth.get((lane,), 0.0) + count
+    return depth
+
+
+METRICS = MetricsRegistry()
+STAGE_SECONDS = METRICS.histogram(
+    "ingest_stage_seconds", "Time spent in each ingest stage.", ["stage"]
+)
+FILE_SECONDS = METRICS.histogram(
+    "ingest_file_seconds", "Total processing time per file.", ["media"]
+)
+FILES_TOTAL = METRICS.counter(
+    "ingest_files_total", "Files handled by media type and result.", ["media", "result"]
+)
+SANITIZE_HITS = METRICS.counter(
+    "ingest_sanitize_hits_total", "Text removed by the input sanitizer per rule.", ["rule"]
+)
+QUEUE_DEPTH = METRICS.gauge(
+    "ingest_queue_depth", "Files queued or in progress per lane.", ["lane"], _queue_depth
+)
+
+_PATH_LOCK = threading.Lock()
+_CLAIMED_PATHS: set[Path] = set()
+
+
+def _limiter(provider: str) -> AdaptiveLimiter:
+    """Return the shared rate limiter for ``provider``."""
+    return GATEWAY.limiter(provider)
+
+
+@contextmanager
+def _provider_slot(provider: str):
+    """Hold one of the concurrency slots reserved for ``provider``."""
+    with _limiter(provider).slot():
+        yield
 
-def _sanitize(text: str) -> str:
-    for pat in _SANITIZE_PATTERNS:
-        text = pat.sub("[removed]", text)
-    return text
 
+def _provider_call(provider: str, request: Callable[[], Any]) -> Any:
+    """Run a blocking ``request`` under ``provider``'s rate limit and breaker."""
+    return GATEWAY.call(provider, request)
 
-def _strip_html(text: str) -> str:
-    return re.sub(r"<[^>]+>", "", text)
+
+def provider_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the adaptive limit, latency, retry and circuit state per provider."""
+    return GATEWAY.stats()
+
+
+def _claim_path(path: Path, tag: str = "") -> Path:
+    """Return ``path`` or a suffixed variant that no worker has claimed.
+
+    Claims are released with :func:`_release_paths` once the file is written.
+    """
+    with _PATH_LOCK:
+        candidate = path
+        n = 1
+        while candidate.exists() or candidate in _CLAIMED_PATHS:
+            n += 1
+            if tag:
+                suffix = tag if n == 2 else f"{tag}-{n - 1}"
+            else:
+                suffix = str(n)
+            candidate = path.with_name(f"{path.stem}-{suffix}{path.suffix}")
+        _CLAIMED_PATHS.add(candidate)
+        return candidate
+
+
+def _release_paths(*paths: Path | None) -> None:
+    with _PATH_LOCK:
+        for p in paths:
+            _CLAIMED_PATHS.discard(p)
+
+
+def _sanitize(text: str) -> str:
+    text, hits = SANITIZER.sanitize(text)
+    if hits:
+        rules = Counter(hit.rule for hit in hits)
+        for rule, count in rules.items():
+            SANITIZE_HITS.inc(count, rule=rule)
+        logger.warning("Sanitizer removed %s", ", ".join(f"{r} x{n}" for r, n in rules.items()))
+    return text
 
 
 def _is_image(path: Path) -> bool:
@@ -107,6 +261,42 @@ def _is_video(path: Path) -> bool:
     return path.suffix.lower() in VIDEO_SUFFIXES
 
 
+def _media_lane(path: Path) -> str:
+    """Return the scheduling lane (``text``, ``image``, ``audio``, ``video`` or ``archive``)."""
+    if is_archive(path):
+        return "archive"
+    if _is_image(path):
+        return "image"
+    if _is_audio(path):
+        return "audio"
+    if _is_video(path):
+        return "video"
+    return "text"
+
+
+def _lane_scheduler(workers: int | None = None) -> LaneScheduler:
+    limits = {lane: workers or n for lane, n in LANE_LIMITS.items()}
+    scheduler = LaneScheduler(process_file, _media_lane, limits)
+    _SCHEDULERS.add(scheduler)
+    return scheduler
+
+
+def _timed(stage: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """Return ``fn(*args)``, recording its duration under ``stage``."""
+    with STAGE_SECONDS.time(stage=stage):
+        return fn(*args)
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """Return ingest metrics as JSON-friendly data."""
+    return METRICS.snapshot()
+
+
+def metrics_text() -> str:
+    """Return ingest metrics in the Prometheus text format."""
+    return METRICS.render_prometheus()
+
+
 def _extract_exif(path: Path) -> Dict[str, Any]:
     """Return basic EXIF metadata for an image file."""
     meta: Dict[str, Any] = {}
@@ -259,32 +449,268 @@ def _extract_video_audio(path: Path) -> Path | None:
         return None
 
 
-def _convert_heic_to_jpeg(path: Path) -> Path | None:
-    """Convert a HEIC/HEIF image to a temporary JPEG and return its path."""
-    temp_fd, temp_path = tempfile.mkstemp(suffix=".jpg")
-    os.close(temp_fd)
-    try:
-        if Image is not None:
+def _parse_ffmpeg_info(info: str) -> Dict[str, Any]:
+    """Return duration, resolution and frame rate from ffmpeg's stderr banner."""
+    meta: Dict[str, Any] = {}
+    m = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", info)
+    if m:
+        h, mnt, sec = m.groups()
+        meta["duration"] = int(h) * 3600 + int(mnt) * 60 + float(sec)
+    stream = re.search(r"Stream #\d+:\d+.*?: Video: (.*)", info)
+    if stream:
+        details = stream.group(1)
+        res = re.search(r"\b(\d{2,5})x(\d{2,5})\b", details)
+        if res:
+            meta["resolution"] = f"{res.group(1)}x{res.group(2)}"
+        fps = re.search(r"([\d.]+)\s*fps", details)
+        if fps:
             try:
-                with Image.open(path) as img:
-                    img.convert("RGB").save(temp_path, format="JPEG")
-                return Path(temp_path)
-            except Exception:
+                meta["frameRate"] = float(fps.group(1))
+            except ValueError:
                 pass
-        if shutil.which("ffmpeg"):
-            subprocess.run(
-                ["ffmpeg", "-y", "-i", str(path), temp_path],
+    return meta
+
+
+# upper bound on scene-change frames written when the clip's duration is unknown
+MAX_SCENE_CANDIDATES = 200
+
+
+def _pick_evenly(items: list, count: int) -> list:
+    """Return ``count`` items spread evenly across ``items`` (first and last kept)."""
+    if count <= 0 or not items:
+        return []
+    if len(items) <= count:
+        return list(items)
+    if count == 1:
+        return [items[0]]
+    idx = sorted({round(i * (len(items) - 1) / (count - 1)) for i in range(count)})
+    return [items[i] for i in idx]
+
+
+def _scene_filter(threshold: float, duration: float | None, keyframes: int) -> str:
+    """Return the ``select`` expression for scene-change keyframes.
+
+    With a known ``duration`` the clip is split into ``keyframes`` equal
+    buckets and only the first scene change in each bucket passes, so the
+    frames cover the whole clip.  Register 0 holds the next bucket still open.
+    """
+    scene = f"gt(scene,{threshold})"
+    if not duration:
+        return scene
+    bucket = f"floor(t/{duration / keyframes:.6f})"
+    return f"if({scene}*gte({bucket},ld(0)),1+0*st(0,{bucket}+1),0)"
+
+
+def _probe_video(path: Path) -> Dict[str, Any]:
+    """Return ``duration`` and the ``audio``/``video`` stream flags for ``path``.
+
+    Empty if ffprobe is unavailable or cannot read the file.
+    """
+    if not shutil.which("ffprobe"):
+        return {}
+    try:
+        out = subprocess.check_output(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration:stream=codec_type",
+                "-of",
+                "json",
+                str(path),
+            ]
+        )
+        data = json.loads(out)
+    except Exception:
+        return {}
+    kinds = {s.get("codec_type") for s in data.get("streams") or []}
+    duration = (data.get("format") or {}).get("duration")
+    try:
+        duration = float(duration) if duration else None
+    except ValueError:
+        duration = None
+    return {"duration": duration, "audio": "audio" in kinds, "video": "video" in kinds}
+
+
+def _extract_video_assets(
+    path: Path, out_dir: Path, keyframes: int = 1
+) -> Dict[str, Any] | None:
+    """Extract keyframes, 16 kHz audio and metadata in one ffmpeg run.
+
+    The container is demuxed once and every output is written to ``out_dir``.
+    With ``keyframes`` above one, frames are chosen at scene changes (score
+    above ``VIDEO_SCENE_THRESHOLD``), at most one per equal slice of the
+    clip's duration; the first frame is only used when no scene change is
+    found. Returns ``{"frames", "audio", "metadata"}`` where ``frames`` is a
+    list of ``(seconds, path)`` tuples, or ``None`` if ffmpeg is unavailable or
+    fails. Streams are probed first so a clip without audio (or video) gets
+    no output for it; ffmpeg rejects an output that maps no stream.
+    """
+    if not shutil.which("ffmpeg"):
+        return None
+    probe = _probe_video(path)
+    has_audio = probe.get("audio", True)
+    has_video = probe.get("video", True)
+    if not (has_audio or has_video):
+        return None
+    audio = out_dir / "audio.wav"
+    first = out_dir / "first.jpg"
+    if not has_video:
+        video_out = []
+    elif keyframes > 1:
+        threshold = float(os.getenv("VIDEO_SCENE_THRESHOLD", "0.3"))
+        duration = probe.get("duration") if probe else _media_duration(path)
+        video_out = [
+            "-map",
+            "0:v:0?",
+            "-vf",
+            f"select='{_scene_filter(threshold, duration, keyframes)}',showinfo",
+            "-vsync",
+            "vfr",
+            "-frames:v",
+            str(keyframes if duration else MAX_SCENE_CANDIDATES),
+            str(out_dir / "scene-%04d.jpg"),
+            # decoded once with the scenes; kept only if there are none
+            "-map",
+            "0:v:0?",
+            "-frames:v",
+            "1",
+            str(first),
+        ]
+    else:
+        video_out = ["-map", "0:v:0?", "-frames:v", "1", str(first)]
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-hide_banner",
+        "-i",
+        str(path),
+        *video_out,
+    ]
+    if has_audio:
+        cmd += ["-map", "0:a:0?", "-vn", "-acodec", "pcm_s16le", "-ar", "16000", str(audio)]
+    try:
+        proc = subprocess.run(
+            cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+    except Exception:
+        return None
+    info = (proc.stderr or b"").decode("utf-8", errors="replace")
+
+    times = [float(t) for t in re.findall(r"Parsed_showinfo.*?pts_time:\s*([\d.]+)", info)]
+    candidates = sorted(p for p in out_dir.glob("scene-*.jpg") if p.stat().st_size > 0)
+    frames = [
+        (times[i] if i < len(times) else 0.0, p) for i, p in enumerate(candidates)
+    ]
+    chosen = _pick_evenly(frames, max(1, keyframes))
+    for _, p in frames:
+        if all(p != c for _, c in chosen):
+            p.unlink(missing_ok=True)
+    if chosen:
+        first.unlink(missing_ok=True)
+    elif first.exists() and first.stat().st_size > 0:
+        chosen = [(0.0, first)]
+
+    return {
+        "frames": chosen,
+        "audio": audio if audio.exists() and audio.stat().st_size > 0 else None,
+        "metadata": _parse_ffmpeg_info(info),
+    }
+
+
+def _caption_frames(frames: list[tuple[float, Path]]) -> list[Dict[str, Any]]:
+    """Caption ``frames`` concurrently and return ``{"time", "caption"}`` entries."""
+    if not frames:
+        return []
+    with ThreadPoolExecutor(max_workers=len(frames), thread_name_prefix="caption") as pool:
+        captions = list(pool.map(lambda f: _generate_caption(f[1]), frames))
+    return [
+        {"time": round(t, 3), "caption": c}
+        for (t, _), c in zip(frames, captions)
+        if c
+    ]
+
+
+def _is_heic(path: Path) -> bool:
+    return path.suffix.lower() in {".heic", ".heif"}
+
+
+def _convert_heic_to_jpeg(path: Path) -> io.BytesIO | None:
+    """Decode a HEIC/HEIF image into an in-memory JPEG buffer.
+
+    Uses Pillow (with ``pillow-heif``) when possible, otherwise pipes the image
+    through ``ffmpeg``. Nothing is written to disk.
+    """
+    if Image is not None:
+        try:
+            buf = io.BytesIO()
+            with Image.open(path) as img:
+                img.convert("RGB").save(buf, format="JPEG")
+            return buf
+        except Exception:
+            pass
+    if shutil.which("ffmpeg"):
+        try:
+            proc = subprocess.run(
+                [
+                    "ffmpeg",
+                    "-i",
+                    str(path),
+                    "-frames:v",
+                    "1",
+                    "-f",
+                    "image2pipe",
+                    "-vcodec",
+                    "mjpeg",
+                    "-",
+                ],
                 check=True,
-                stdout=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
             )
-            return Path(temp_path)
-    except Exception:
-        pass
-    Path(temp_path).unlink(missing_ok=True)
+            if proc.stdout:
+                return io.BytesIO(proc.stdout)
+        except Exception:
+            pass
     return None
 
 
+# HEIC files decoded by ``process_file`` so captioning reuses the same buffer
+_HEIC_BUFFERS: Dict[Path, io.BytesIO] = {}
+_HEIC_LOCK = threading.Lock()
+
+
+def _heic_jpeg(path: Path) -> io.BytesIO | None:
+    """Return the JPEG buffer already decoded for ``path`` or decode it now."""
+    with _HEIC_LOCK:
+        buf = _HEIC_BUFFERS.get(path)
+    return buf if buf is not None else _convert_heic_to_jpeg(path)
+
+
+def _load_whisper_model(name: str):
+    import whisper
+
+    return whisper.load_model(name)
+
+
+# local Whisper models are loaded once per process and dropped when idle
+WHISPER_MODELS = ModelRegistry(
+    _load_whisper_model, idle_timeout=float(os.getenv("WHISPER_IDLE_TIMEOUT", "600"))
+)
+
+
+def warm_up_models() -> None:
+    """Load the configured Whisper model ahead of the first transcription."""
+    if os.getenv("TRANSCRIBE_PROVIDER", "openai").lower() != "whisper":
+        return
+    name = os.getenv("TRANSCRIBE_MODEL") or "base"
+    try:
+        WHISPER_MODELS.get(name)
+    except Exception:
+        logger.exception("Failed to preload Whisper model %s", name)
+
+
 def _transcribe_audio(path: Path) -> str:
     """Return a transcript for ``path`` using an LLM if available."""
     provider = os.getenv("TRANSCRIBE_PROVIDER", "openai").lower()
@@ -295,10 +721,13 @@ def _transcribe_audio(path: Path) -> str:
     if provider == "openai":
         model = model or "whisper-1"
         try:
-            import openai
+            client = openai_client()
+
+            def _request():
+                with open(path, "rb") as f:
+                    return client.audio.transcriptions.create(model=model, file=f)
 
-            with open(path, "rb") as f:
-                resp = openai.audio.transcriptions.create(model=model, file=f)
+            resp = _provider_call("openai", _request)
             text = resp.text if hasattr(resp, "text") else resp["text"]
             return text.strip()
         except Exception as exc:
@@ -307,10 +736,8 @@ def _transcribe_audio(path: Path) -> str:
 
     if provider == "whisper":
         try:
-            import whisper
-
-            wmodel = whisper.load_model(model or "base")
-            result = wmodel.transcribe(str(path))
+            with _provider_slot("whisper"), WHISPER_MODELS.use(model or "base") as wmodel:
+                result = wmodel.transcribe(str(path))
             return result.get("text", "").strip()
         except Exception:
             logger.exception("Whisper transcription failed for %s", path.name)
@@ -320,167 +747,424 @@ def _transcribe_audio(path: Path) -> str:
     return ""
 
 
-def _generate_caption(path: Path) -> str:
-    """Return a short caption for ``path`` using an LLM if available."""
-    provider = os.getenv("CAPTION_PROVIDER", "ollama").lower()
-    model = os.getenv("CAPTION_MODEL")
-
-    logger.debug("Captioning %s via %s", path.name, provider)
-
-    def _via_openai() -> str:
-        mdl = os.getenv("OPENAI_MODEL", "gpt-4o")
-        try:
-            import openai
-
-            img_path = path
-            if path.suffix.lower() in {".heic", ".heif"}:
-                conv = _convert_heic_to_jpeg(path)
-                if conv:
-                    img_path = conv
-            img_bytes = img_path.read_bytes()
-            if img_path != path and img_path.exists():
-                img_path.unlink(missing_ok=True)
-            b64 = base64.b64encode(img_bytes).decode()
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": CAPTION_PROMPT},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}},
-                    ],
-                }
+def _media_duration(path: Path) -> float | None:
+    """Return the duration of ``path`` in seconds if it can be determined."""
+    duration = _extract_audio_metadata(path).get("duration")
+    if duration:
+        return float(duration)
+    if not shutil.which("ffprobe"):
+        return None
+    try:
+        out = subprocess.check_output(
+            [
+                "ffprobe",
+                "-v",
+                "error",
+                "-show_entries",
+                "format=duration",
+                "-of",
+                "json",
+                str(path),
             ]
-            resp = openai.chat.completions.create(model=mdl, messages=messages)
-            return resp.choices[0].message.content.strip()
-        except Exception:
-            logger.exception("OpenAI captioning failed for %s", path.name)
-            return ""
+        )
+        value = json.loads(out).get("format", {}).get("duration")
+        return float(value) if value else None
+    except Exception:
+        return None
 
-    if provider == "openai":
-        return _via_openai()
 
-    if provider == "ollama":
-        model = model or os.getenv("OLLAMA_MODEL", "llava")
+def _split_audio(
+    path: Path, duration: float, segment: float, overlap: float, out_dir: Path
+) -> list[tuple[float, float, Path]]:
+    """Cut ``path`` into overlapping 16 kHz WAV windows inside ``out_dir``.
+
+    Returns ``(start, end, wav_path)`` tuples in order.
+    """
+    windows = []
+    start = 0.0
+    step = max(1.0, segment - overlap)
+    n = 0
+    while start < duration:
+        end = min(duration, start + segment)
+        out = out_dir / f"segment-{n:04d}.wav"
+        subprocess.run(
+            [
+                "ffmpeg",
+                "-y",
+                "-ss",
+                f"{start:.3f}",
+                "-t",
+                f"{end - start:.3f}",
+                "-i",
+                str(path),
+                "-vn",
+                "-acodec",
+                "pcm_s16le",
+                "-ar",
+                "16000",
+                "-ac",
+                "1",
+                str(out),
+            ],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        windows.append((start, end, out))
+        if end >= duration:
+            break
+        start += step
+        n += 1
+    return windows
+
+
+def _stitch_transcripts(texts: list[str], max_overlap_words: int = 40) -> str:
+    """Join segment transcripts, dropping words repeated across each overlap."""
+    words: list[str] = []
+    for text in texts:
+        new = text.split()
+        limit = min(len(words), len(new), max_overlap_words)
+        cut = 0
+        for k in range(limit, 0, -1):
+            tail = [w.lower().strip(".,!?;:") for w in words[-k:]]
+            head = [w.lower().strip(".,!?;:") for w in new[:k]]
+            if tail == head:
+                cut = k
+                break
+        words.extend(new[cut:])
+    return " ".join(words)
+
+
+def _transcribe_long(path: Path) -> tuple[str, list[Dict[str, Any]]]:
+    """Return a transcript and per-segment timestamps for ``path``.
+
+    Recordings longer than ``TRANSCRIBE_SEGMENT_SECONDS`` are cut into
+    overlapping windows with ffmpeg, transcribed concurrently and stitched back
+    together. Shorter files go through :func:`_transcribe_audio` unchanged and
+    return no segments.
+    """
+    segment = float(os.getenv("TRANSCRIBE_SEGMENT_SECONDS", "600"))
+    overlap = float(os.getenv("TRANSCRIBE_SEGMENT_OVERLAP", "5"))
+    workers = int(os.getenv("TRANSCRIBE_SEGMENT_WORKERS", "4"))
+    duration = _media_duration(path) if segment > 0 and shutil.which("ffmpeg") else None
+    if not duration or duration <= segment:
+        return _transcribe_audio(path), []
+
+    with tempfile.TemporaryDirectory(prefix="segments-") as tmp:
         try:
-            client = _ollama_client()
-
-            img_path = path
-            if path.suffix.lower() in {".heic", ".heif"}:
-                conv = _convert_heic_to_jpeg(path)
-                if conv:
-                    img_path = conv
-            img_bytes = img_path.read_bytes()
-            if img_path != path and img_path.exists():
-                img_path.unlink(missing_ok=True)
-            resp = client.generate(model=model, prompt=CAPTION_PROMPT, images=[img_bytes])
-            return (resp["response"] if isinstance(resp, dict) else resp.response).strip()
+            windows = _split_audio(path, duration, segment, overlap, Path(tmp))
         except Exception:
-            logger.exception("Ollama captioning failed for %s", path.name)
-            if os.getenv("OPENAI_API_KEY"):
-                logger.info("Falling back to OpenAI for caption")
-                return _via_openai()
-            return ""
+            logger.exception("Failed to split %s; transcribing whole file", path.name)
+            return _transcribe_audio(path), []
+        logger.info("Transcribing %s in %d segments", path.name, len(windows))
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="transcribe") as pool:
+            texts = list(pool.map(lambda w: _transcribe_audio(w[2]), windows))
+
+    if not any(texts):
+        return "", []
+    segments = [
+        {"start": round(start, 3), "end": round(end, 3), "text": text}
+        for (start, end, _), text in zip(windows, texts)
+    ]
+    missing = sum(1 for t in texts if not t)
+    if missing:
+        logger.warning("%d of %d segments of %s failed to transcribe", missing, len(texts), path.name)
+    return _stitch_transcripts([t for t in texts if t]), segments
+
+
+def _enrichment_model(provider: str, ollama_default: str) -> str:
+    """Return the model name the caption/summary/sentiment helpers will use."""
+    if provider == "openai":
+        return os.getenv("OPENAI_MODEL", "gpt-4o")
+    return os.getenv("CAPTION_MODEL") or os.getenv("OLLAMA_MODEL", ollama_default)
 
-    logger.warning("Unknown caption provider %s", provider)
-    return ""
 
+def _cached(
+    content_hash: str, ollama_default: str, prompt: str, compute, *settings: str
+) -> str:
+    """Return ``compute()`` through ``ENRICH_CACHE``.
 
-def _generate_summary(text: str) -> str:
-    """Return a short summary for ``text`` using an LLM if available."""
+    The key covers ``content_hash``, the configured provider and model,
+    ``prompt`` and any preprocessing ``settings`` that change what the model
+    sees. Empty results are never cached so failures are retried.
+    """
+    if not ENRICH_CACHE_ENABLED:
+        return compute()
     provider = os.getenv("CAPTION_PROVIDER", "ollama").lower()
-    model = os.getenv("CAPTION_MODEL")
+    key = EnrichmentCache.make_key(
+        content_hash, provider, _enrichment_model(provider, ollama_default), prompt, *settings
+    )
+    hit = ENRICH_CACHE.get(key)
+    if hit is not None:
+        return hit
+    result = compute()
+    if result:
+        ENRICH_CACHE.put(key, result)
+    return result
 
-    if not text:
-        return ""
 
-    logger.debug("Summarizing text via %s", provider)
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-    def _via_openai() -> str:
-        mdl = os.getenv("OPENAI_MODEL", "gpt-4o")
-        try:
-            import openai
 
-            messages = [
-                {"role": "user", "content": f"{SUMMARY_PROMPT}\n{text}"},
-            ]
-            resp = openai.chat.completions.create(model=mdl, messages=messages)
-            return resp.choices[0].message.content.strip()
-        except Exception:
-            logger.exception("OpenAI summary failed")
-            return ""
+def enrichment_cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters for the enrichment cache."""
+    return ENRICH_CACHE.stats()
 
-    if provider == "openai":
-        return _via_openai()
 
-    if provider == "ollama":
-        model = model or os.getenv("OLLAMA_MODEL", "llama3")
-        try:
-            client = _ollama_client()
+def _generate_caption(path: Path) -> str:
+    """Return a short caption for ``path`` using an LLM if available."""
+    try:
+        digest = file_sha256(path)
+    except OSError:
+        return _caption_uncached(path)
+    max_edge, fmt, quality = _preview_settings()
+    preview = f"{max_edge}:{fmt}:{quality}" if Image is not None and max_edge > 0 else "original"
+    return _cached(digest, "llava", CAPTION_PROMPT, lambda: _caption_uncached(path), preview)
 
-            resp = client.generate(model=model, prompt=f"{SUMMARY_PROMPT}\n{text}")
-            return (resp["response"] if isinstance(resp, dict) else resp.response).strip()
-        except Exception:
-            logger.exception("Ollama summary failed")
-            if os.getenv("OPENAI_API_KEY"):
-                logger.info("Falling back to OpenAI for summary")
-                return _via_openai()
-            return ""
 
-    logger.warning("Unknown caption provider %s", provider)
-    return ""
+_PAYLOAD_LOCK = threading.Lock()
+CAPTION_PAYLOAD_STATS = {"images": 0, "original_bytes": 0, "sent_bytes": 0}
 
 
-def _analyze_sentiment(text: str) -> str:
-    """Return a simple sentiment classification."""
+def caption_payload_stats() -> Dict[str, int]:
+    """Return totals of original versus uploaded caption image bytes."""
+    with _PAYLOAD_LOCK:
+        return dict(CAPTION_PAYLOAD_STATS)
+
+
+def _preview_settings() -> tuple[int, str, int]:
+    """Return ``CAPTION_MAX_EDGE``, the Pillow format and the quality for previews."""
+    max_edge = int(os.getenv("CAPTION_MAX_EDGE", "1024"))
+    fmt = "WEBP" if os.getenv("CAPTION_IMAGE_FORMAT", "jpeg").lower() == "webp" else "JPEG"
+    return max_edge, fmt, int(os.getenv("CAPTION_IMAGE_QUALITY", "85"))
+
+
+def _downscale_image(raw: bytes) -> tuple[bytes, str]:
+    """Return ``raw`` resized for captioning and its MIME type.
+
+    The image is rotated per its EXIF orientation, shrunk so its longest edge
+    is at most ``CAPTION_MAX_EDGE`` pixels and re-encoded as
+    ``CAPTION_IMAGE_FORMAT`` (``jpeg`` or ``webp``) without any metadata.
+    ``raw`` is returned unchanged if Pillow is missing, the stage is disabled
+    with ``CAPTION_MAX_EDGE=0``, the image cannot be decoded or re-encoding
+    would not make it smaller.
+    """
+    max_edge, fmt, quality = _preview_settings()
+    if Image is None or max_edge <= 0:
+        return raw, "image/jpeg"
+    try:
+        with Image.open(io.BytesIO(raw)) as img:
+            source_format = (img.format or "jpeg").lower()
+            img = ImageOps.exif_transpose(img) if ImageOps is not None else img
+            img = img.convert("RGB")
+            img.thumbnail((max_edge, max_edge))
+            buf = io.BytesIO()
+            img.save(buf, format=fmt, quality=quality)
+    except Exception:
+        return raw, "image/jpeg"
+    out = buf.getvalue()
+    mime = f"image/{fmt.lower()}"
+    if len(out) >= len(raw):
+        # already small and compact; sending the original is cheaper
+        out, mime = raw, f"image/{source_format}"
+    with _PAYLOAD_LOCK:
+        CAPTION_PAYLOAD_STATS["images"] += 1
+        CAPTION_PAYLOAD_STATS["original_bytes"] += len(raw)
+        CAPTION_PAYLOAD_STATS["sent_bytes"] += len(out)
+    logger.debug("Caption payload %d -> %d bytes", len(raw), len(out))
+    return out, mime
+
+
+def _caption_image_bytes(path: Path) -> tuple[bytes, str]:
+    """Return the image payload and MIME type sent to the caption model."""
+    buf = _heic_jpeg(path) if _is_heic(path) else None
+    img_bytes = buf.getvalue() if buf is not None else path.read_bytes()
+    return _downscale_image(img_bytes)
+
+
+def _caption_uncached(path: Path) -> str:
     provider = os.getenv("CAPTION_PROVIDER", "ollama").lower()
-    model = os.getenv("CAPTION_MODEL")
+    logger.debug("Captioning %s via %s", path.name, provider)
+    try:
+        image = _caption_image_bytes(path)
+    except Exception:
+        logger.exception("Could not prepare %s for captioning", path.name)
+        return ""
+    return GATEWAY.generate_sync(
+        CAPTION_PROMPT,
+        images=[image],
+        ollama_default="llava",
+        label=f"captioning for {path.name}",
+    )
 
+
+def _generate_summary(text: str) -> str:
+    """Return a short summary for ``text`` using an LLM if available."""
     if not text:
         return ""
+    return _cached(_text_hash(text), "llama3", SUMMARY_PROMPT, lambda: _summary_uncached(text))
 
-    logger.debug("Analyzing sentiment via %s", provider)
 
-    def _parse(resp: str) -> str:
-        lower = resp.lower()
-        for opt in ("positive", "negative", "neutral"):
-            if opt in lower:
-                return opt
-        return resp.strip().split()[0].lower()
+def _summary_uncached(text: str) -> str:
+    if not text:
+        return ""
+    logger.debug("Summarizing text via %s", os.getenv("CAPTION_PROVIDER", "ollama"))
+    return GATEWAY.generate_sync(f"{SUMMARY_PROMPT}\n{text}", label="summary")
 
-    def _via_openai() -> str:
-        mdl = os.getenv("OPENAI_MODEL", "gpt-4o")
-        try:
-            import openai
 
-            messages = [
-                {"role": "user", "content": f"{SENTIMENT_PROMPT}\n{text}"},
-            ]
-            resp = openai.chat.completions.create(model=mdl, messages=messages)
-            return _parse(resp.choices[0].message.content)
-        except Exception:
-            logger.exception("OpenAI sentiment analysis failed")
-            return ""
+def _parse_sentiment(resp: str) -> str:
+    lower = resp.lower()
+    for opt in ("positive", "negative", "neutral"):
+        if opt in lower:
+            return opt
+    return resp.strip().split()[0].lower()
 
-    if provider == "openai":
-        return _via_openai()
 
-    if provider == "ollama":
-        model = model or os.getenv("OLLAMA_MODEL", "llama3")
-        try:
-            client = _ollama_client()
+def _analyze_sentiment(text: str) -> str:
+    """Return a simple sentiment classification."""
+    if not text:
+        return ""
+    return _cached(
+        _text_hash(text), "llama3", SENTIMENT_PROMPT, lambda: _sentiment_uncached(text)
+    )
 
-            resp = client.generate(model=model, prompt=f"{SENTIMENT_PROMPT}\n{text}")
-            content = resp["response"] if isinstance(resp, dict) else resp.response
-            return _parse(content)
-        except Exception:
-            logger.exception("Ollama sentiment analysis failed")
-            if os.getenv("OPENAI_API_KEY"):
-                logger.info("Falling back to OpenAI for sentiment analysis")
-                return _via_openai()
-            return ""
 
-    logger.warning("Unknown caption provider %s", provider)
-    return ""
+def _sentiment_uncached(text: str) -> str:
+    if not text:
+        return ""
+    logger.debug("Analyzing sentiment via %s", os.getenv("CAPTION_PROVIDER", "ollama"))
+    return GATEWAY.generate_sync(
+        f"{SENTIMENT_PROMPT}\n{text}", parse=_parse_sentiment, label="sentiment analysis"
+    )
+
+
+def _parse_batch_sentiment(raw: str, count: int) -> list[str]:
+    """Return ``count`` labels from a batch reply, ``""`` where an item is missing."""
+    labels = [""] * count
+    start, end = raw.find("{"), raw.rfind("}")
+    if start < 0 or end <= start:
+        return labels
+    try:
+        obj = json.loads(raw[start : end + 1])
+    except json.JSONDecodeError:
+        return labels
+    items = obj.get("results") if isinstance(obj, dict) else None
+    if not isinstance(items, list):
+        return labels
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            idx = int(item.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        label = item.get("sentiment")
+        if 0 <= idx < count and isinstance(label, str) and label.strip():
+            labels[idx] = _parse_sentiment(label)
+    return labels
+
+
+def _analyze_sentiment_batch(texts: list[str]) -> list[str]:
+    """Classify ``texts`` in a single LLM request.
+
+    Returns one label per text; items the model skipped come back as ``""``.
+    """
+    if not texts:
+        return []
+    numbered = "\n".join(
+        f"{i}. {' '.join(t.split())}" for i, t in enumerate(texts, start=1)
+    )
+    logger.debug(
+        "Classifying %d texts via %s", len(texts), os.getenv("CAPTION_PROVIDER", "ollama")
+    )
+    return GATEWAY.generate_sync(
+        f"{BATCH_SENTIMENT_PROMPT}\n{numbered}",
+        json_mode=True,
+        parse=lambda raw: _parse_batch_sentiment(raw, len(texts)),
+        default=[""] * len(texts),
+        label="batch sentiment analysis",
+    )
+
+
+def _parse_enrichment(raw: str, keywords: bool) -> Dict[str, Any] | None:
+    """Return the fields of a combined enrichment reply or ``None``."""
+    start, end = raw.find("{"), raw.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        obj = json.loads(raw[start : end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(obj, dict):
+        return None
+    summary = obj.get("summary")
+    sentiment = obj.get("sentiment")
+    if not isinstance(summary, str) or not isinstance(sentiment, str) or not sentiment.strip():
+        return None
+    result: Dict[str, Any] = {
+        "summary": summary.strip(),
+        "sentiment": _parse_sentiment(sentiment),
+    }
+    if keywords:
+        kws = obj.get("keywords")
+        result["keywords"] = [str(k).strip() for k in kws if str(k).strip()] if isinstance(kws, list) else []
+    return result
+
+
+def _enrich_transcript(text: str, keywords: bool = False) -> Dict[str, Any] | None:
+    """Return summary, sentiment and optional keywords from one LLM request.
+
+    Returns ``None`` if the reply cannot be parsed so callers can fall back to
+    :func:`_generate_summary` and :func:`_analyze_sentiment`.
+    """
+    if not text:
+        return None
+    prompt = ENRICH_PROMPT + (ENRICH_KEYWORDS_PROMPT if keywords else "")
+    raw = _cached(
+        _text_hash(text), "llama3", prompt, lambda: _enrich_uncached(text, prompt, keywords)
+    )
+    return _parse_enrichment(raw, keywords) if raw else None
+
+
+def _enrich_uncached(text: str, prompt: str, keywords: bool) -> str:
+    logger.debug("Enriching transcript via %s", os.getenv("CAPTION_PROVIDER", "ollama"))
+
+    def _valid(raw: str) -> str:
+        return raw if _parse_enrichment(raw, keywords) else ""
+
+    return GATEWAY.generate_sync(
+        f"{prompt}\n{text}", json_mode=True, parse=_valid, label="enrichment"
+    )
+
+
+def _summarize_and_classify(text: str, ckpt: Checkpoint | None = None) -> Dict[str, Any]:
+    """Return ``summary`` and ``sentiment`` (plus ``keywords`` if enabled) for ``text``.
+
+    With ``ENRICH_MODE=combined`` a single structured request is tried first and
+    the two separate calls are only made if its reply does not parse. Results
+    are saved as the ``summarize`` and ``classify`` stages of ``ckpt``.
+    """
+    ckpt = ckpt or NullCheckpoint()
+    if "summarize" in ckpt and "classify" in ckpt:
+        result = {"summary": ckpt.get("summarize"), "sentiment": ckpt.get("classify")}
+        if ckpt.get("keywords") is not None:
+            result["keywords"] = ckpt.get("keywords")
+        return result
+    if text and os.getenv("ENRICH_MODE", "separate").lower() == "combined":
+        keywords = os.getenv("ENRICH_KEYWORDS", "").lower() in {"1", "true", "yes"}
+        result = _timed("enrich", _enrich_transcript, text, keywords)
+        if result is not None:
+            if "keywords" in result:
+                ckpt.save("keywords", result["keywords"])
+            ckpt.save("summarize", result["summary"])
+            ckpt.save("classify", result["sentiment"])
+            return result
+        logger.info("Combined enrichment unavailable; using separate requests")
+    return {
+        "summary": ckpt.run("summarize", lambda: _timed("summary", _generate_summary, text)),
+        "sentiment": ckpt.run("classify", lambda: _timed("sentiment", _analyze_sentiment, text)),
+    }
 
 
 def preprocess_text(path: Path) -> tuple[str, Dict[str, Any], str | None]:
@@ -490,7 +1174,7 @@ def preprocess_text(path: Path) -> tuple[str, Dict[str, Any], str | None]:
     meta: Dict[str, Any] = {}
     ts: str | None = None
     if suffix in {".html", ".htm"}:
-        text = _strip_html(text)
+        text = html_to_text(text)
     elif suffix == ".json":
         try:
             obj = json.loads(text)
@@ -505,27 +1189,149 @@ def preprocess_text(path: Path) -> tuple[str, Dict[str, Any], str | None]:
     return _sanitize(text).strip(), meta, ts
 
 
+@contextmanager
+def _text_lines(path: Path):
+    """Yield ``(lines, metadata, timestamp)`` for a text document.
+
+    Plain text and HTML are read lazily from the open file; JSON is parsed
+    first with :func:`preprocess_text`.
+    """
+    suffix = path.suffix.lower()
+    if suffix in {".html", ".htm"}:
+        with open(path, encoding="utf-8", errors="ignore") as fh:
+            yield iter_html_text(fh), {}, None
+        return
+    if suffix == ".json":
+        text, meta, ts = preprocess_text(path)
+        yield iter(text.splitlines(keepends=True)), meta, ts
+        return
+    with open(path, encoding="utf-8", errors="ignore") as fh:
+        yield fh, {}, None
+
+
+def _write_chunks(
+    path: Path, parent: str, ts: str, source: str
+) -> tuple[list[Dict[str, Any]] | None, Dict[str, Any], str | None]:
+    """Write each chunk of a long text file as a child memory of ``parent``.
+
+    Returns the ``parts`` index for the parent memory (``None`` if the
+    document fits in one chunk), the document metadata and its timestamp.
+    Children go in the parent's date shard and are named after it, so a
+    retry overwrites them.
+    """
+    with _text_lines(path) as (lines, meta, ts_override):
+        chunks = iter_chunks(lines, TEXT_CHUNK_CHARS, TEXT_CHUNK_MIN_CHARS)
+        head = list(itertools.islice(chunks, 2))
+        if len(head) < 2:
+            return None, meta, ts_override
+        folder = shard_dir(MEMORY_DIR, ts_override or ts, ts)
+        folder.mkdir(parents=True, exist_ok=True)
+        stem = Path(parent).stem
+        parts: list[Dict[str, Any]] = []
+        for chunk in itertools.chain(head, chunks):
+            number = chunk["index"] + 1
+            child = folder / f"{stem}-{number:04d}.json"
+            part = {
+                "memory": child.name,
+                "index": chunk["index"],
+                "start": chunk["start"],
+                "end": chunk["end"],
+            }
+            for key in ("heading", "date"):
+                if key in chunk:
+                    part[key] = chunk[key]
+            child_obj = {
+                "@context": "https://www.w3.org/ns/activitystreams",
+                "type": "Note",
+                "name": f"{path.name} ({number})",
+                "content": _sanitize(chunk["text"]),
+                "partOf": parent,
+                "index": chunk["index"],
+                "offset": {"start": chunk["start"], "end": chunk["end"]},
+                "timestamp": ts_override or ts,
+                "source": source,
+            }
+            for key in ("heading", "date"):
+                if key in chunk:
+                    child_obj[key] = chunk[key]
+            save_json_encrypted(child_obj, child, FERNET)
+            parts.append(part)
+    return parts, meta, ts_override
+
+
+def _outline(name: str, parts: list[Dict[str, Any]]) -> str:
+    """Return a short table of contents for a chunked document."""
+    labels = dict.fromkeys(p.get("heading") or p.get("date") for p in parts)
+    lines = [f"{name} ({len(parts)} parts)"]
+    lines.extend(label for label in labels if label)
+    return "\n".join(lines)
+
+
 def process_file(path: Path) -> bool:
     """Process ``path`` and return True on success."""
+    media = _media_lane(path)
+    start = time.perf_counter()
+    result = _process_archive(path) if media == "archive" else _process_file(path)
+    FILE_SECONDS.observe(time.perf_counter() - start, media=media)
+    FILES_TOTAL.inc(media=media, result=result)
+    return result != "failed"
+
+
+def _process_file(path: Path) -> str:
+    """Process ``path`` and return ``"success"``, ``"duplicate"`` or ``"failed"``."""
     logger.info("Processing %s", path.name)
     now = datetime.now(timezone.utc)
     ts = now.isoformat()
     safe_ts = now.strftime("%Y%m%d%H%M%S%f")
-    mem_path = MEMORY_DIR / f"{safe_ts}.json"
+
+    digest: str | None = None
+    if DEDUP_ENABLED or CHECKPOINTS_ENABLED:
+        try:
+            digest = _timed("hash", file_sha256, path)
+        except OSError:
+            logger.exception("Could not hash %s", path.name)
+    if DEDUP_ENABLED and digest:
+        entry = DEDUP_INDEX.link(digest, path.name, ts)
+        if entry:
+            path.unlink()
+            logger.info("Linked duplicate %s to memory %s", path.name, entry["memory"])
+            return "duplicate"
+    ckpt: Checkpoint = NullCheckpoint()
+    if CHECKPOINTS_ENABLED and digest:
+        # without dedup, identical files can be processed side by side and
+        # must not share a checkpoint
+        key = digest
+        if not DEDUP_ENABLED:
+            key = hashlib.sha256(f"{digest}/{path.name}".encode()).hexdigest()
+        ckpt = Checkpoint(WORK_DIR, key, FERNET)
+    # the memory's date shard is only known once its timestamp is extracted
+    mem_name = f"{safe_ts}.json"
+    mem_path: Path | None = None
 
     # determine final destination for the original file
-    dest = PROCESSED_DIR / path.name
-    if dest.exists():
-        dest = dest.with_name(f"{dest.stem}-{safe_ts}{dest.suffix}")
+    dest = _claim_path(PROCESSED_DIR / path.name, safe_ts)
 
-    is_heic = _is_image(path) and path.suffix.lower() in {".heic", ".heif"}
-    temp_jpg: Path | None = None
+    is_heic = _is_image(path) and _is_heic(path)
+    heic_jpg: io.BytesIO | None = None
+
+    def _always(_value: Any) -> bool:
+        return True
 
     try:
+        persisted = ckpt.get("persist")
+        if persisted:
+            _release_paths(dest)
+            dest = PERSONA_DIR / persisted["source"]
+
         if _is_image(path):
-            meta = _extract_exif(path)
-            temp_jpg = _convert_heic_to_jpeg(path) if is_heic else None
-            caption = _generate_caption(temp_jpg or path)
+            meta = ckpt.run("extract", lambda: _timed("exif", _extract_exif, path), _always)
+            if is_heic:
+                # decode once; captioning and the .jpg sidecar share this buffer
+                heic_jpg = _timed("heic", _convert_heic_to_jpeg, path)
+                if heic_jpg is not None:
+                    with _HEIC_LOCK:
+                        _HEIC_BUFFERS[path] = heic_jpg
+            caption = ckpt.run("caption", lambda: _timed("caption", _generate_caption, path))
             if not caption:
                 raise RuntimeError("caption failed")
             mem_obj = {
@@ -539,12 +1345,19 @@ def process_file(path: Path) -> bool:
             "source": str(dest.relative_to(PERSONA_DIR)),
         }
         elif _is_audio(path):
-            transcript = _transcribe_audio(path)
+            meta = ckpt.run(
+                "extract", lambda: _timed("metadata", _extract_audio_metadata, path), _always
+            )
+            transcript, segments = ckpt.run(
+                "transcribe",
+                lambda: _timed("transcribe", _transcribe_long, path),
+                lambda r: bool(r[0]),
+            )
             if not transcript:
                 raise RuntimeError("transcription failed")
-            summary = _generate_summary(transcript)
-            sentiment = _analyze_sentiment(transcript)
-            meta = _extract_audio_metadata(path)
+            enrichment = _summarize_and_classify(transcript, ckpt)
+            summary = enrichment["summary"]
+            sentiment = enrichment["sentiment"]
             mem_obj = {
             "@context": "https://www.w3.org/ns/activitystreams",
             "type": "Audio",
@@ -557,26 +1370,58 @@ def process_file(path: Path) -> bool:
             "timestamp": ts,
             "source": str(dest.relative_to(PERSONA_DIR)),
         }
+            if "keywords" in enrichment:
+                mem_obj["keywords"] = enrichment["keywords"]
+            if segments:
+                mem_obj["segments"] = segments
         elif _is_video(path):
-            frame_path = _extract_frame(path)
-            caption = _generate_caption(frame_path) if frame_path else ""
-            if frame_path:
-                frame_path.unlink(missing_ok=True)
-            audio_path = _extract_video_audio(path)
-            transcript = _transcribe_audio(audio_path) if audio_path else ""
-            if audio_path:
-                audio_path.unlink(missing_ok=True)
+            meta = ckpt.get("extract") or {}
+            scenes = ckpt.get("caption")
+            transcribed = ckpt.get("transcribe")
+            if scenes is None or transcribed is None:
+                keyframes = int(os.getenv("VIDEO_KEYFRAMES", "4"))
+                with tempfile.TemporaryDirectory(prefix="video-") as scratch:
+                    with STAGE_SECONDS.time(stage="frames"):
+                        assets = _extract_video_assets(path, Path(scratch), keyframes)
+                        if assets and (assets["frames"] or assets["audio"]):
+                            frames, audio_path = assets["frames"], assets["audio"]
+                            meta = ckpt.run("extract", lambda: assets["metadata"], _always)
+                        else:
+                            frame_path = _extract_frame(path)
+                            frames = [(0.0, frame_path)] if frame_path else []
+                            audio_path = _extract_video_audio(path)
+                    scenes = ckpt.run(
+                        "caption",
+                        lambda: _timed("caption", _caption_frames, frames),
+                        lambda sc: bool(sc) or not frames,
+                    )
+                    for _, frame_path in frames:
+                        frame_path.unlink(missing_ok=True)
+                    transcribed = ckpt.run(
+                        "transcribe",
+                        lambda: _timed("transcribe", _transcribe_long, audio_path)
+                        if audio_path
+                        else ("", []),
+                        lambda r: bool(r[0]) or audio_path is None,
+                    )
+                    if audio_path:
+                        audio_path.unlink(missing_ok=True)
+            caption = " ".join(dict.fromkeys(sc["caption"] for sc in scenes))
+            transcript, segments = transcribed
             if not caption and not transcript:
                 raise RuntimeError("video analysis failed")
-            summary = _generate_summary(transcript)
-            sentiment = _analyze_sentiment(transcript)
-            meta = _extract_video_metadata(path)
+            enrichment = _summarize_and_classify(transcript, ckpt)
+            summary = enrichment["summary"]
+            sentiment = enrichment["sentiment"]
+            if not meta:
+                meta = _timed("metadata", _extract_video_metadata, path)
             mem_obj = {
             "@context": "https://www.w3.org/ns/activitystreams",
             "type": "Video",
             "name": path.name,
             "content": summary or caption,
             "caption": caption,
+            "scenes": scenes,
             "transcript": transcript,
             "summary": summary,
             "sentiment": sentiment,
@@ -584,8 +1429,23 @@ def process_file(path: Path) -> bool:
             "timestamp": ts,
             "source": str(dest.relative_to(PERSONA_DIR)),
         }
+            if "keywords" in enrichment:
+                mem_obj["keywords"] = enrichment["keywords"]
+            if segments:
+                mem_obj["segments"] = segments
         else:
-            content, meta_extra, ts_override = preprocess_text(path)
+            parts = None
+            if TEXT_CHUNK_CHARS > 0 and path.stat().st_size > TEXT_CHUNK_CHARS:
+                # reuse the parent name from an interrupted attempt so its
+                # child memories are overwritten rather than duplicated
+                mem_name = ckpt.run("chunk", lambda: mem_name, _always)
+                parts, meta_extra, ts_override = _timed(
+                    "chunk", _write_chunks, path, mem_name, ts, str(dest.relative_to(PERSONA_DIR))
+                )
+            if parts:
+                content = _outline(path.name, parts)
+            else:
+                content, meta_extra, ts_override = _timed("text", preprocess_text, path)
             mem_obj = {
             "@context": "https://www.w3.org/ns/activitystreams",
             "type": "Note",
@@ -595,53 +1455,302 @@ def process_file(path: Path) -> bool:
             "timestamp": ts_override or ts,
             "source": str(dest.relative_to(PERSONA_DIR)),
         }
+            if parts:
+                mem_obj["parts"] = parts
 
-        save_json_encrypted(mem_obj, mem_path, FERNET)
+        if persisted and (MEMORY_DIR / persisted["memory"]).exists():
+            mem_path = MEMORY_DIR / persisted["memory"]
+        else:
+            mem_path = _claim_path(memory_path(MEMORY_DIR, mem_name, mem_obj["timestamp"], ts))
+            _timed("write", save_json_encrypted, mem_obj, mem_path, FERNET)
+            ckpt.save(
+                "persist",
+                {"memory": relative_name(MEMORY_DIR, mem_path), "source": mem_obj["source"]},
+            )
 
         # encrypt original bytes into processed directory
-        data_bytes = path.read_bytes()
-        dest.write_bytes(encrypt_bytes(data_bytes, FERNET))
+        with STAGE_SECONDS.time(stage="encrypt"):
+            encrypt_file(path, dest, FERNET)
+            if heic_jpg is not None:
+                dest_jpg = _claim_path(dest.with_suffix(".jpg"), safe_ts)
+                dest_jpg.write_bytes(encrypt_bytes(heic_jpg.getvalue(), FERNET))
+                _release_paths(dest_jpg)
+            with _HEIC_LOCK:
+                _HEIC_BUFFERS.pop(path, None)
+
+        if DEDUP_ENABLED and digest:
+            DEDUP_INDEX.record(
+                digest,
+                relative_name(MEMORY_DIR, mem_path),
+                str(dest.relative_to(PERSONA_DIR)),
+                path.name,
+                ts,
+            )
+        # only drop the input once everything that refers to it is saved
         path.unlink()
-
-        if _is_image(path) and path.suffix.lower() in {".heic", ".heif"} and temp_jpg:
-            dest_jpg = dest.with_suffix(".jpg")
-            if dest_jpg.exists():
-                dest_jpg = dest_jpg.with_name(f"{dest_jpg.stem}-{safe_ts}{dest_jpg.suffix}")
-            dest_jpg.write_bytes(encrypt_bytes(temp_jpg.read_bytes(), FERNET))
-            temp_jpg.unlink(missing_ok=True)
-
-        logger.info("Saved memory %s", mem_path.name)
-        return True
+        ckpt.discard()
+        _release_paths(mem_path, dest)
+        logger.info("Saved memory %s", relative_name(MEMORY_DIR, mem_path))
+        return "success"
     except Exception as exc:
+        _release_paths(mem_path, dest)
+        if DEDUP_ENABLED and digest:
+            # let a waiting copy of the same bytes try again
+            DEDUP_INDEX.release(digest)
         logger.exception("Failed to process %s", path.name)
-        fail = TROUBLE_DIR / path.name
-        if fail.exists():
-            fail = fail.with_name(f"{fail.stem}-{safe_ts}{fail.suffix}")
+        with _HEIC_LOCK:
+            _HEIC_BUFFERS.pop(path, None)
+        if not path.exists():
+            return "failed"
+        fail = _claim_path(TROUBLE_DIR / path.name, safe_ts)
 
-        fail.write_bytes(encrypt_bytes(path.read_bytes(), FERNET))
+        encrypt_file(path, fail, FERNET)
         path.unlink(missing_ok=True)
+        _release_paths(fail)
+        logger.info("Moved %s to %s", path.name, fail)
+        return "failed"
+
+
+def _staged_name(name: str) -> str:
+    return re.sub(r"[^\w.\-]+", "_", Path(name).name).lstrip(".") or "item"
+
+
+def _process_archive(path: Path) -> str:
+    """Stream the members of archive ``path`` through the media lanes.
+
+    Members are copied one at a time into a scratch directory under
+    ``STAGING_DIR`` and processed like dropped files, with at most
+    ``ARCHIVE_MAX_STAGED`` waiting at once.  A member that cannot be read is
+    logged and counted as failed without stopping the import.  Each member's
+    original is kept in ``processed``, so the archive is deleted once it has
+    been read to the end; one that cannot be opened, or stops partway, is
+    moved to ``TROUBLE_DIR`` and a re-import is absorbed by deduplication.
+    """
+    logger.info("Importing archive %s", path.name)
+    safe_ts = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S%f")
+    scratch = Path(tempfile.mkdtemp(prefix=f"{path.stem}-", dir=STAGING_DIR))
+    slots = threading.BoundedSemaphore(max(1, ARCHIVE_MAX_STAGED))
+    counts = {"items": 0, "failed": 0}
+    counts_lock = threading.Lock()
+    read = 0
+    complete = True
+
+    def _count(ok: bool) -> None:
+        with counts_lock:
+            counts["items"] += 1
+            counts["failed"] += 0 if ok else 1
+
+    def _done(future: Any) -> None:
+        _count(not future.cancelled() and future.exception() is None and future.result())
+        slots.release()
 
-        if _is_image(path) and path.suffix.lower() in {".heic", ".heif"} and temp_jpg and temp_jpg.exists():
-            temp_jpg.unlink(missing_ok=True)
+    try:
+        with _lane_scheduler() as scheduler:
+            members = iter_archive(path)
+            while True:
+                try:
+                    name, stream = next(members)
+                except StopIteration:
+                    break
+                except Exception:
+                    if not read:
+                        raise
+                    logger.exception("Stopped reading archive %s after %d items", path.name, read)
+                    complete = False
+                    break
+                read += 1
+                slots.acquire()
+                staged = _claim_path(scratch / _staged_name(name))
+                try:
+                    with open(staged, "wb") as fh:
+                        shutil.copyfileobj(stream, fh)
+                except Exception:
+                    slots.release()
+                    staged.unlink(missing_ok=True)
+                    logger.exception("Could not read %s from archive %s", name, path.name)
+                    _count(False)
+                    continue
+                finally:
+                    _release_paths(staged)
+                future = scheduler.submit(staged)
+                if future is None:
+                    slots.release()
+                    continue
+                future.add_done_callback(_done)
+    except Exception:
+        logger.exception("Could not read archive %s", path.name)
+        complete = False
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if not complete:
+        fail = _claim_path(TROUBLE_DIR / path.name, safe_ts)
+        encrypt_file(path, fail, FERNET)
+        path.unlink(missing_ok=True)
+        _release_paths(fail)
         logger.info("Moved %s to %s", path.name, fail)
-        return False
+        if not read:
+            return "failed"
+    else:
+        path.unlink()
+    logger.info(
+        "Imported archive %s: %d items (%d failed)", path.name, counts["items"], counts["failed"]
+    )
+    return "success"
+
 
+def process_pending_files(workers: int | None = None) -> int:
+    """Process every file in ``INPUT_DIR`` and return the number that succeeded.
 
-def process_pending_files() -> None:
+    Files are split into text, image, audio, video and archive lanes which run side by
+    side, each with ``LANE_LIMITS`` workers (or ``workers`` if given), while
+    ``PROVIDER_LIMITS`` caps the requests sent to each LLM provider.
+    """
     files = [p for p in INPUT_DIR.iterdir() if p.is_file()]
     if not files:
         logger.debug("No files to process")
-    for p in files:
-        process_file(p)
+        return 0
+    return process_files(files, workers)
+
+
+def _log_pass_stats(scheduler: LaneScheduler) -> None:
+    for lane, stats in sorted(scheduler.stats().items()):
+        logger.info(
+            "Lane %s: %d files (%d failed), %.1fs busy, longest wait %.1fs",
+            lane,
+            stats["files"],
+            stats["failed"],
+            stats["busy"],
+            stats["max_wait"],
+        )
+    for name, stats in provider_stats().items():
+        if stats.get("throttled") or stats.get("retries") or stats.get("outages"):
+            logger.info("Provider %s: %s", name, stats)
+    if ENRICH_CACHE_ENABLED:
+        logger.info("Enrichment cache: %s", enrichment_cache_stats())
+    payload = caption_payload_stats()
+    if payload["images"]:
+        logger.info(
+            "Caption payloads: %d images, %d -> %d bytes",
+            payload["images"],
+            payload["original_bytes"],
+            payload["sent_bytes"],
+        )
 
 
-__all__ = ["process_pending_files"]
+def process_files(files: list[Path], workers: int | None = None) -> int:
+    """Process ``files`` through the media lanes and return the number that succeeded."""
+    files = [p for p in files if p.is_file()]
+    if not files:
+        return 0
+    start = time.monotonic()
+    with _lane_scheduler(workers) as scheduler:
+        futures = scheduler.submit_all(files)
+        results = [f.result() for f in futures]
+    elapsed = time.monotonic() - start
+    ENRICH_CACHE.flush()
+    ok = sum(1 for r in results if r)
+    rate = len(results) / elapsed * 60 if elapsed > 0 else float(len(results))
+    logger.info(
+        "Processed %d files (%d failed) in %.1fs (%.1f files/min)",
+        len(results),
+        len(results) - ok,
+        elapsed,
+        rate,
+    )
+    _log_pass_stats(scheduler)
+    return ok
+
+
+__all__ = ["process_pending_files", "process_files", "watch_input"]
+
+
+def _settled_inputs(seen: Dict[Path, tuple[int, int]], settle: float) -> list[Path]:
+    """Return the files in ``INPUT_DIR`` that look fully written.
+
+    A file modified in the last ``settle`` seconds, or whose size or mtime
+    changed since the previous scan, may still be copying in.  It is kept in
+    ``seen`` and left for a later scan.
+    """
+    ready: list[Path] = []
+    pending: Dict[Path, tuple[int, int]] = {}
+    now = time.time()
+    for p in INPUT_DIR.iterdir():
+        try:
+            if not p.is_file():
+                continue
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        sig = (st.st_size, st.st_mtime_ns)
+        if now - st.st_mtime < settle or seen.get(p, sig) != sig:
+            pending[p] = sig
+        else:
+            ready.append(p)
+    seen.clear()
+    seen.update(pending)
+    return ready
+
+
+def watch_input(rescan_interval: float | None = None) -> None:
+    """Process files as soon as they finish arriving in ``INPUT_DIR``.
+
+    Uses inotify where available and rescans the folder every
+    ``rescan_interval`` seconds to catch anything the events missed. Returns
+    immediately if no watcher can be created so the caller can poll instead.
+    Scans skip files written in the last ``INGEST_SETTLE_SECONDS`` and look
+    at them again once that has passed.
+    """
+    if rescan_interval is None:
+        rescan_interval = float(os.getenv("INGEST_RESCAN_INTERVAL", "60"))
+    settle = float(os.getenv("INGEST_SETTLE_SECONDS", "2"))
+    watcher = create_watcher(INPUT_DIR)
+    if watcher is None:
+        return
+    logger.info("Watching %s (rescan every %s seconds)", INPUT_DIR, rescan_interval)
+    # one long-lived scheduler so a note arriving mid-video starts immediately
+    with watcher, _lane_scheduler() as scheduler:
+        unsettled: Dict[Path, tuple[int, int]] = {}
+        scheduler.submit_all(_settled_inputs(unsettled, settle))
+        last_scan = last_settle = time.monotonic()
+        while True:
+            now = time.monotonic()
+            remaining = max(0.0, rescan_interval - (now - last_scan))
+            if unsettled:
+                remaining = min(remaining, max(0.0, settle - (now - last_settle)))
+            ready = watcher.wait(timeout=remaining)
+            if ready:
+                scheduler.submit_all(ready)
+            now = time.monotonic()
+            full = watcher.overflowed or now - last_scan >= rescan_interval
+            if full or (unsettled and now - last_settle >= settle):
+                watcher.overflowed = False
+                scheduler.submit_all(_settled_inputs(unsettled, settle))
+                last_settle = now
+                if full:
+                    last_scan = now
+                    _log_pass_stats(scheduler)
 
 
 def _cli() -> None:
-    import time
     interval = float(os.getenv("INGEST_INTERVAL", "5"))
-    logger.info("Starting ingest loop (interval=%s seconds)", interval)
+    max_age = float(os.getenv("CHECKPOINT_MAX_AGE_DAYS", "30")) * 86400
+    if prune_checkpoints(WORK_DIR, max_age):
+        logger.info("Pruned stale ingest checkpoints")
+    # scratch directories left by an interrupted archive import; the archive
+    # is still in the input folder and will be streamed again
+    for leftover in STAGING_DIR.iterdir():
+        shutil.rmtree(leftover, ignore_errors=True)
+    metrics_port = int(os.getenv("INGEST_METRICS_PORT", "0"))
+    if metrics_port:
+        serve_metrics(METRICS, metrics_port, os.getenv("INGEST_METRICS_HOST", "127.0.0.1"))
+    if os.getenv("WHISPER_PRELOAD", "").lower() in {"1", "true", "yes"}:
+        warm_up_models()
+    if os.getenv("INGEST_WATCH", "true").lower() in {"1", "true", "yes"}:
+        watch_input()
+    logger.info(
+        "Starting ingest loop (interval=%s seconds, lanes=%s)", interval, LANE_LIMITS
+    )
     while True:
         process_pending_files()
         time.sleep(interval)
@@ -5,15 +5,14 @@ from __future__ import annotations
 import difflib
 import json
 import logging
-import os
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Callable, List
 
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_ollama import ChatOllama
-from langchain_openai import ChatOpenAI
+
+from .llm_gateway import GatewayChat
 
 
 class EarlyFinish(Exception):
@@ -69,14 +68,15 @@ class PersonalityInterviewer:
         self.MAX_NOTES_CHARS = 8000
 
     def _create_llm(self, provider: str, model: str | None) -> object:
-        """Return a language model instance for the chosen provider."""
+        """Return a chat model for the chosen provider.
+
+        Requests go through the shared :mod:`digital_persona.llm_gateway`, so
+        the interviewer gets the same pooled clients, rate limits and
+        Ollama-to-OpenAI fallback as ingest.
+        """
         if provider.lower() == "ollama":
-            base_url = os.getenv("OLLAMA_HOST", "http://localhost:11434")
-            model_name = model or os.getenv("OLLAMA_MODEL", "gemma3:12b")
-            return ChatOllama(base_url=base_url, model=model_name)
-        else:
-            model_name = model or os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-            return ChatOpenAI(model=model_name, temperature=0)
+            return GatewayChat("ollama", model)
+        return GatewayChat("openai", model, temperature=0)
 
     def _load_research_docs(self) -> str:
         """Load supporting research papers from the ``docs`` directory."""
@@ -0,0 +1,184 @@
+"""Shared, pooled LLM clients for the ingest pipeline.
+
+Building an ``ollama.Client`` or relying on untuned OpenAI defaults for each
+request means a fresh TCP (and TLS) handshake per call.  The helpers here keep
+one client per provider configuration, each backed by an ``httpx`` connection
+pool with keep-alive and timeouts taken from the environment:
+
+``LLM_TIMEOUT``
+    Read/write timeout in seconds (default 120).
+``LLM_CONNECT_TIMEOUT``
+    Connection timeout in seconds (default 10).
+``LLM_MAX_CONNECTIONS``
+    Maximum pooled connections per client (default 10).
+``LLM_KEEPALIVE``
+    Seconds an idle connection stays open (default 60).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+import httpx
+
+DEFAULT_OLLAMA_HOST = "http://localhost:11434"
+
+_CLIENTS: Dict[Tuple[Any, ...], Any] = {}
+_ASYNC_CLIENTS: Dict[Tuple[Any, ...], Any] = {}
+_LOCK = threading.Lock()
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        float(os.getenv("LLM_TIMEOUT", "120")),
+        connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "10")),
+    )
+
+
+def _limits() -> httpx.Limits:
+    max_conn = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+    return httpx.Limits(
+        max_connections=max_conn,
+        max_keepalive_connections=max_conn,
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE", "60")),
+    )
+
+
+def _settings() -> Tuple[str, ...]:
+    return tuple(
+        os.getenv(name, "")
+        for name in ("LLM_TIMEOUT", "LLM_CONNECT_TIMEOUT", "LLM_MAX_CONNECTIONS", "LLM_KEEPALIVE")
+    )
+
+
+def _cached(key: Tuple[Any, ...], factory, store: Dict[Tuple[Any, ...], Any] = _CLIENTS) -> Any:
+    with _LOCK:
+        client = store.get(key)
+        if client is None:
+            client = factory()
+            store[key] = client
+        return client
+
+
+def ollama_client() -> Any:
+    """Return a pooled Ollama client for ``OLLAMA_HOST``.
+
+    Falls back to the ``ollama`` module itself if it does not expose
+    ``Client`` (for example when stubbed in tests).
+    """
+    import ollama
+
+    if not hasattr(ollama, "Client"):
+        return ollama
+    host = os.getenv("OLLAMA_HOST") or DEFAULT_OLLAMA_HOST
+    key = ("ollama", id(ollama), host, _settings())
+    return _cached(
+        key, lambda: ollama.Client(host=host, timeout=_timeout(), limits=_limits())
+    )
+
+
+def openai_client() -> Any:
+    """Return a pooled OpenAI client using the standard ``OPENAI_*`` variables.
+
+    Falls back to the ``openai`` module defaults if the SDK does not expose
+    ``OpenAI`` (for example when stubbed in tests).
+    """
+    import openai
+
+    if not hasattr(openai, "OpenAI"):
+        return openai
+    key = (
+        "openai",
+        id(openai),
+        os.getenv("OPENAI_API_KEY", ""),
+        os.getenv("OPENAI_BASE_URL", ""),
+        _settings(),
+    )
+
+    def _build() -> Any:
+        http_cls = getattr(openai, "DefaultHttpxClient", httpx.Client)
+        return openai.OpenAI(
+            timeout=_timeout(),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "0")),
+            http_client=http_cls(timeout=_timeout(), limits=_limits()),
+        )
+
+    return _cached(key, _build)
+
+
+def async_ollama_client() -> Any:
+    """Return a pooled ``ollama.AsyncClient`` for the running event loop.
+
+    Returns ``None`` if the installed package has no ``AsyncClient``.
+    """
+    import ollama
+
+    if not hasattr(ollama, "AsyncClient"):
+        return None
+    host = os.getenv("OLLAMA_HOST") or DEFAULT_OLLAMA_HOST
+    key = ("async-ollama", id(ollama), id(asyncio.get_running_loop()), host, _settings())
+    return _cached(
+        key,
+        lambda: ollama.AsyncClient(host=host, timeout=_timeout(), limits=_limits()),
+        _ASYNC_CLIENTS,
+    )
+
+
+def async_openai_client() -> Any:
+    """Return a pooled ``openai.AsyncOpenAI`` for the running event loop.
+
+    Returns ``None`` if the installed SDK has no ``AsyncOpenAI``.
+    """
+    import openai
+
+    if not hasattr(openai, "AsyncOpenAI"):
+        return None
+    key = (
+        "async-openai",
+        id(openai),
+        id(asyncio.get_running_loop()),
+        os.getenv("OPENAI_API_KEY", ""),
+        os.getenv("OPENAI_BASE_URL", ""),
+        _settings(),
+    )
+
+    def _build() -> Any:
+        http_cls = getattr(openai, "DefaultAsyncHttpxClient", httpx.AsyncClient)
+        return openai.AsyncOpenAI(
+            timeout=_timeout(),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "0")),
+            http_client=http_cls(timeout=_timeout(), limits=_limits()),
+        )
+
+    return _cached(key, _build, _ASYNC_CLIENTS)
+
+
+def reset_clients() -> None:
+    """Close and forget all cached clients.
+
+    Async clients are only forgotten; they are bound to the event loop that
+    created them and are closed with it.
+    """
+    with _LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+        _ASYNC_CLIENTS.clear()
+    for client in clients:
+        close = getattr(client, "close", None) or getattr(getattr(client, "_client", None), "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+
+
+__all__ = [
+    "async_ollama_client",
+    "async_openai_client",
+    "ollama_client",
+    "openai_client",
+    "reset_clients",
+]
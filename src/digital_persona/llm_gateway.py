@@ -0,0 +1,424 @@
+"""Asyncio LLM gateway shared by ingest and the interviewer.
+
+Provider selection, the Ollama-to-OpenAI fallback, response parsing and the
+per-provider rate limiters and circuit breakers all live here instead of being
+repeated in every caller.  Requests run as coroutines on one event loop in a
+background thread, so hundreds can be in flight without a thread each:
+
+* ``await gateway.generate(...)`` from async code;
+* ``gateway.generate_sync(...)`` from synchronous code such as the ingest
+  worker threads, which blocks only the calling thread;
+* :class:`GatewayChat` wraps the gateway in the ``invoke``/``ainvoke``
+  interface that :class:`~digital_persona.interview.PersonalityInterviewer`
+  expects from a LangChain chat model.
+
+Every request is bounded by ``LLM_TIMEOUT`` and can be cancelled; cancelling
+the awaiting task (or timing out in ``generate_sync``) cancels the request.
+When the installed ``ollama``/``openai`` packages lack async clients, the
+synchronous client is run in the default executor instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Callable, Coroutine, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .breaker import CircuitBreaker
+from .llm_clients import (
+    async_ollama_client,
+    async_openai_client,
+    ollama_client,
+    openai_client,
+)
+from .ratelimit import AdaptiveLimiter, is_retryable, status_code
+
+logger = logging.getLogger(__name__)
+
+class ProviderUnavailable(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+def _is_outage(exc: BaseException) -> bool:
+    # throttling means the provider is up but busy; the rate limiter handles it
+    return is_retryable(exc) and status_code(exc) != 429
+
+
+def default_limits() -> Dict[str, int]:
+    """Return per-provider concurrency limits from ``*_CONCURRENCY``."""
+    return {
+        "ollama": int(os.getenv("OLLAMA_CONCURRENCY", "2")),
+        "openai": int(os.getenv("OPENAI_CONCURRENCY", "4")),
+        "whisper": int(os.getenv("WHISPER_CONCURRENCY", "1")),
+    }
+
+
+def _response_text(resp: Any) -> str:
+    if isinstance(resp, dict):
+        return resp["response"]
+    return resp.response
+
+
+class LLMGateway:
+    """Route text and image prompts to Ollama or OpenAI."""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None) -> None:
+        self.limits = dict(limits) if limits is not None else default_limits()
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # --- shared per-provider state ----------------------------------------
+
+    def limiter(self, provider: str) -> AdaptiveLimiter:
+        """Return the rate limiter for ``provider``."""
+        with self._lock:
+            limiter = self._limiters.get(provider)
+            if limiter is None:
+                limiter = AdaptiveLimiter(
+                    provider,
+                    self.limits.get(provider, 1),
+                    rate=float(os.getenv(f"{provider.upper()}_RATE", "0")),
+                    max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "4")),
+                    backoff_base=float(os.getenv("LLM_BACKOFF_BASE", "1")),
+                    backoff_max=float(os.getenv("LLM_BACKOFF_MAX", "60")),
+                )
+                self._limiters[provider] = limiter
+        return limiter
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        """Return the circuit breaker for ``provider``."""
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    provider,
+                    threshold=int(os.getenv("BREAKER_THRESHOLD", "3")),
+                    probe=lambda: self._probe(provider),
+                    probe_interval=float(os.getenv("BREAKER_PROBE_INTERVAL", "30")),
+                    should_count=_is_outage,
+                )
+                self._breakers[provider] = breaker
+        return breaker
+
+    @staticmethod
+    def _probe(provider: str) -> None:
+        if provider == "ollama":
+            ollama_client().list()
+        else:
+            openai_client().models.list()
+
+    def use_fallback(self, provider: str) -> bool:
+        """Return ``True`` if ``provider`` is marked down and OpenAI can stand in."""
+        return (
+            provider != "openai"
+            and not self.breaker(provider).allow()
+            and bool(os.getenv("OPENAI_API_KEY"))
+        )
+
+    def _guard(self, provider: str, request: Callable[[], Any]) -> Callable[[], Any]:
+        """Wrap ``request`` so its outcome is reported to ``provider``'s breaker."""
+        breaker = self.breaker(provider)
+
+        def _attempt() -> Any:
+            if not breaker.allow():
+                raise ProviderUnavailable(f"{provider} is marked unavailable")
+            try:
+                result = request()
+            except Exception as exc:
+                breaker.record_failure(exc)
+                raise
+            breaker.record_success()
+            return result
+
+        return _attempt
+
+    def call(self, provider: str, request: Callable[[], Any]) -> Any:
+        """Run a blocking ``request`` under ``provider``'s limiter and breaker."""
+        return self.limiter(provider).call(self._guard(provider, request))
+
+    async def call_async(
+        self, provider: str, request: Callable[[], Coroutine[Any, Any, Any]]
+    ) -> Any:
+        """Await ``request()`` under ``provider``'s limiter, breaker and timeout."""
+        breaker = self.breaker(provider)
+        timeout = float(os.getenv("LLM_TIMEOUT", "120"))
+
+        async def _attempt() -> Any:
+            if not breaker.allow():
+                raise ProviderUnavailable(f"{provider} is marked unavailable")
+            try:
+                result = await asyncio.wait_for(request(), timeout)
+            except Exception as exc:
+                breaker.record_failure(exc)
+                raise
+            breaker.record_success()
+            return result
+
+        return await self.limiter(provider).call_async(_attempt)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return limiter and breaker state for each provider used so far."""
+        with self._lock:
+            limiters = dict(self._limiters)
+            breakers = dict(self._breakers)
+        stats = {name: limiter.stats() for name, limiter in limiters.items()}
+        for name, breaker in breakers.items():
+            stats.setdefault(name, {}).update(circuit=breaker.state, outages=breaker.opened)
+        return stats
+
+    # --- provider requests -------------------------------------------------
+
+    async def _ollama(
+        self,
+        prompt: str,
+        model: str,
+        images: Sequence[Tuple[bytes, str]],
+        system: Optional[str],
+        json_mode: bool,
+    ) -> str:
+        kwargs: Dict[str, Any] = {"model": model, "prompt": prompt}
+        if images:
+            kwargs["images"] = [data for data, _ in images]
+        if system:
+            kwargs["system"] = system
+        if json_mode:
+            kwargs["format"] = "json"
+
+        async def _request() -> Any:
+            client = async_ollama_client()
+            if client is not None:
+                return await client.generate(**kwargs)
+            sync_client = ollama_client()
+            return await asyncio.get_running_loop().run_in_executor(
+                None, lambda: sync_client.generate(**kwargs)
+            )
+
+        return _response_text(await self.call_async("ollama", _request))
+
+    async def _openai(
+        self,
+        prompt: str,
+        model: str,
+        images: Sequence[Tuple[bytes, str]],
+        system: Optional[str],
+        json_mode: bool,
+        temperature: Optional[float],
+    ) -> str:
+        if images:
+            content: Any = [{"type": "text", "text": prompt}]
+            for data, mime in images:
+                b64 = base64.b64encode(data).decode()
+                content.append({"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}})
+        else:
+            content = prompt
+        messages: List[Dict[str, Any]] = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": content})
+        kwargs: Dict[str, Any] = {"model": model, "messages": messages}
+        if json_mode:
+            kwargs["response_format"] = {"type": "json_object"}
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+
+        async def _request() -> Any:
+            client = async_openai_client()
+            if client is not None:
+                return await client.chat.completions.create(**kwargs)
+            sync_client = openai_client()
+            return await asyncio.get_running_loop().run_in_executor(
+                None, lambda: sync_client.chat.completions.create(**kwargs)
+            )
+
+        resp = await self.call_async("openai", _request)
+        return resp.choices[0].message.content
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        ollama_default: str = "llama3",
+        openai_default: str = "gpt-4o",
+        images: Iterable[Tuple[bytes, str]] = (),
+        system: Optional[str] = None,
+        json_mode: bool = False,
+        temperature: Optional[float] = None,
+        parse: Callable[[str], Any] = str.strip,
+        default: Any = "",
+        label: str = "request",
+        strict: bool = False,
+    ) -> Any:
+        """Return ``parse(reply)`` for ``prompt``.
+
+        ``provider`` defaults to ``CAPTION_PROVIDER``.  With Ollama, failures
+        (including ``parse`` errors) fall back to OpenAI when
+        ``OPENAI_API_KEY`` is set, and an Ollama outage skips straight to
+        OpenAI.  ``model`` overrides the configured model of the chosen
+        provider; otherwise ``CAPTION_MODEL``/``OLLAMA_MODEL`` (falling back
+        to ``ollama_default``) or ``OPENAI_MODEL`` (``openai_default``) is
+        used.  On failure ``default`` is returned, or the error re-raised if
+        ``strict``.
+        """
+        provider = (provider or os.getenv("CAPTION_PROVIDER", "ollama")).lower()
+        images = list(images)
+
+        async def _via_openai() -> Any:
+            mdl = (model if provider == "openai" else None) or os.getenv("OPENAI_MODEL", openai_default)
+            try:
+                raw = await self._openai(prompt, mdl, images, system, json_mode, temperature)
+                return parse(raw)
+            except Exception:
+                logger.exception("OpenAI %s failed", label)
+                if strict:
+                    raise
+                return default
+
+        if provider == "openai" or (provider == "ollama" and self.use_fallback("ollama")):
+            return await _via_openai()
+
+        if provider == "ollama":
+            mdl = model or os.getenv("CAPTION_MODEL") or os.getenv("OLLAMA_MODEL", ollama_default)
+            try:
+                raw = await self._ollama(prompt, mdl, images, system, json_mode)
+                return parse(raw)
+            except Exception:
+                logger.exception("Ollama %s failed", label)
+                if os.getenv("OPENAI_API_KEY"):
+                    logger.info("Falling back to OpenAI for %s", label)
+                    return await _via_openai()
+                if strict:
+                    raise
+                return default
+
+        logger.warning("Unknown caption provider %s", provider)
+        if strict:
+            raise ValueError(f"Unknown LLM provider {provider}")
+        return default
+
+    # --- event loop bridge -------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="llm-gateway", daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        """Schedule ``coro`` on the gateway loop and return its future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None) -> Any:
+        """Block until ``coro`` finishes on the gateway loop; cancel it on timeout."""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def run_async(self, coro: Coroutine[Any, Any, Any]) -> Any:
+        """Await ``coro`` on the gateway loop from another event loop."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def generate_sync(self, prompt: str, **kwargs: Any) -> Any:
+        """Blocking wrapper around :meth:`generate`."""
+        return self.run(self.generate(prompt, **kwargs))
+
+    def close(self) -> None:
+        """Stop the background loop and the breaker probes."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+            breakers = list(self._breakers.values())
+        for breaker in breakers:
+            breaker.close()
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not None:
+                thread.join(timeout=5)
+            loop.close()
+
+
+_DEFAULT: Optional[LLMGateway] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Return the process-wide gateway, creating it on first use."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = LLMGateway()
+        return _DEFAULT
+
+
+class _Reply:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class GatewayChat:
+    """Minimal chat-model adapter exposing ``invoke`` and ``ainvoke``.
+
+    Messages are LangChain-style objects with ``content`` (and ``type`` of
+    ``"system"`` for system prompts); replies have a ``content`` attribute.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        model: Optional[str] = None,
+        gateway: Optional[LLMGateway] = None,
+        temperature: Optional[float] = None,
+    ) -> None:
+        self.provider = provider.lower()
+        if self.provider == "ollama":
+            self.model = model or os.getenv("OLLAMA_MODEL", "gemma3:12b")
+        else:
+            self.model = model or os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        self.gateway = gateway or get_gateway()
+        self.temperature = temperature
+
+    def _request(self, messages: Sequence[Any]) -> Coroutine[Any, Any, Any]:
+        system = "\n".join(m.content for m in messages if getattr(m, "type", "") == "system")
+        prompt = "\n\n".join(m.content for m in messages if getattr(m, "type", "") != "system")
+        return self.gateway.generate(
+            prompt,
+            provider=self.provider,
+            model=self.model,
+            openai_default="gpt-3.5-turbo",
+            system=system or None,
+            temperature=self.temperature,
+            parse=lambda raw: raw,
+            label="chat",
+            strict=True,
+        )
+
+    def invoke(self, messages: Sequence[Any]) -> _Reply:
+        return _Reply(self.gateway.run(self._request(messages)))
+
+    async def ainvoke(self, messages: Sequence[Any]) -> _Reply:
+        return _Reply(await self.gateway.run_async(self._request(messages)))
+
+
+__all__ = [
+    "GatewayChat",
+    "LLMGateway",
+    "ProviderUnavailable",
+    "default_limits",
+    "get_gateway",
+]
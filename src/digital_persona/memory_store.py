@@ -0,0 +1,250 @@
+"""Date-sharded layout of the memory directory.
+
+Memories are stored as ``memory/YYYY/MM/DD/<name>.json``, sharded by the date
+of the memory's own ``timestamp`` (converted to UTC when it carries an
+offset).  :func:`iter_memories` walks the year, month and day folders in
+order and skips every shard outside the requested date range, so a
+time-bounded query only lists the folders it needs instead of one directory
+holding every memory.
+
+Files written directly into ``memory/`` by older versions are still listed
+and resolved.  Move them into shards with::
+
+    python -m digital_persona.memory_store [--persona-dir DIR] [--dry-run]
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from argparse import ArgumentParser
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+from .secure_storage import get_fernet, load_json_encrypted
+
+logger = logging.getLogger(__name__)
+
+DateLike = Union[str, date, datetime, None]
+
+_SAFE_PART = re.compile(r"^[\w][\w.\-]*$")
+
+
+def parse_timestamp(value: DateLike) -> Optional[datetime]:
+    """Return ``value`` as a naive UTC datetime, or ``None`` if unparseable."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime.combine(value, time())
+    else:
+        text = str(value).strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            dt = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def bounds(start: DateLike = None, end: DateLike = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Return inclusive UTC bounds; a date-only ``end`` covers that whole day."""
+    lo = parse_timestamp(start)
+    hi = parse_timestamp(end)
+    date_only = isinstance(end, date) and not isinstance(end, datetime)
+    if isinstance(end, str) and len(end.strip()) == 10:
+        date_only = True
+    if hi is not None and date_only:
+        hi = hi + timedelta(days=1) - timedelta(microseconds=1)
+    return lo, hi
+
+
+def in_range(timestamp: DateLike, start: Optional[datetime], end: Optional[datetime]) -> bool:
+    """Return ``True`` if ``timestamp`` lies within the (already parsed) bounds."""
+    if start is None and end is None:
+        return True
+    when = parse_timestamp(timestamp)
+    if when is None:
+        return False
+    return (start is None or when >= start) and (end is None or when <= end)
+
+
+def shard_dir(root: Path, timestamp: DateLike, default: DateLike = None) -> Path:
+    """Return the ``YYYY/MM/DD`` folder under ``root`` for ``timestamp``.
+
+    ``default`` (the ingest time, say) is used when ``timestamp`` cannot be
+    parsed; failing both, today's UTC date.
+    """
+    when = parse_timestamp(timestamp) or parse_timestamp(default)
+    if when is None:
+        when = datetime.now(timezone.utc).replace(tzinfo=None)
+    return root / f"{when:%Y}" / f"{when:%m}" / f"{when:%d}"
+
+
+def memory_path(root: Path, name: str, timestamp: DateLike, default: DateLike = None) -> Path:
+    """Return the sharded path for memory ``name``, creating its folder."""
+    folder = shard_dir(root, timestamp, default)
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / name
+
+
+def relative_name(root: Path, path: Path) -> str:
+    """Return ``path`` relative to ``root`` with ``/`` separators (API file ids)."""
+    return path.relative_to(root).as_posix()
+
+
+def _numbered(folder: Path, digits: int) -> list[Path]:
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return []
+    return sorted(
+        Path(e.path)
+        for e in entries
+        if e.is_dir() and len(e.name) == digits and e.name.isdigit()
+    )
+
+
+def _day_in_range(day: date, start: Optional[date], end: Optional[date]) -> bool:
+    return (start is None or day >= start) and (end is None or day <= end)
+
+
+def iter_shards(root: Path, start: DateLike = None, end: DateLike = None) -> Iterator[Path]:
+    """Yield day folders under ``root`` that overlap ``start``..``end``, oldest first."""
+    lo, hi = bounds(start, end)
+    first = lo.date() if lo else None
+    last = hi.date() if hi else None
+    for year in _numbered(root, 4):
+        y = int(year.name)
+        if (first and y < first.year) or (last and y > last.year):
+            continue
+        for month in _numbered(year, 2):
+            m = int(month.name)
+            if not 1 <= m <= 12:
+                continue
+            if first and (y, m) < (first.year, first.month):
+                continue
+            if last and (y, m) > (last.year, last.month):
+                continue
+            for day in _numbered(month, 2):
+                try:
+                    d = date(y, m, int(day.name))
+                except ValueError:
+                    continue
+                if _day_in_range(d, first, last):
+                    yield day
+
+
+def _json_files(folder: Path) -> list[Path]:
+    return sorted(
+        Path(e.path) for e in os.scandir(folder) if e.is_file() and e.name.endswith(".json")
+    )
+
+
+def iter_memories(root: Path, start: DateLike = None, end: DateLike = None) -> Iterator[Path]:
+    """Yield memory files, legacy flat files first and then shard by shard.
+
+    Only shards overlapping ``start``..``end`` are listed.  Flat files cannot
+    be placed without reading them, so they are always yielded; callers
+    filtering by time should check each memory's ``timestamp``.
+    """
+    if not root.exists():
+        return
+    yield from _json_files(root)
+    for shard in iter_shards(root, start, end):
+        yield from _json_files(shard)
+
+
+def resolve_memory(root: Path, name: str) -> Optional[Path]:
+    """Return the memory file for API id ``name`` or ``None`` if missing.
+
+    ``name`` is a path relative to ``root`` such as ``2024/01/31/x.json``.
+    A bare file name is looked up in ``root`` and then in every shard, for
+    clients that predate sharding.  Raises ``ValueError`` for ids that are
+    not plain relative paths.
+    """
+    parts = str(name).replace("\\", "/").split("/")
+    if not parts or not all(_SAFE_PART.match(p) for p in parts):
+        raise ValueError(f"invalid memory file {name!r}")
+    path = root.joinpath(*parts)
+    if path.is_file():
+        return path
+    if len(parts) == 1:
+        return next(root.glob(f"[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]/{parts[0]}"), None)
+    return None
+
+
+def migrate(root: Path, fernet, dry_run: bool = False) -> int:
+    """Move flat memory files in ``root`` into date shards; return the count.
+
+    The shard comes from each memory's ``timestamp``, falling back to the
+    file's modification time.  Unreadable files are left in place.
+    """
+    moved = 0
+    for path in _json_files(root):
+        try:
+            data = load_json_encrypted(path, fernet)
+        except Exception:
+            logger.warning("Skipping unreadable memory %s", path.name)
+            continue
+        mtime = datetime.fromtimestamp(path.stat().st_mtime, timezone.utc)
+        timestamp = data.get("timestamp") if isinstance(data, dict) else None
+        folder = shard_dir(root, timestamp, mtime)
+        dest = folder / path.name
+        if dest.exists():
+            logger.warning("Not moving %s: %s already exists", path.name, relative_name(root, dest))
+            continue
+        logger.info("%s -> %s", path.name, relative_name(root, dest))
+        if not dry_run:
+            folder.mkdir(parents=True, exist_ok=True)
+            os.replace(path, dest)
+        moved += 1
+    return moved
+
+
+def _persona_dir() -> Path:
+    base = os.getenv("PERSONA_DIR")
+    if base:
+        return Path(base)
+    return Path(__file__).resolve().parents[2] / "persona"
+
+
+def _cli() -> None:
+    parser = ArgumentParser(description="Move flat memory files into YYYY/MM/DD shards")
+    parser.add_argument(
+        "--persona-dir",
+        type=Path,
+        default=_persona_dir(),
+        help="Base persona directory (default: PERSONA_DIR)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would move")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    root = args.persona_dir / "memory"
+    count = migrate(root, get_fernet(args.persona_dir), args.dry_run)
+    logger.info("%s %d memories", "Would move" if args.dry_run else "Moved", count)
+
+
+__all__ = [
+    "bounds",
+    "in_range",
+    "iter_memories",
+    "iter_shards",
+    "memory_path",
+    "migrate",
+    "parse_timestamp",
+    "relative_name",
+    "resolve_memory",
+    "shard_dir",
+]
+
+
+if __name__ == "__main__":
+    _cli()
+
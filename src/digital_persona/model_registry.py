@@ -0,0 +1,127 @@
+"""Process-wide registry of lazily loaded local models.
+
+Loading a local speech model such as Whisper reads hundreds of megabytes of
+weights.  :class:`ModelRegistry` loads each named model once, hands the same
+instance to every caller and drops models that have not been used for
+``idle_timeout`` seconds so an idle ingest loop releases the memory.  A model
+held through :meth:`ModelRegistry.use` is never dropped while in use, however
+long the call takes.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Cache of models created by ``loader(name)``."""
+
+    def __init__(self, loader: Callable[[str], Any], idle_timeout: float = 0) -> None:
+        self.loader = loader
+        self.idle_timeout = idle_timeout
+        self._models: Dict[str, Tuple[Any, float]] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._users: Dict[str, int] = {}
+        self._sweeper: threading.Thread | None = None
+
+    def get(self, name: str) -> Any:
+        """Return model ``name``, loading it on first use."""
+        return self._get(name, hold=False)
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Any]:
+        """Hold model ``name`` for the duration of the ``with`` block.
+
+        The model is not evicted while held, and its idle time restarts when
+        the block exits.
+        """
+        model = self._get(name, hold=True)
+        try:
+            yield model
+        finally:
+            with self._lock:
+                users = self._users.get(name, 0) - 1
+                if users > 0:
+                    self._users[name] = users
+                else:
+                    self._users.pop(name, None)
+                entry = self._models.get(name)
+                if entry is not None and entry[0] is model:
+                    self._models[name] = (model, time.monotonic())
+
+    def _hold(self, name: str, hold: bool) -> None:
+        if hold:
+            self._users[name] = self._users.get(name, 0) + 1
+
+    def _get(self, name: str, hold: bool) -> Any:
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                self._models[name] = (entry[0], time.monotonic())
+                self._hold(name, hold)
+                return entry[0]
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            with self._lock:
+                entry = self._models.get(name)
+                if entry is not None:
+                    self._hold(name, hold)
+                    return entry[0]
+            logger.info("Loading model %s", name)
+            model = self.loader(name)
+            with self._lock:
+                self._models[name] = (model, time.monotonic())
+                self._hold(name, hold)
+            self._start_sweeper()
+            return model
+
+    def loaded(self) -> list[str]:
+        with self._lock:
+            return list(self._models)
+
+    def evict_idle(self, now: float | None = None) -> list[str]:
+        """Drop models unused for ``idle_timeout`` seconds and return their names."""
+        if self.idle_timeout <= 0:
+            return []
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            stale = [
+                n
+                for n, (_, used) in self._models.items()
+                if now - used >= self.idle_timeout and not self._users.get(n)
+            ]
+            for name in stale:
+                del self._models[name]
+        for name in stale:
+            logger.info("Evicted idle model %s", name)
+        return stale
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+    def _start_sweeper(self) -> None:
+        if self.idle_timeout <= 0 or (self._sweeper and self._sweeper.is_alive()):
+            return
+
+        def _sweep() -> None:
+            while True:
+                time.sleep(min(self.idle_timeout, 60))
+                self.evict_idle()
+                with self._lock:
+                    if not self._models:
+                        self._sweeper = None
+                        return
+
+        self._sweeper = threading.Thread(target=_sweep, name="model-sweeper", daemon=True)
+        self._sweeper.start()
+
+
+__all__ = ["ModelRegistry"]
@@ -0,0 +1,327 @@
+"""Adaptive per-provider rate limiting and retries for LLM calls.
+
+Each provider gets an :class:`AdaptiveLimiter` combining three controls:
+
+* a token bucket capping requests per second (``<PROVIDER>_RATE``, 0 = off);
+* a concurrency limit that starts at ``<PROVIDER>_CONCURRENCY`` and adapts
+  additive-increase/multiplicative-decrease: it halves when the provider
+  throttles, times out or fails with a 5xx, shrinks slightly when latency
+  climbs well above its running average and creeps back up on success;
+* retries with full-jitter exponential backoff that honour ``Retry-After``
+  (and OpenAI's ``retry-after-ms``).  A ``Retry-After`` pauses every caller
+  of that provider, not only the one that received it.
+
+Threads and coroutines wait in one first-come queue.  A freed slot is handed
+to the waiter at its head by :meth:`AdaptiveLimiter.release`, which wakes a
+coroutine through its event loop, so async callers never poll.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+# exception class names raised by the SDKs for transient network failures
+RETRYABLE_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectError",
+    "ConnectTimeout",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    "TimeoutException",
+}
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    """Return the HTTP status carried by ``exc`` if any."""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Return ``True`` for throttling, timeouts and transient server errors."""
+    if status_code(exc) in RETRYABLE_STATUS:
+        return True
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in RETRYABLE_NAMES for cls in type(exc).__mro__)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Return the server-requested delay in seconds, if ``exc`` carries one."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return max(0.0, float(value) / 1000)
+        value = headers.get("retry-after")
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _resolve(future: "asyncio.Future[None]") -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _Waiter:
+    """A queued caller; ``future`` and ``loop`` are set for coroutines."""
+
+    __slots__ = ("admitted", "future", "loop")
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.admitted = False
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+
+
+class AdaptiveLimiter:
+    """Token bucket plus adaptive concurrency limit for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        rate: float = 0.0,
+        burst: Optional[float] = None,
+        *,
+        max_attempts: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        latency_factor: float = 3.0,
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.rate = max(0.0, rate)
+        self.burst = burst if burst is not None else max(1.0, self.rate)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.latency_factor = latency_factor
+        self.latency: Optional[float] = None
+        self.throttled = 0
+        self.retries = 0
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._active = 0
+        self._cond = threading.Condition()
+        self._waiters: deque[_Waiter] = deque()
+
+    # --- admission -------------------------------------------------------
+
+    def _wait_time(self, now: float) -> Optional[float]:
+        """Return how long to wait before a call may start (0 = go now).
+
+        ``None`` means no slot is free; :meth:`release` hands one on.
+        """
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._active >= max(1, int(self.limit)):
+            return None
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+        return 0.0
+
+    def _admit(self) -> None:
+        if self.rate > 0:
+            self._tokens -= 1
+        self._active += 1
+
+    def _enter(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[_Waiter]:
+        """Admit the caller at once or queue it; the lock must be held."""
+        if not self._waiters and self._wait_time(time.monotonic()) == 0:
+            self._admit()
+            return None
+        waiter = _Waiter(loop)
+        self._waiters.append(waiter)
+        return waiter
+
+    def _grant(self) -> None:
+        """Admit queued waiters in arrival order while calls may start."""
+        notify = False
+        while self._waiters and self._wait_time(time.monotonic()) == 0:
+            waiter = self._waiters.popleft()
+            if waiter.loop is not None:
+                try:
+                    waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+                except RuntimeError:
+                    continue  # its event loop has closed
+            else:
+                notify = True
+            self._admit()
+            waiter.admitted = True
+        if notify:
+            self._cond.notify_all()
+
+    def acquire(self) -> None:
+        with self._cond:
+            waiter = self._enter()
+            while waiter is not None and not waiter.admitted:
+                self._cond.wait(self._wait_time(time.monotonic()))
+                self._grant()
+
+    async def acquire_async(self) -> None:
+        """Like :meth:`acquire` but yields to the event loop while waiting."""
+        with self._cond:
+            waiter = self._enter(asyncio.get_running_loop())
+        if waiter is None:
+            return
+        try:
+            while True:
+                with self._cond:
+                    self._grant()
+                    if waiter.admitted:
+                        return
+                    # ``None`` waits for release(); a delay re-checks the
+                    # pause or token bucket once it has passed
+                    delay = self._wait_time(time.monotonic())
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond:
+                if waiter.admitted:
+                    self._active -= 1
+                else:
+                    self._waiters.remove(waiter)
+                self._grant()
+            raise
+
+    def release(self, latency: Optional[float] = None, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self._active -= 1
+            if error is not None:
+                if is_retryable(error):
+                    self._decrease(0.5)
+            elif latency is not None:
+                if self.latency is not None and latency > self.latency * self.latency_factor:
+                    self._decrease(0.9)
+                else:
+                    self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self._grant()
+
+    def _decrease(self, factor: float) -> None:
+        self.limit = max(1.0, self.limit * factor)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every new call for ``seconds``."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.throttled += 1
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one admission slot; errors raised inside shrink the limit."""
+        self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as exc:
+            self.release(error=exc)
+            raise
+        self.release(latency=time.monotonic() - start)
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[None]:
+        await self.acquire_async()
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as exc:
+            self.release(error=exc)
+            raise
+        self.release(latency=time.monotonic() - start)
+
+    # --- retries ---------------------------------------------------------
+
+    def backoff(self, attempt: int, exc: BaseException) -> float:
+        """Return the delay before retry ``attempt`` (1-based) after ``exc``."""
+        hinted = retry_after(exc)
+        if hinted is not None:
+            return min(hinted, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` within a slot, retrying transient failures."""
+        attempt = 1
+        while True:
+            try:
+                with self.slot():
+                    return fn()
+            except Exception as exc:
+                time.sleep(self._retry_delay(attempt, exc))
+                attempt += 1
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn()`` within a slot, retrying transient failures."""
+        attempt = 1
+        while True:
+            try:
+                async with self.slot_async():
+                    return await fn()
+            except Exception as exc:
+                await asyncio.sleep(self._retry_delay(attempt, exc))
+                attempt += 1
+
+    def _retry_delay(self, attempt: int, exc: Exception) -> float:
+        """Return the delay before retrying ``exc``, or re-raise it if final."""
+        if not is_retryable(exc) or attempt >= self.max_attempts:
+            raise exc
+        delay = self.backoff(attempt, exc)
+        if retry_after(exc) is not None or status_code(exc) == 429:
+            self.pause(delay)
+        with self._cond:
+            self.retries += 1
+        logger.warning(
+            "%s request failed (%s); retry %d/%d in %.1fs",
+            self.name,
+            exc,
+            attempt,
+            self.max_attempts - 1,
+            delay,
+        )
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "active": self._active,
+                "waiting": len(self._waiters),
+                "latency": self.latency,
+                "throttled": self.throttled,
+                "retries": self.retries,
+            }
+
+
+__all__ = ["AdaptiveLimiter", "is_retryable", "retry_after", "status_code"]
@@ -0,0 +1,261 @@
+"""Remove prompt-injection phrases and other unwanted text in a single pass.
+
+A :class:`Sanitizer` compiles every rule into one regular expression, so a
+transcript is scanned once no matter how many rules there are:
+
+* literal phrases are merged into a prefix trie (``ignore previous
+  instructions`` and ``ignore prior instructions`` share ``ignore\\s+p``)
+  that is only followed from word starts, so the work per character is
+  bounded by the alphabet rather than the number of phrases;
+* ``re:`` rules become named alternatives after the trie.
+
+With only a few literal phrases the combined regex is slower than looking
+for each phrase's first word with ``str.find``, which runs at memory speed.
+Up to ``_PREFILTER_MAX`` phrases (and no ``re:`` rules) the pattern is only
+tried where one of those words occurs.
+
+Matching is case-insensitive.  The text is lower-cased once and matched
+case-sensitively, which lets the regex engine skip trie branches on a single
+character comparison.
+
+Each match is reported with the id of the rule that fired.  Rules are read
+from a plain text file, one ``<id> <pattern>`` per line; see
+``sanitize_rules.txt`` next to this module for the format and the defaults.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from importlib import resources
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLACEMENT = "[removed]"
+REGEX_PREFIX = "re:"
+
+_RULE_ID = re.compile(r"^[\w.\-]+$")
+# marks the end of a phrase inside a trie node
+_END = ""
+# with at most this many distinct first characters the regex engine's
+# first-character scan skips most of the text, so the word-boundary check is
+# placed after it; with more, checking the boundary first is cheaper
+_PREFIX_SCAN_MAX = 12
+# up to this many literal phrases, only positions found by str.find on each
+# phrase's first word are matched against the pattern
+_PREFILTER_MAX = 48
+
+
+class Rule(NamedTuple):
+    id: str
+    pattern: str
+    regex: bool = False
+
+
+class Match(NamedTuple):
+    rule: str
+    start: int
+    end: int
+    text: str
+
+
+def _normalize(phrase: str) -> str:
+    return " ".join(phrase.lower().split())
+
+
+def parse_rules(lines: Iterable[str], source: str = "<rules>") -> List[Rule]:
+    """Parse ``<id> <pattern>`` lines, skipping blanks and ``#`` comments.
+
+    Raises ``ValueError`` naming ``source`` and the line for malformed rules
+    or invalid regular expressions.
+    """
+    rules: List[Rule] = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        rule_id, _, pattern = line.partition(" ")
+        pattern = pattern.strip()
+        if not pattern or not _RULE_ID.match(rule_id):
+            raise ValueError(f"{source}:{number}: expected '<id> <pattern>'")
+        if pattern.startswith(REGEX_PREFIX):
+            pattern = pattern[len(REGEX_PREFIX):].strip()
+            try:
+                re.compile(pattern, re.IGNORECASE)
+            except re.error as exc:
+                raise ValueError(f"{source}:{number}: {exc}") from None
+            rules.append(Rule(rule_id, pattern, True))
+        else:
+            rules.append(Rule(rule_id, pattern))
+    return rules
+
+
+def _is_word(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _atom(char: str) -> str:
+    return r"\s+" if char == " " else re.escape(char)
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Return a regex matching every phrase in ``node``, longest first."""
+    end = node.get(_END)
+    branches = [_atom(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return end or ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if end is None:
+        return body
+    return f"(?:{body}|{end})"
+
+
+def _phrase_pattern(trie: Dict[str, dict]) -> str:
+    """Return the trie as a regex; phrases starting with a word character
+    must not follow another word character."""
+    if len(trie) > _PREFIX_SCAN_MAX:
+        words = {ch: child for ch, child in trie.items() if _is_word(ch)}
+        others = {ch: child for ch, child in trie.items() if not _is_word(ch)}
+        parts = [rf"(?<!\w){_trie_pattern(words)}"] if words else []
+        if others:
+            parts.append(_trie_pattern(others))
+        return "|".join(parts)
+    # "(?<!\w.)" after the first character checks the one before it
+    return "|".join(
+        _atom(ch) + (r"(?<!\w.)" if _is_word(ch) else "") + _trie_pattern(child)
+        for ch, child in sorted(trie.items())
+    )
+
+
+class Sanitizer:
+    """Match and replace all ``rules`` in one scan of the text."""
+
+    def __init__(self, rules: Iterable[Rule], replacement: str = DEFAULT_REPLACEMENT) -> None:
+        self.rules = list(rules)
+        self.replacement = replacement
+        self._phrases: Dict[str, str] = {}
+        self._groups: Dict[str, str] = {}
+        trie: Dict[str, dict] = {}
+        alternatives: List[str] = []
+        for rule in self.rules:
+            if rule.regex:
+                group = f"r{len(self._groups)}"
+                self._groups[group] = rule.id
+                alternatives.append(f"(?P<{group}>(?i:{rule.pattern}))")
+                continue
+            phrase = _normalize(rule.pattern)
+            if phrase in self._phrases:
+                logger.warning(
+                    "Sanitize rule %s repeats the phrase of %s", rule.id, self._phrases[phrase]
+                )
+                continue
+            self._phrases[phrase] = rule.id
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            # only require a word boundary where the phrase ends in a word
+            node[_END] = r"(?!\w)" if _is_word(phrase[-1]) else ""
+        if trie:
+            alternatives.insert(0, f"(?P<phrase>{_phrase_pattern(trie)})")
+        self._prefixes: List[str] = []
+        if not self._groups and len(self._phrases) <= _PREFILTER_MAX:
+            # a word that starts with another listed word adds no positions
+            words = sorted({p.split(" ")[0] for p in self._phrases}, key=len)
+            for word in words:
+                if not any(word.startswith(w) for w in self._prefixes):
+                    self._prefixes.append(word)
+        source = "|".join(alternatives)
+        # ``pattern`` runs on lower-cased text; ``_folding`` is for the rare
+        # text whose length changes when lower-cased
+        self.pattern: Optional[re.Pattern[str]] = re.compile(source) if alternatives else None
+        self._folding = re.compile(source, re.IGNORECASE) if alternatives else None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def _rule_for(self, match: re.Match[str]) -> str:
+        group = match.lastgroup
+        if group != "phrase":
+            return self._groups[group]
+        phrase = _normalize(match.group())
+        rule = self._phrases.get(phrase)
+        if rule is None:
+            # only reachable through ``_folding``, whose case rules can
+            # differ from str.lower(); compare each phrase directly
+            rule = next(
+                (
+                    r
+                    for p, r in self._phrases.items()
+                    if re.fullmatch(r"\s+".join(map(re.escape, p.split(" "))), phrase, re.IGNORECASE)
+                ),
+                "phrase",
+            )
+        return rule
+
+    def finditer(self, text: str) -> Iterator[Match]:
+        """Yield every non-overlapping match in ``text`` with its rule id."""
+        if self.pattern is None:
+            return
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            if self._prefixes:
+                matches = self._prefiltered(lowered)
+            else:
+                matches = self.pattern.finditer(lowered)
+        else:
+            matches = self._folding.finditer(text)
+        for match in matches:
+            start, end = match.span()
+            yield Match(self._rule_for(match), start, end, text[start:end])
+
+    def _prefiltered(self, lowered: str) -> Iterator[re.Match[str]]:
+        """Yield the same matches as ``pattern.finditer`` from candidate starts."""
+        starts: List[int] = []
+        find = lowered.find
+        for word in self._prefixes:
+            pos = find(word)
+            while pos >= 0:
+                starts.append(pos)
+                pos = find(word, pos + 1)
+        starts.sort()
+        end = 0
+        for pos in starts:
+            if pos < end:
+                continue
+            match = self.pattern.match(lowered, pos)
+            if match:
+                end = match.end()
+                yield match
+
+    def sanitize(self, text: str) -> Tuple[str, List[Match]]:
+        """Return ``text`` with matches replaced, and the matches themselves."""
+        hits = list(self.finditer(text))
+        if not hits:
+            return text, hits
+        pieces: List[str] = []
+        pos = 0
+        for hit in hits:
+            pieces.append(text[pos:hit.start])
+            pieces.append(self.replacement)
+            pos = hit.end
+        pieces.append(text[pos:])
+        return "".join(pieces), hits
+
+
+def load_rules(path: Optional[Path] = None, replacement: str = DEFAULT_REPLACEMENT) -> Sanitizer:
+    """Build a :class:`Sanitizer` from the rules file at ``path``.
+
+    Without ``path`` the ``sanitize_rules.txt`` shipped with the package is
+    used.
+    """
+    if path is None:
+        resource = resources.files(__package__).joinpath("sanitize_rules.txt")
+        text, source = resource.read_text(encoding="utf-8"), "sanitize_rules.txt"
+    else:
+        text, source = Path(path).read_text(encoding="utf-8"), str(path)
+    return Sanitizer(parse_rules(text.splitlines(), source), replacement)
+
+
+__all__ = ["DEFAULT_REPLACEMENT", "Match", "Rule", "Sanitizer", "load_rules", "parse_rules"]
@@ -0,0 +1,120 @@
+"""Per-media-class work lanes for the ingest loop.
+
+Files used to be processed in directory order, so one long video at the front
+of ``input`` held up every quick note behind it.  :class:`LaneScheduler` keeps
+a separate queue and worker pool for each lane (text, image, audio, video).
+Cheap text work is picked up straight away while heavy media drains in the
+background at its own concurrency.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LaneScheduler:
+    """Run ``handler`` on paths using one worker pool per lane.
+
+    ``classify`` maps a path to a lane name and ``limits`` gives the number of
+    files each lane processes at once.  Paths already queued or running are
+    not submitted twice, so repeated folder scans are safe.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Path], bool],
+        classify: Callable[[Path], str],
+        limits: Dict[str, int],
+    ) -> None:
+        self.handler = handler
+        self.classify = classify
+        self.limits = {lane: max(1, n) for lane, n in limits.items()}
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._pending: Dict[Path, str] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def _pool(self, lane: str) -> ThreadPoolExecutor:
+        pool = self._pools.get(lane)
+        if pool is None:
+            pool = ThreadPoolExecutor(
+                max_workers=self.limits.get(lane, 1),
+                thread_name_prefix=f"ingest-{lane}",
+            )
+            self._pools[lane] = pool
+        return pool
+
+    def submit(self, path: Path) -> Optional[Future]:
+        """Queue ``path`` on its lane; return ``None`` if it is already queued."""
+        lane = self.classify(path)
+        with self._lock:
+            if path in self._pending:
+                return None
+            self._pending[path] = lane
+            pool = self._pool(lane)
+        return pool.submit(self._run, lane, path, time.monotonic())
+
+    def submit_all(self, paths: Iterable[Path]) -> List[Future]:
+        return [f for f in (self.submit(p) for p in paths) if f is not None]
+
+    def _run(self, lane: str, path: Path, queued: float) -> bool:
+        started = time.monotonic()
+        ok = False
+        try:
+            if path.is_file():
+                ok = bool(self.handler(path))
+        except Exception:
+            logger.exception("Unhandled error processing %s", path.name)
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._pending.pop(path, None)
+                stats = self._stats.setdefault(
+                    lane, {"files": 0, "failed": 0, "busy": 0.0, "max_wait": 0.0}
+                )
+                stats["files"] += 1
+                stats["failed"] += 0 if ok else 1
+                stats["busy"] += finished - started
+                stats["max_wait"] = max(stats["max_wait"], started - queued)
+        return ok
+
+    def pending(self) -> int:
+        """Return the number of files queued or in progress."""
+        with self._lock:
+            return len(self._pending)
+
+    def pending_by_lane(self) -> Dict[str, int]:
+        """Return the number of files queued or in progress in each lane."""
+        with self._lock:
+            counts = {lane: 0 for lane in self.limits}
+            for lane in self._pending.values():
+                counts[lane] = counts.get(lane, 0) + 1
+            return counts
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return per-lane counts, busy seconds and the longest queue wait."""
+        with self._lock:
+            return {lane: dict(values) for lane, values in self._stats.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+    def __enter__(self) -> "LaneScheduler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+
+
+__all__ = ["LaneScheduler"]
@@ -1,6 +1,9 @@
 import json
 import os
+import shutil
+import struct
 from pathlib import Path
+from typing import BinaryIO
 
 from cryptography.fernet import Fernet, InvalidToken
 
@@ -79,3 +82,132 @@ def decrypt_bytes(data: bytes, fernet: Fernet) -> bytes:
         return fernet.decrypt(data)
     except InvalidToken:
         return data
+
+
+# Streaming format for large originals: STREAM_MAGIC and a random 16-byte stream
+# id, followed by records of a 4-byte big-endian length and a Fernet token.  Each
+# token holds the stream id, an 8-byte chunk index, a 1-byte "last chunk" flag and
+# up to STREAM_CHUNK_SIZE bytes of data, so chunks spliced in from another file,
+# reordered, dropped or truncated chunks and bytes after the last chunk all fail
+# to decrypt.
+STREAM_MAGIC = b"DPSTREAM1\n"
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAM_ID_SIZE = 16
+_CHUNK_HEADER = struct.Struct(f">{STREAM_ID_SIZE}sQB")
+_RECORD_LEN = struct.Struct(">I")
+
+
+def _max_token_len(chunk_size: int) -> int:
+    """Return the length of a Fernet token for a full ``chunk_size`` chunk."""
+    # version, timestamp, IV and HMAC around the PKCS7-padded ciphertext
+    raw = 57 + ((_CHUNK_HEADER.size + chunk_size) // 16 + 1) * 16
+    return (raw + 2) // 3 * 4
+
+
+def encrypt_stream(
+    reader: BinaryIO, writer: BinaryIO, fernet: Fernet, chunk_size: int = STREAM_CHUNK_SIZE
+) -> None:
+    """Encrypt everything from ``reader`` into ``writer`` one chunk at a time.
+
+    ``chunk_size`` may not exceed ``STREAM_CHUNK_SIZE``, the largest chunk
+    :func:`decrypt_stream` accepts.
+    """
+    if not 0 < chunk_size <= STREAM_CHUNK_SIZE:
+        raise ValueError(f"chunk_size must be between 1 and {STREAM_CHUNK_SIZE}")
+    stream_id = os.urandom(STREAM_ID_SIZE)
+    writer.write(STREAM_MAGIC + stream_id)
+    index = 0
+    chunk = reader.read(chunk_size)
+    while True:
+        following = reader.read(chunk_size) if chunk else b""
+        last = not following
+        token = fernet.encrypt(_CHUNK_HEADER.pack(stream_id, index, int(last)) + chunk)
+        writer.write(_RECORD_LEN.pack(len(token)))
+        writer.write(token)
+        if last:
+            return
+        chunk = following
+        index += 1
+
+
+def decrypt_stream(reader: BinaryIO, writer: BinaryIO, fernet: Fernet) -> None:
+    """Decrypt a stream written by :func:`encrypt_stream` into ``writer``.
+
+    Raises :class:`~cryptography.fernet.InvalidToken` if any chunk fails to
+    authenticate, belongs to another stream, is out of order or larger than
+    a ``STREAM_CHUNK_SIZE`` chunk, or the stream ends before its last chunk
+    or continues after it.
+    """
+    if reader.read(len(STREAM_MAGIC)) != STREAM_MAGIC:
+        raise InvalidToken
+    stream_id = reader.read(STREAM_ID_SIZE)
+    if len(stream_id) != STREAM_ID_SIZE:
+        raise InvalidToken
+    max_len = _max_token_len(STREAM_CHUNK_SIZE)
+    expected = 0
+    while True:
+        raw_len = reader.read(_RECORD_LEN.size)
+        if len(raw_len) != _RECORD_LEN.size:
+            raise InvalidToken
+        (length,) = _RECORD_LEN.unpack(raw_len)
+        # checked before reading so a corrupt length cannot demand 4 GiB
+        if length > max_len:
+            raise InvalidToken
+        token = reader.read(length)
+        if len(token) != length:
+            raise InvalidToken
+        plain = fernet.decrypt(token)
+        if len(plain) < _CHUNK_HEADER.size:
+            raise InvalidToken
+        chunk_id, index, last = _CHUNK_HEADER.unpack_from(plain)
+        if chunk_id != stream_id or index != expected:
+            raise InvalidToken
+        writer.write(plain[_CHUNK_HEADER.size :])
+        if last:
+            if reader.read(1):
+                raise InvalidToken
+            return
+        expected += 1
+
+
+def is_stream_encrypted(path: Path) -> bool:
+    """Return True if ``path`` uses the chunked streaming format."""
+    with open(path, "rb") as f:
+        return f.read(len(STREAM_MAGIC)) == STREAM_MAGIC
+
+
+def encrypt_file(src: Path, dest: Path, fernet: Fernet) -> None:
+    """Encrypt ``src`` into ``dest`` with constant memory.
+
+    If ``PLAINTEXT_MEMORIES`` is set, copy ``src`` unchanged.
+    """
+    tmp = dest.with_name(dest.name + ".part")
+    try:
+        with open(src, "rb") as reader, open(tmp, "wb") as writer:
+            if PLAINTEXT:
+                shutil.copyfileobj(reader, writer, STREAM_CHUNK_SIZE)
+            else:
+                encrypt_stream(reader, writer, fernet, STREAM_CHUNK_SIZE)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, dest)
+
+
+def decrypt_file(src: Path, dest: Path, fernet: Fernet) -> None:
+    """Decrypt ``src`` into ``dest``.
+
+    Streaming files are decrypted chunk by chunk; older whole-file Fernet
+    tokens and plain files are handled like :func:`decrypt_bytes`.
+    """
+    if PLAINTEXT or not is_stream_encrypted(src):
+        dest.write_bytes(decrypt_bytes(src.read_bytes(), fernet))
+        return
+    tmp = dest.with_name(dest.name + ".part")
+    try:
+        with open(src, "rb") as reader, open(tmp, "wb") as writer:
+            decrypt_stream(reader, writer, fernet)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, dest)
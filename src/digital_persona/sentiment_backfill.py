@@ -0,0 +1,131 @@
+"""Backfill sentiment labels for existing memories in batches.
+
+Many notes and Limitless lifelogs were ingested without a ``sentiment`` field.
+Classifying them one request at a time means thousands of tiny round trips, so
+this module packs as many texts as fit in a token budget into each request via
+:func:`digital_persona.ingest._analyze_sentiment_batch` and writes the labels
+back into the encrypted memory files.
+"""
+
+from __future__ import annotations
+
+import logging
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Iterable, Iterator, List, Tuple
+
+from . import ingest
+from .memory_store import iter_memories
+from .secure_storage import load_json_encrypted, save_json_encrypted
+
+logger = logging.getLogger(__name__)
+
+# rough characters-per-token ratio used for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Return a rough token count for ``text``."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def make_batches(
+    texts: List[str], max_tokens: int, max_items: int
+) -> Iterator[List[int]]:
+    """Yield lists of indices into ``texts`` that fit within ``max_tokens``.
+
+    A single text larger than the budget gets a batch of its own; callers
+    truncate it with :func:`_clip`.
+    """
+    batch: List[int] = []
+    used = 0
+    for i, text in enumerate(texts):
+        cost = min(estimate_tokens(text), max_tokens)
+        if batch and (used + cost > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch, used = [], 0
+        batch.append(i)
+        used += cost
+    if batch:
+        yield batch
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    return text[: max_tokens * CHARS_PER_TOKEN]
+
+
+def _memory_text(mem: dict) -> str:
+    text = mem.get("transcript") or mem.get("content") or mem.get("text") or ""
+    return text if isinstance(text, str) else ""
+
+
+def _pending(paths: Iterable[Path], force: bool) -> List[Tuple[Path, dict, str]]:
+    items = []
+    for path in paths:
+        try:
+            mem = load_json_encrypted(path, ingest.FERNET)
+        except Exception:
+            logger.warning("Skipping unreadable memory %s", path.name)
+            continue
+        if mem.get("sentiment") and not force:
+            continue
+        text = _memory_text(mem)
+        if text.strip():
+            items.append((path, mem, text))
+    return items
+
+
+def backfill_sentiment(
+    memory_dir: Path | None = None,
+    *,
+    force: bool = False,
+    max_tokens: int = 3000,
+    max_items: int = 50,
+) -> int:
+    """Label memories in ``memory_dir`` that lack ``sentiment`` and return the count.
+
+    Items the model skips in a batch reply are retried individually with
+    :func:`digital_persona.ingest._analyze_sentiment`.
+    """
+    memory_dir = memory_dir or ingest.MEMORY_DIR
+    items = _pending(list(iter_memories(memory_dir)), force)
+    texts = [_clip(text, max_tokens) for _, _, text in items]
+    updated = 0
+    for batch in make_batches(texts, max_tokens, max_items):
+        labels = ingest._analyze_sentiment_batch([texts[i] for i in batch])
+        for i, label in zip(batch, labels):
+            path, mem, _ = items[i]
+            if not label:
+                label = ingest._analyze_sentiment(texts[i])
+            if not label:
+                continue
+            mem["sentiment"] = label
+            save_json_encrypted(mem, path, ingest.FERNET)
+            updated += 1
+        logger.info("Labelled %d/%d memories", updated, len(items))
+    return updated
+
+
+def _cli() -> None:
+    parser = ArgumentParser(description="Add sentiment labels to existing memories")
+    parser.add_argument(
+        "--memory-dir",
+        type=Path,
+        default=None,
+        help="Folder of memory JSON files (default: PERSONA_DIR/memory)",
+    )
+    parser.add_argument("--force", action="store_true", help="Relabel memories that already have a sentiment")
+    parser.add_argument("--max-tokens", type=int, default=3000, help="Approximate token budget per request")
+    parser.add_argument("--batch-size", type=int, default=50, help="Maximum texts per request")
+    args = parser.parse_args()
+    count = backfill_sentiment(
+        args.memory_dir,
+        force=args.force,
+        max_tokens=args.max_tokens,
+        max_items=args.batch_size,
+    )
+    logger.info("Updated %d memories", count)
+
+
+if __name__ == "__main__":
+    _cli()
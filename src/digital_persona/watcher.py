@@ -0,0 +1,110 @@
+"""Event-driven watching of the ingest input folder.
+
+On Linux the watcher uses ``inotify`` through :mod:`ctypes` and reports a file
+only once it is fully written (``IN_CLOSE_WRITE``) or atomically moved into the
+folder (``IN_MOVED_TO``).  Other platforms get ``None`` from
+:func:`create_watcher` so callers can fall back to polling.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+from pathlib import Path
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Report files that finished arriving in ``directory``."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(self.directory), IN_CLOSE_WRITE | IN_MOVED_TO
+        )
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(err, os.strerror(err), str(self.directory))
+        self.overflowed = False
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def wait(self, timeout: float | None = None) -> List[Path]:
+        """Block up to ``timeout`` seconds and return newly completed files.
+
+        Paths are returned once each, in arrival order.  ``overflowed`` is set
+        when the kernel dropped events so the caller should rescan the folder.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        paths: dict[Path, None] = {}
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+            offset = 0
+            while offset + _EVENT.size <= len(buf):
+                _wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                raw = buf[offset : offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    self.overflowed = True
+                    continue
+                if mask & IN_ISDIR or not raw:
+                    continue
+                paths[self.directory / os.fsdecode(raw)] = None
+        return list(paths)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "InotifyWatcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def create_watcher(directory: Path) -> InotifyWatcher | None:
+    """Return an :class:`InotifyWatcher` for ``directory`` if supported."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return InotifyWatcher(directory)
+    except (OSError, AttributeError, TypeError):
+        logger.warning("inotify unavailable; falling back to polling", exc_info=True)
+        return None
+
+
+__all__ = ["InotifyWatcher", "create_watcher"]
@@ -90,7 +90,7 @@ def test_memory_file_encrypted(client, api_module):
     resp = client.post("/memory/save", json={"text": "secret"})
     ts = resp.json()["timestamp"]
     safe_ts = secure_filename(ts.replace(":", "-"))
-    path = api_module.MEMORY_DIR / f"{safe_ts}.json"
+    path = api_module.MEMORY_DIR / ts[:4] / ts[5:7] / ts[8:10] / f"{safe_ts}.json"
     raw = path.read_bytes()
     assert not raw.lstrip().startswith(b"{")
 
@@ -124,6 +124,32 @@ def test_pending_and_complete(client, api_module):
     assert resp.json()["files"] == []
 
 
+def test_timeline_range_and_sharded_pending(client, api_module):
+    from digital_persona.secure_storage import save_json_encrypted
+
+    for ts in ("2023-12-31T23:00:00", "2024-01-15T08:00:00", "2024-02-01T09:00:00"):
+        resp = client.post("/memory/save", json={"text": ts, "timestamp": ts})
+        assert resp.status_code == 200
+    shard = api_module.MEMORY_DIR / "2024" / "01" / "20"
+    shard.mkdir(parents=True)
+    save_json_encrypted({"content": "info"}, shard / "data.json", api_module.FERNET)
+
+    timeline = client.get("/memory/timeline", params={"start": "2024-01-01", "end": "2024-01-31"})
+    assert [m["text"] for m in timeline.json()] == ["2024-01-15T08:00:00"]
+    assert client.get("/memory/timeline", params={"start": "soon"}).status_code == 400
+
+    files = client.get("/pending").json()["files"]
+    assert "2024/01/20/data.json" in files
+    resp = client.get("/start_interview", params={"file": "2024/01/20/data.json"})
+    assert resp.json()["text"] == "info"
+    resp = client.get("/start_interview", params={"file": "data.json"})
+    assert resp.json()["text"] == "info"
+    resp = client.get("/start_interview", params={"file": "../secret.json"})
+    assert resp.status_code == 400
+    resp = client.get("/start_interview", params={"file": "2024/01/21/data.json"})
+    assert resp.status_code == 404
+
+
 def test_start_interview_bad_memory_file(client, api_module):
     path = api_module.MEMORY_DIR / "bad.json"
     path.write_text("not-json", encoding="utf-8")
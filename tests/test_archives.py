@@ -0,0 +1,115 @@
+import io
+import json
+import tarfile
+import zipfile
+
+from digital_persona.archives import (
+    is_archive,
+    iter_archive,
+    iter_mbox_messages,
+    message_to_note,
+)
+
+
+MBOX = (
+    b"From alice@example.com Mon Jan  1 00:00:00 2024\n"
+    b"From: Alice <alice@example.com>\n"
+    b"To: Bob <bob@example.com>\n"
+    b"Subject: Lunch\n"
+    b"Date: Mon, 01 Jan 2024 12:00:00 +0000\n"
+    b"Message-ID: <1@example.com>\n"
+    b"\n"
+    b"See you at noon.\n"
+    b">From the office\n"
+    b"\n"
+    b"From bob@example.com Tue Jan  2 00:00:00 2024\n"
+    b"From: Bob <bob@example.com>\n"
+    b"Subject: Re: Lunch\n"
+    b"Content-Type: text/html\n"
+    b"\n"
+    b"<p>Sounds <b>good</b></p>\n"
+)
+
+
+def _read_all(path):
+    return [(name, stream.read()) for name, stream in iter_archive(path)]
+
+
+def test_is_archive():
+    assert is_archive("export.zip")
+    assert is_archive("backup.tar.gz")
+    assert is_archive("mail.MBOX")
+    assert not is_archive("note.txt")
+
+
+def test_mbox_messages_split_and_unquoted():
+    messages = list(iter_mbox_messages(io.BytesIO(MBOX)))
+    assert len(messages) == 2
+    assert b"\nFrom the office\n" in messages[0]
+    note = message_to_note(messages[0])
+    assert note["content"] == "Subject: Lunch\n\nSee you at noon.\nFrom the office"
+    assert note["from"] == "Alice <alice@example.com>"
+    assert note["message_id"] == "<1@example.com>"
+    assert note["timestamp"].startswith("2024-01-01T12:00:00")
+    html = message_to_note(messages[1])
+    assert html["content"] == "Subject: Re: Lunch\n\nSounds good"
+
+
+def test_iter_mbox_file(tmp_path):
+    mbox = tmp_path / "inbox.mbox"
+    mbox.write_bytes(MBOX)
+    items = _read_all(mbox)
+    assert [name for name, _ in items] == ["inbox-000001.json", "inbox-000002.json"]
+    assert json.loads(items[0][1])["type"] == "email"
+
+
+def test_iter_zip_takeout(tmp_path):
+    archive = tmp_path / "takeout.zip"
+    keep = {
+        "title": "Groceries",
+        "textContent": "",
+        "listContent": [{"text": "milk", "isChecked": True}, {"text": "eggs", "isChecked": False}],
+        "userEditedTimestampUsec": 1704067200000000,
+        "isTrashed": False,
+    }
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("Takeout/Keep/Groceries.json", json.dumps(keep))
+        zf.writestr("Takeout/Google Photos/2024/IMG_1.jpg", b"jpeg")
+        zf.writestr("Takeout/Google Photos/2024/IMG_1.jpg.json", b"{}")
+        zf.writestr("Takeout/Mail/All mail.mbox", MBOX)
+        zf.writestr("Takeout/archive_browser.html", b"<html></html>")
+        zf.writestr("__MACOSX/._IMG_1.jpg", b"")
+        zf.writestr("nested.zip", b"PK")
+    items = dict(_read_all(archive))
+    assert sorted(items) == [
+        "All mail-000001.json",
+        "All mail-000002.json",
+        "Groceries.json",
+        "IMG_1.jpg",
+    ]
+    note = json.loads(items["Groceries.json"])
+    assert note["content"] == "Groceries\n[x] milk\n[ ] eggs"
+    assert note["timestamp"].startswith("2024-01-01T00:00:00")
+    assert items["IMG_1.jpg"] == b"jpeg"
+
+
+def test_iter_zip_skips_unreadable_member(tmp_path):
+    archive = tmp_path / "export.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for name in ("a.txt", "b.txt", "c.txt"):
+            zf.writestr(name, name.encode())
+        offset = zf.getinfo("b.txt").header_offset
+    data = bytearray(archive.read_bytes())
+    data[offset : offset + 4] = b"XXXX"
+    archive.write_bytes(bytes(data))
+    assert [name for name, _ in _read_all(archive)] == ["a.txt", "c.txt"]
+
+
+def test_iter_tar_gz(tmp_path):
+    archive = tmp_path / "notes.tar.gz"
+    with tarfile.open(archive, "w:gz") as tf:
+        for name, data in [("notes/a.txt", b"alpha"), ("notes/b.txt", b"beta")]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    assert _read_all(archive) == [("a.txt", b"alpha"), ("b.txt", b"beta")]
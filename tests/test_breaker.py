@@ -0,0 +1,65 @@
+import threading
+import time
+
+from digital_persona.breaker import CircuitBreaker
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker("ollama", threshold=3, probe_interval=60)
+    for _ in range(2):
+        breaker.record_failure(ConnectionError())
+    assert breaker.allow()
+    breaker.record_failure(ConnectionError())
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def test_success_resets_count():
+    breaker = CircuitBreaker("ollama", threshold=2, probe_interval=60)
+    breaker.record_failure(ConnectionError())
+    breaker.record_success()
+    breaker.record_failure(ConnectionError())
+    assert breaker.state == "closed"
+
+
+def test_uncounted_errors_ignored():
+    breaker = CircuitBreaker(
+        "ollama", threshold=1, should_count=lambda exc: isinstance(exc, ConnectionError)
+    )
+    breaker.record_failure(ValueError("bad prompt"))
+    assert breaker.state == "closed"
+
+
+def test_background_probe_closes_circuit():
+    healthy = threading.Event()
+    probes = []
+
+    def probe():
+        probes.append(1)
+        if not healthy.is_set():
+            raise ConnectionError()
+
+    breaker = CircuitBreaker("ollama", threshold=1, probe=probe, probe_interval=0.01)
+    breaker.record_failure(ConnectionError())
+    assert not breaker.allow()
+    deadline = time.monotonic() + 5
+    while not probes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    healthy.set()
+    while breaker.state == "open" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert breaker.state == "closed"
+    breaker.close()
+
+
+def test_trial_call_without_probe():
+    breaker = CircuitBreaker("openai", threshold=1, probe_interval=0.01)
+    breaker.record_failure(ConnectionError())
+    assert not breaker.allow()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure(ConnectionError())
+    assert breaker.state == "open"
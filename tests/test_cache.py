@@ -0,0 +1,60 @@
+from digital_persona.cache import EnrichmentCache
+from digital_persona.secure_storage import get_fernet
+
+
+def test_cache_roundtrip_and_stats(tmp_path):
+    fernet = get_fernet(tmp_path)
+    cache = EnrichmentCache(tmp_path / "cache", fernet, max_bytes=10_000)
+    key = EnrichmentCache.make_key("abc", "ollama", "llava", "prompt")
+
+    assert cache.get(key) is None
+    cache.put(key, "a red square")
+    assert cache.get(key) == "a red square"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    reopened = EnrichmentCache(tmp_path / "cache", fernet, max_bytes=10_000)
+    assert reopened.get(key) == "a red square"
+
+
+def test_cache_key_includes_prompt():
+    a = EnrichmentCache.make_key("abc", "ollama", "llava", "one")
+    b = EnrichmentCache.make_key("abc", "ollama", "llava", "two")
+    assert a != b
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    fernet = get_fernet(tmp_path)
+    cache = EnrichmentCache(tmp_path / "cache", fernet, max_bytes=10_000)
+    cache.put("a", "x")
+    cache.max_bytes = cache.size * 2
+    cache.put("b", "y")
+    assert cache.get("a") == "x"  # "a" becomes most recently used
+    cache.put("c", "z")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x"
+    assert cache.get("c") == "z"
+    assert not (tmp_path / "cache" / "b.bin").exists()
+
+
+def test_cache_index_written_lazily(tmp_path):
+    fernet = get_fernet(tmp_path)
+    index = tmp_path / "cache" / "index.json"
+    cache = EnrichmentCache(tmp_path / "cache", fernet, max_bytes=10_000, flush_interval=3600)
+    cache.put("a", "x")
+    cache.put("b", "y")
+    assert not index.exists()
+    assert cache.get("a") == "x"  # "b" is now least recently used
+    cache.flush()
+    written = index.stat().st_mtime_ns
+    cache.flush()
+    assert index.stat().st_mtime_ns == written
+
+    cache.put("c", "z")  # written after the last flush
+    reopened = EnrichmentCache(tmp_path / "cache", fernet, max_bytes=10_000)
+    assert reopened.size == cache.size
+    reopened.max_bytes = reopened.size - 1
+    reopened.put("c", "z")
+    assert reopened.get("b") is None
+    assert reopened.get("a") == "x"
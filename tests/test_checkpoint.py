@@ -0,0 +1,51 @@
+import os
+import time
+
+from cryptography.fernet import Fernet
+
+from digital_persona.checkpoint import Checkpoint, NullCheckpoint, prune_checkpoints
+
+
+def test_stage_saved_and_reloaded(tmp_path):
+    fernet = Fernet(Fernet.generate_key())
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return ["hello", []]
+
+    ckpt = Checkpoint(tmp_path, "abc", fernet)
+    assert ckpt.run("transcribe", compute) == ["hello", []]
+    assert b"hello" not in (tmp_path / "abc.json").read_bytes()
+
+    again = Checkpoint(tmp_path, "abc", fernet)
+    assert "transcribe" in again
+    assert again.run("transcribe", compute) == ["hello", []]
+    assert len(calls) == 1
+
+    again.discard()
+    assert not (tmp_path / "abc.json").exists()
+
+
+def test_unfinished_result_not_saved(tmp_path):
+    ckpt = Checkpoint(tmp_path, "abc", Fernet(Fernet.generate_key()))
+    assert ckpt.run("caption", lambda: "") == ""
+    assert "caption" not in ckpt
+    assert not (tmp_path / "abc.json").exists()
+
+
+def test_null_checkpoint_stores_nothing(tmp_path):
+    ckpt = NullCheckpoint()
+    ckpt.run("summarize", lambda: "text")
+    assert "summarize" not in ckpt
+
+
+def test_prune_checkpoints(tmp_path):
+    fernet = Fernet(Fernet.generate_key())
+    Checkpoint(tmp_path, "old", fernet).save("extract", {})
+    Checkpoint(tmp_path, "new", fernet).save("extract", {})
+    stale = time.time() - 3600
+    os.utime(tmp_path / "old.json", (stale, stale))
+
+    assert prune_checkpoints(tmp_path, 60) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["new.json"]
@@ -0,0 +1,55 @@
+import io
+
+from digital_persona.chunking import boundary, iter_chunks
+
+
+def _chunks(text, **kwargs):
+    return list(iter_chunks(io.StringIO(text), **kwargs))
+
+
+def test_boundary_detection():
+    assert boundary("# Title\n") == "heading"
+    assert boundary("### Section ###\n") == "heading"
+    assert boundary("2024-01-31\n") == "entry"
+    assert boundary("Date: Jan 31, 2024\n") == "entry"
+    assert boundary("Wednesday, 31 January 2024\n") == "entry"
+    assert boundary("Just a sentence.\n") is None
+    assert boundary("2024-01-31 " + "was a long day and I wrote a great deal " * 3 + "\n") is None
+
+
+def test_short_document_is_one_chunk():
+    chunks = _chunks("Hello.\n\nWorld.\n")
+    assert len(chunks) == 1
+    assert chunks[0]["text"] == "Hello.\n\nWorld."
+    assert (chunks[0]["start"], chunks[0]["end"]) == (0, 15)
+
+
+def test_splits_on_dated_entries():
+    entry = "Walked the dog. " * 10
+    text = "".join(f"2024-01-0{d}\n{entry}\n\n" for d in range(1, 4))
+    chunks = _chunks(text, max_chars=1000, min_chars=100)
+    assert [c["date"] for c in chunks] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    for chunk in chunks:
+        assert chunk["text"].startswith(chunk["date"])
+        assert text[chunk["start"] : chunk["end"]].strip() == chunk["text"]
+
+
+def test_small_sections_merge_until_min_chars():
+    text = "# A\n\none\n\n# B\n\ntwo\n"
+    chunks = _chunks(text, max_chars=1000, min_chars=500)
+    assert len(chunks) == 1
+    assert chunks[0]["heading"] == "A"
+
+
+def test_paragraphs_and_long_paragraphs_respect_max():
+    para = "This is a sentence. " * 20
+    text = "# Notes\n\n" + "\n\n".join([para] * 3) + "\n\n" + "word " * 300
+    chunks = _chunks(text, max_chars=450, min_chars=50)
+    assert all(len(c["text"]) <= 450 for c in chunks)
+    assert [c["index"] for c in chunks] == list(range(len(chunks)))
+    assert all(c["heading"] == "Notes" for c in chunks)
+    # pieces of an oversized paragraph end on a sentence boundary
+    assert chunks[1]["text"].endswith(".")
+    # offsets are monotonic and cover the document
+    assert chunks[0]["start"] == 0 and chunks[-1]["end"] == len(text)
+    assert all(a["end"] <= b["start"] for a, b in zip(chunks, chunks[1:]))
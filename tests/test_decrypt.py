@@ -1,5 +1,7 @@
 from pathlib import Path
 
+import pytest
+
 from digital_persona.secure_storage import (
     get_fernet,
     encrypt_bytes,
@@ -23,6 +25,23 @@ def test_decrypt_persona(tmp_path: Path):
     assert (out_dir / "processed" / "note.txt").read_bytes() == b"hello"
 
 
+def test_decrypt_persona_memory_shards(tmp_path: Path):
+    from digital_persona.secure_storage import save_json_encrypted
+
+    base = tmp_path / "persona"
+    base.mkdir()
+    fernet = get_fernet(base)
+    for day in ("2024/01/02", "2024/03/04"):
+        (base / "memory" / day).mkdir(parents=True)
+        save_json_encrypted({"content": day}, base / "memory" / day / "m.json", fernet)
+
+    out_dir = tmp_path / "out"
+    decrypt_persona(base, out_dir, since="2024-02-01")
+
+    assert not (out_dir / "memory" / "2024" / "01" / "02" / "m.json").exists()
+    assert "2024/03/04" in (out_dir / "memory" / "2024" / "03" / "04" / "m.json").read_text()
+
+
 def test_decrypt_persona_binary_file(tmp_path: Path):
     base = tmp_path / "persona"
     base.mkdir()
@@ -39,3 +58,112 @@ def test_decrypt_persona_binary_file(tmp_path: Path):
     decrypt_persona(base, out_dir)
 
     assert (out_dir / "processed" / "image.png").read_bytes() == original_bytes
+
+
+def test_decrypt_persona_streamed_file(tmp_path: Path, monkeypatch):
+    import digital_persona.secure_storage as ss
+
+    monkeypatch.setattr(ss, "STREAM_CHUNK_SIZE", 1024)
+    base = tmp_path / "persona"
+    (base / "processed").mkdir(parents=True)
+    fernet = get_fernet(base)
+
+    original = bytes(range(256)) * 20  # spans several chunks
+    src = tmp_path / "video.mp4"
+    src.write_bytes(original)
+    ss.encrypt_file(src, base / "processed" / "video.mp4", fernet)
+    assert ss.is_stream_encrypted(base / "processed" / "video.mp4")
+
+    # an interrupted write is cleaned up, and a stray one is not exported
+    def failing_stream(reader, writer, *args):
+        writer.write(b"half a file")
+        raise OSError("device gone")
+
+    with monkeypatch.context() as m:
+        m.setattr(ss, "encrypt_stream", failing_stream)
+        with pytest.raises(OSError):
+            ss.encrypt_file(src, base / "processed" / "clip.mp4", fernet)
+    assert not list((base / "processed").glob("clip*"))
+    (base / "processed" / "old.mp4.part").write_bytes(b"partial")
+
+    out_dir = tmp_path / "out"
+    decrypt_persona(base, out_dir)
+
+    assert (out_dir / "processed" / "video.mp4").read_bytes() == original
+    assert not (out_dir / "processed" / "old.mp4.part").exists()
+
+
+def _stream_records(data: bytes) -> list:
+    """Return the ``(start, end)`` offsets of each record in a streamed file."""
+    from digital_persona.secure_storage import STREAM_ID_SIZE, STREAM_MAGIC
+
+    pos = len(STREAM_MAGIC) + STREAM_ID_SIZE
+    records = []
+    while pos < len(data):
+        end = pos + 4 + int.from_bytes(data[pos : pos + 4], "big")
+        records.append((pos, end))
+        pos = end
+    return records
+
+
+def test_streamed_file_truncation_detected(tmp_path: Path):
+    import io
+
+    from cryptography.fernet import InvalidToken
+
+    from digital_persona.secure_storage import decrypt_stream, encrypt_stream
+
+    fernet = get_fernet(tmp_path)
+    enc = io.BytesIO()
+    encrypt_stream(io.BytesIO(b"x" * 5000), enc, fernet, chunk_size=1000)
+    data = enc.getvalue()
+
+    out = io.BytesIO()
+    decrypt_stream(io.BytesIO(data), out, fernet)
+    assert out.getvalue() == b"x" * 5000
+
+    # drop the final record: every remaining chunk is valid but the stream is incomplete
+    last_start = _stream_records(data)[-1][0]
+    with pytest.raises(InvalidToken):
+        decrypt_stream(io.BytesIO(data[:last_start]), io.BytesIO(), fernet)
+
+
+def test_streamed_file_splice_and_trailing_data_rejected(tmp_path: Path):
+    import io
+
+    from cryptography.fernet import InvalidToken
+
+    from digital_persona.secure_storage import decrypt_stream, encrypt_stream
+
+    fernet = get_fernet(tmp_path)
+
+    def encrypt(data: bytes) -> bytes:
+        enc = io.BytesIO()
+        encrypt_stream(io.BytesIO(data), enc, fernet, chunk_size=1000)
+        return enc.getvalue()
+
+    def decrypt(data: bytes) -> bytes:
+        out = io.BytesIO()
+        decrypt_stream(io.BytesIO(data), out, fernet)
+        return out.getvalue()
+
+    first, second = encrypt(b"a" * 3000), encrypt(b"b" * 3000)
+    # swap in the second file's chunk at the same index
+    a_start, a_end = _stream_records(first)[1]
+    b_start, b_end = _stream_records(second)[1]
+    spliced = first[:a_start] + second[b_start:b_end] + first[a_end:]
+    with pytest.raises(InvalidToken):
+        decrypt(spliced)
+
+    # a complete second stream appended after the first one's last chunk
+    with pytest.raises(InvalidToken):
+        decrypt(first + second)
+    with pytest.raises(InvalidToken):
+        decrypt(first + b"\0")
+
+    # a record length above a full chunk's token is refused before reading
+    start, _ = _stream_records(first)[0]
+    oversized = first[:start] + (2**32 - 1).to_bytes(4, "big") + first[start + 4 :]
+    with pytest.raises(InvalidToken):
+        decrypt(oversized)
+    assert decrypt(first) == b"a" * 3000
@@ -0,0 +1,60 @@
+import threading
+
+from digital_persona.dedup import DedupIndex
+from digital_persona.secure_storage import get_fernet
+
+
+def test_journal_replayed_and_compacted(tmp_path):
+    fernet = get_fernet(tmp_path)
+    path = tmp_path / "dedup_index.json"
+    index = DedupIndex(path, fernet, compact_after=3)
+    for n in range(3):
+        assert index.link(f"d{n}", f"{n}.jpg", "t") is None
+        index.record(f"d{n}", f"m{n}.json", f"processed/{n}.jpg", f"{n}.jpg", "t")
+    assert not path.exists()
+    assert len(index.journal_path.read_bytes().splitlines()) == 3
+
+    assert DedupIndex(path, fernet).lookup("d1")["memory"] == "m1.json"
+    assert index.link("d1", "copy.jpg", "t2")["memory"] == "m1.json"
+    # the fourth change folds the journal into the snapshot first
+    assert path.exists()
+    assert len(index.journal_path.read_bytes().splitlines()) == 1
+
+    with open(index.journal_path, "ab") as fh:
+        fh.write(b"torn")
+    reopened = DedupIndex(path, fernet)
+    assert len(reopened) == 3
+    assert [a["name"] for a in reopened.lookup("d1")["aliases"]] == ["copy.jpg"]
+
+
+def test_link_waits_for_reserved_digest(tmp_path):
+    index = DedupIndex(tmp_path / "dedup_index.json", get_fernet(tmp_path))
+    assert index.link("d", "a.jpg", "t") is None
+    results = []
+    waiters = [
+        threading.Thread(target=lambda: results.append(index.link("d", "b.jpg", "t")))
+        for _ in range(2)
+    ]
+    for t in waiters:
+        t.start()
+    waiters[0].join(0.1)
+    assert results == []
+
+    index.record("d", "m.json", "processed/a.jpg", "a.jpg", "t")
+    for t in waiters:
+        t.join(1)
+    assert [r["memory"] for r in results] == ["m.json", "m.json"]
+
+
+def test_release_hands_digest_to_next_caller(tmp_path):
+    index = DedupIndex(tmp_path / "dedup_index.json", get_fernet(tmp_path))
+    assert index.link("d", "a.jpg", "t") is None
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(index.link("d", "b.jpg", "t")))
+    waiter.start()
+    index.release("d")
+    waiter.join(1)
+    # the waiter now owns the digest and the next caller waits on it
+    assert results == [None]
+    index.release("d")
+    assert index.link("d", "c.jpg", "t") is None
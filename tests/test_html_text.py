@@ -0,0 +1,73 @@
+import io
+
+from digital_persona.html_text import HTMLTextExtractor, html_to_text, iter_html_text
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Trip &amp; Report</title>
+<style>p { color: red; }</style>
+<script>if (a < b) { document.write("<p>hidden</p>"); }</script></head>
+<body><!-- <p>also hidden</p> -->
+<h1 class="x">My   Weekend
+Hike</h1>
+<p title="a>b">I spent <b>Saturday</b>&nbsp;exploring the hills&#8230; 3 &lt; 4</p>
+<ul><li>boots</li><li>water</li></ul>
+line one<br>line two<br/><br>after break
+<pre>
+  def hike():
+      return "sunset"
+</pre>
+<svg><text>icon</text></svg><noscript>enable js</noscript>
+<p>Done.</p>
+</body></html>
+"""
+
+EXPECTED = """Trip & Report
+
+# My Weekend Hike
+
+I spent Saturday\xa0exploring the hills… 3 < 4
+
+- boots
+- water
+
+line one
+line two
+
+after break
+
+  def hike():
+      return "sunset"
+
+Done."""
+
+
+def test_html_to_text_structure():
+    assert html_to_text(PAGE) == EXPECTED.replace("\xa0", " ")
+
+
+def test_feed_in_small_pieces_matches_whole_page():
+    for size in (1, 2, 7, 64):
+        parser = HTMLTextExtractor()
+        for i in range(0, len(PAGE), size):
+            parser.feed(PAGE[i : i + size])
+        parser.close()
+        assert parser.take().rstrip("\n") == html_to_text(PAGE)
+
+
+def test_iter_html_text_yields_lines():
+    lines = list(iter_html_text(io.StringIO(PAGE), read_size=16))
+    assert all(line.endswith("\n") for line in lines)
+    assert "".join(lines).rstrip("\n") == html_to_text(PAGE)
+
+
+def test_literal_angle_brackets_and_unclosed_tags():
+    assert html_to_text("a < b and c<") == "a < b and c<"
+    assert html_to_text("<p>x</p><script>never closed") == "x"
+
+
+def test_long_comment_and_tag_skipped_while_streaming():
+    filler = "<p>secret</p> " * 5000  # longer than the carry-over limit
+    html = f"<p>x</p><!--{filler}--><p>y</p><div title='{filler}'>z</div>"
+    for size in (1000, 64 * 1024):
+        lines = list(iter_html_text(io.StringIO(html), read_size=size))
+        assert "".join(lines) == "x\n\ny\n\nz\n"
@@ -287,28 +287,50 @@ def test_profile_handles_string_sections():
 
 
 def test_create_llm_selects_provider(monkeypatch):
-    """_create_llm should instantiate the class for the requested provider."""
+    """_create_llm should return a gateway chat model for the requested provider."""
+    from digital_persona.llm_gateway import GatewayChat
 
-    class FakeOpenAI:
-        def __init__(self, model, temperature):
-            self.model = model
-            self.temperature = temperature
+    interviewer = PersonalityInterviewer(llm=None, provider="openai", model="oa")
+    assert isinstance(interviewer.llm, GatewayChat)
+    assert interviewer.llm.provider == "openai"
+    assert interviewer.llm.model == "oa"
+    assert interviewer.llm.temperature == 0
 
-    class FakeOllama:
-        def __init__(self, base_url, model):
-            self.base_url = base_url
-            self.model = model
+    monkeypatch.setenv("OLLAMA_MODEL", "local")
+    interviewer = PersonalityInterviewer(llm=None, provider="ollama")
+    assert interviewer.llm.provider == "ollama"
+    assert interviewer.llm.model == "local"
 
-    monkeypatch.setattr("digital_persona.interview.ChatOpenAI", FakeOpenAI)
-    monkeypatch.setattr("digital_persona.interview.ChatOllama", FakeOllama)
 
-    interviewer = PersonalityInterviewer(llm=None, provider="openai", model="oa")
-    assert isinstance(interviewer.llm, FakeOpenAI)
-    assert interviewer.llm.model == "oa"
+def test_gateway_chat_invoke(monkeypatch):
+    """GatewayChat should send system and user messages through the gateway."""
+    from digital_persona.llm_gateway import GatewayChat, LLMGateway
+
+    calls = {}
+
+    def generate(**kwargs):
+        calls.update(kwargs)
+        return {"response": "hello"}
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(generate=generate))
+    gateway = LLMGateway()
+    chat = GatewayChat("ollama", "m", gateway=gateway)
+
+    class System:
+        type = "system"
+
+        def __init__(self, content):
+            self.content = content
+
+    class Human(System):
+        type = "human"
 
-    interviewer = PersonalityInterviewer(llm=None, provider="ollama", model="ol")
-    assert isinstance(interviewer.llm, FakeOllama)
-    assert interviewer.llm.model == "ol"
+    reply = chat.invoke([System("be brief"), Human("hi")])
+    assert reply.content == "hello"
+    assert calls["model"] == "m"
+    assert calls["system"] == "be brief"
+    assert calls["prompt"] == "hi"
+    gateway.close()
 
 
 def test_conduct_interview_avoids_repeat(monkeypatch):
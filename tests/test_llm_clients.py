@@ -0,0 +1,36 @@
+import pytest
+
+from digital_persona import llm_clients
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    llm_clients.reset_clients()
+    yield
+    llm_clients.reset_clients()
+
+
+def test_ollama_client_reused_for_host(monkeypatch):
+    pytest.importorskip("ollama")
+    monkeypatch.setenv("OLLAMA_HOST", "http://example.test:11434")
+    monkeypatch.setenv("LLM_TIMEOUT", "7")
+
+    client = llm_clients.ollama_client()
+
+    assert llm_clients.ollama_client() is client
+    assert str(client._client.base_url).startswith("http://example.test:11434")
+    assert client._client.timeout.read == 7
+
+    monkeypatch.setenv("OLLAMA_HOST", "http://other.test:11434")
+    assert llm_clients.ollama_client() is not client
+
+
+def test_openai_client_reused(monkeypatch):
+    pytest.importorskip("openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("LLM_TIMEOUT", "9")
+
+    client = llm_clients.openai_client()
+
+    assert llm_clients.openai_client() is client
+    assert client.timeout.read == 9
@@ -0,0 +1,111 @@
+import asyncio
+import sys
+import time
+import types
+
+import pytest
+
+from digital_persona import llm_clients
+from digital_persona.llm_gateway import LLMGateway
+
+
+def _async_ollama(generate):
+    class AsyncClient:
+        def __init__(self, **kwargs):
+            pass
+
+    AsyncClient.generate = staticmethod(generate)
+    return types.SimpleNamespace(AsyncClient=AsyncClient)
+
+
+@pytest.fixture
+def gateway():
+    llm_clients.reset_clients()
+    gw = LLMGateway({"ollama": 50, "openai": 4})
+    yield gw
+    gw.close()
+    llm_clients.reset_clients()
+
+
+def test_many_requests_share_one_loop(monkeypatch, gateway):
+    active = {"now": 0, "max": 0}
+
+    async def generate(model=None, prompt=None, **kwargs):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(0.05)
+        active["now"] -= 1
+        return {"response": f" {prompt} "}
+
+    monkeypatch.setitem(sys.modules, "ollama", _async_ollama(generate))
+
+    async def batch():
+        return await asyncio.gather(
+            *(gateway.generate(f"p{i}", provider="ollama") for i in range(40))
+        )
+
+    results = gateway.run(batch())
+    assert results == [f"p{i}" for i in range(40)]
+    assert active["max"] > 10
+
+
+def test_timeout_returns_default(monkeypatch, gateway):
+    monkeypatch.setenv("LLM_TIMEOUT", "0.05")
+    monkeypatch.setenv("LLM_MAX_ATTEMPTS", "1")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    async def generate(**kwargs):
+        await asyncio.sleep(5)
+
+    monkeypatch.setitem(sys.modules, "ollama", _async_ollama(generate))
+    assert gateway.generate_sync("slow", provider="ollama", default="none") == "none"
+
+
+def test_cancelled_request(monkeypatch, gateway):
+    started = []
+
+    async def generate(**kwargs):
+        started.append(1)
+        await asyncio.sleep(5)
+
+    monkeypatch.setitem(sys.modules, "ollama", _async_ollama(generate))
+    future = gateway.submit(gateway.generate("slow", provider="ollama"))
+    while not started:
+        time.sleep(0.01)
+    future.cancel()
+    assert future.cancelled()
+
+
+def test_parse_error_falls_back_to_openai(monkeypatch, gateway):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+
+    def ollama_generate(**kwargs):
+        return {"response": ""}
+
+    def openai_create(model=None, messages=None):
+        return types.SimpleNamespace(
+            choices=[types.SimpleNamespace(message=types.SimpleNamespace(content="Positive"))]
+        )
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(generate=ollama_generate))
+    monkeypatch.setitem(
+        sys.modules,
+        "openai",
+        types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=openai_create))),
+    )
+
+    result = gateway.generate_sync(
+        "text", provider="ollama", parse=lambda raw: raw.split()[0].lower()
+    )
+    assert result == "positive"
+
+
+def test_strict_raises(monkeypatch, gateway):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    def ollama_generate(**kwargs):
+        raise RuntimeError("down")
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(generate=ollama_generate))
+    with pytest.raises(RuntimeError):
+        gateway.generate_sync("text", provider="ollama", strict=True)
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import pytest
+
+from digital_persona.memory_store import (
+    bounds,
+    iter_memories,
+    iter_shards,
+    memory_path,
+    migrate,
+    relative_name,
+    resolve_memory,
+    shard_dir,
+)
+from digital_persona.secure_storage import get_fernet, load_json_encrypted, save_json_encrypted
+
+
+def _touch(root: Path, day: str, name: str = "m.json") -> Path:
+    path = root.joinpath(*day.split("-")) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("{}", encoding="utf-8")
+    return path
+
+
+def test_shard_dir_uses_utc_date(tmp_path: Path):
+    assert shard_dir(tmp_path, "2024-01-31T23:30:00-02:00") == tmp_path / "2024" / "02" / "01"
+    assert shard_dir(tmp_path, "not a date", "2023-05-06") == tmp_path / "2023" / "05" / "06"
+    path = memory_path(tmp_path, "x.json", "2024-03-04T10:00:00")
+    assert path.parent.is_dir()
+    assert relative_name(tmp_path, path) == "2024/03/04/x.json"
+
+
+def test_iter_shards_prunes_by_range(tmp_path: Path):
+    for day in ("2023-12-31", "2024-01-01", "2024-01-31", "2024-02-01", "2025-01-01"):
+        _touch(tmp_path, day)
+    (tmp_path / "2024" / "13").mkdir()
+    (tmp_path / "staging").mkdir()
+
+    days = [relative_name(tmp_path, p) for p in iter_shards(tmp_path, "2024-01-01", "2024-01-31")]
+    assert days == ["2024/01/01", "2024/01/31"]
+    assert len(list(iter_shards(tmp_path))) == 5
+    assert [relative_name(tmp_path, p) for p in iter_shards(tmp_path, start="2024-02-01")] == [
+        "2024/02/01",
+        "2025/01/01",
+    ]
+
+
+def test_iter_memories_lists_flat_files_first(tmp_path: Path):
+    legacy = tmp_path / "old.json"
+    legacy.write_text("{}", encoding="utf-8")
+    _touch(tmp_path, "2024-01-02")
+    _touch(tmp_path, "2024-05-06")
+    names = [relative_name(tmp_path, p) for p in iter_memories(tmp_path, end="2024-01-02")]
+    assert names == ["old.json", "2024/01/02/m.json"]
+    assert list(iter_memories(tmp_path / "missing")) == []
+
+
+def test_bounds_end_date_is_inclusive():
+    lo, hi = bounds("2024-01-01", "2024-01-31")
+    assert lo.isoformat() == "2024-01-01T00:00:00"
+    assert hi.isoformat() == "2024-01-31T23:59:59.999999"
+    assert bounds(None, "2024-01-31T12:00:00")[1].isoformat() == "2024-01-31T12:00:00"
+
+
+def test_resolve_memory(tmp_path: Path):
+    path = _touch(tmp_path, "2024-01-02", "note.json")
+    assert resolve_memory(tmp_path, "2024/01/02/note.json") == path
+    assert resolve_memory(tmp_path, "note.json") == path
+    assert resolve_memory(tmp_path, "other.json") is None
+    for bad in ("../note.json", "2024/../note.json", "/etc/passwd", ""):
+        with pytest.raises(ValueError):
+            resolve_memory(tmp_path, bad)
+
+
+def test_migrate_moves_flat_files(tmp_path: Path):
+    fernet = get_fernet(tmp_path)
+    root = tmp_path / "memory"
+    root.mkdir()
+    save_json_encrypted({"timestamp": "2022-07-08T09:10:00"}, root / "a.json", fernet)
+    save_json_encrypted({"content": "no timestamp"}, root / "b.json", fernet)
+    (root / "broken.json").write_text("not encrypted", encoding="utf-8")
+
+    assert migrate(root, fernet, dry_run=True) == 2
+    assert (root / "a.json").exists()
+
+    assert migrate(root, fernet) == 2
+    moved = root / "2022" / "07" / "08" / "a.json"
+    assert load_json_encrypted(moved, fernet)["timestamp"] == "2022-07-08T09:10:00"
+    assert not (root / "b.json").exists()
+    # unreadable files stay flat; the rest are ordered by shard date
+    assert [p.name for p in iter_memories(root)] == ["broken.json", "a.json", "b.json"]
@@ -0,0 +1,62 @@
+import json
+import urllib.request
+
+import pytest
+
+from digital_persona.metrics import MetricsRegistry, serve_metrics
+
+
+def test_histogram_prometheus_output():
+    reg = MetricsRegistry()
+    hist = reg.histogram("stage_seconds", "Stage time.", ["stage"], buckets=(0.1, 1))
+    hist.observe(0.05, stage="caption")
+    hist.observe(0.5, stage="caption")
+    hist.observe(5, stage="caption")
+
+    text = reg.render_prometheus()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="caption",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="caption",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="caption",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="caption"} 3' in text
+    assert 'stage_seconds_sum{stage="caption"} 5.55' in text
+
+
+def test_counter_and_gauge_snapshot():
+    reg = MetricsRegistry()
+    files = reg.counter("files_total", "Files.", ["media", "result"])
+    files.inc(media="image", result="success")
+    files.inc(media="image", result="success")
+    reg.gauge("depth", "Queue depth.", ["lane"], lambda: {("video",): 2})
+
+    snap = reg.snapshot()["metrics"]
+    assert snap["files_total"]["samples"] == [
+        {"labels": {"media": "image", "result": "success"}, "value": 2}
+    ]
+    assert snap["depth"]["samples"] == [{"labels": {"lane": "video"}, "value": 2}]
+    assert 'depth{lane="video"} 2' in reg.render_prometheus()
+    json.dumps(snap)
+
+
+def test_labels_checked():
+    reg = MetricsRegistry()
+    counter = reg.counter("c", "C.", ["media"])
+    with pytest.raises(ValueError):
+        counter.inc(kind="x")
+    with pytest.raises(ValueError):
+        reg.counter("c", "again")
+
+
+def test_http_endpoints():
+    reg = MetricsRegistry()
+    reg.counter("files_total", "Files.").inc()
+    server = serve_metrics(reg, 0)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{base}/metrics") as resp:
+            assert "files_total 1" in resp.read().decode()
+        with urllib.request.urlopen(f"{base}/metrics.json") as resp:
+            data = json.loads(resp.read())
+        assert data["metrics"]["files_total"]["samples"][0]["value"] == 1
+    finally:
+        server.shutdown()
@@ -0,0 +1,43 @@
+import threading
+
+from digital_persona.model_registry import ModelRegistry
+
+
+def test_loads_once_across_threads():
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        return object()
+
+    registry = ModelRegistry(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("base"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loads == ["base"]
+    assert len({id(r) for r in results}) == 1
+
+
+def test_evicts_idle_models():
+    registry = ModelRegistry(lambda name: object(), idle_timeout=10)
+    first = registry.get("base")
+
+    assert registry.evict_idle(now=0) == []
+    assert registry.evict_idle(now=float("inf")) == ["base"]
+    assert registry.loaded() == []
+    assert registry.get("base") is not first
+
+
+def test_model_in_use_is_not_evicted():
+    registry = ModelRegistry(lambda name: object(), idle_timeout=10)
+    with registry.use("base") as model:
+        assert registry.evict_idle(now=float("inf")) == []
+        with registry.use("base") as again:
+            assert again is model
+        assert registry.evict_idle(now=float("inf")) == []
+    assert registry.get("base") is model
+    assert registry.evict_idle(now=float("inf")) == ["base"]
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+
+from digital_persona import ratelimit
+from digital_persona.ratelimit import AdaptiveLimiter, is_retryable, retry_after
+
+
+class ThrottleError(Exception):
+    def __init__(self, status=429, headers=None):
+        super().__init__(f"status {status}")
+        self.status_code = status
+        self.response = types.SimpleNamespace(status_code=status, headers=headers or {})
+
+
+def test_retry_after_parsing():
+    assert retry_after(ThrottleError(headers={"retry-after": "3"})) == 3.0
+    assert retry_after(ThrottleError(headers={"retry-after-ms": "250"})) == 0.25
+    later = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+    assert 25 < retry_after(ThrottleError(headers={"retry-after": later})) <= 30
+    assert retry_after(ThrottleError()) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_is_retryable():
+    assert is_retryable(ThrottleError(429))
+    assert is_retryable(ThrottleError(503))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(ThrottleError(400))
+    assert not is_retryable(RuntimeError("boom"))
+
+
+def test_call_retries_and_honours_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(ratelimit.time, "sleep", sleeps.append)
+    limiter = AdaptiveLimiter("openai", 4)
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ThrottleError(headers={"retry-after": "0"})
+        return "ok"
+
+    assert limiter.call(request) == "ok"
+    assert len(attempts) == 3
+    assert sleeps == [0.0, 0.0]
+    assert limiter.stats()["retries"] == 2
+    assert limiter.stats()["throttled"] == 2
+    # halved twice (4 -> 1), then one success adds a slot back
+    assert limiter.limit == 2.0
+
+
+def test_call_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(ratelimit.time, "sleep", lambda s: None)
+    limiter = AdaptiveLimiter("ollama", 2, max_attempts=3)
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        raise ThrottleError(503)
+
+    with pytest.raises(ThrottleError):
+        limiter.call(request)
+    assert len(attempts) == 3
+
+
+def test_non_retryable_error_raised_immediately():
+    limiter = AdaptiveLimiter("ollama", 2)
+    attempts = []
+
+    def request():
+        attempts.append(1)
+        raise RuntimeError("bad request")
+
+    with pytest.raises(RuntimeError):
+        limiter.call(request)
+    assert attempts == [1]
+    assert limiter.limit == 2.0
+
+
+def test_jittered_backoff_bounded(monkeypatch):
+    limiter = AdaptiveLimiter("ollama", 1, backoff_base=1.0, backoff_max=5.0)
+    for attempt in range(1, 8):
+        delay = limiter.backoff(attempt, ThrottleError(503))
+        assert 0 <= delay <= min(5.0, 2 ** (attempt - 1))
+
+
+def test_limit_recovers_after_success():
+    limiter = AdaptiveLimiter("openai", 4)
+    limiter.acquire()
+    limiter.release(error=ThrottleError(429))
+    assert limiter.limit == 2.0
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 4.0
+
+
+def test_slow_responses_shrink_limit():
+    limiter = AdaptiveLimiter("openai", 4, latency_factor=3.0)
+    limiter.acquire()
+    limiter.release(latency=0.1)
+    limiter.acquire()
+    limiter.release(latency=1.0)
+    assert limiter.limit < 4.0
+
+
+def test_token_bucket_spaces_requests():
+    limiter = AdaptiveLimiter("openai", 4, rate=50.0, burst=1)
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.call(lambda: None)
+    assert time.monotonic() - start >= 3 / 50 * 0.9
+
+
+def test_threads_and_coroutines_admitted_in_arrival_order():
+    limiter = AdaptiveLimiter("ollama", 1)
+    limiter.acquire()
+    order = []
+
+    def thread_caller():
+        limiter.acquire()
+        order.append("thread")
+        limiter.release()
+
+    async def coro_caller(tag):
+        await limiter.acquire_async()
+        order.append(tag)
+        limiter.release()
+
+    async def queued(count):
+        while limiter.stats()["waiting"] < count:
+            await asyncio.sleep(0.001)
+
+    async def main():
+        first = asyncio.create_task(coro_caller("first"))
+        await queued(1)
+        thread = threading.Thread(target=thread_caller)
+        thread.start()
+        await queued(2)
+        last = asyncio.create_task(coro_caller("last"))
+        await queued(3)
+        limiter.release()
+        await asyncio.wait_for(asyncio.gather(first, last), 1)
+        thread.join(1)
+
+    asyncio.run(main())
+    assert order == ["first", "thread", "last"]
+    assert limiter.stats()["active"] == 0
+
+
+def test_cancelled_async_waiter_passes_its_slot_on():
+    limiter = AdaptiveLimiter("ollama", 1)
+    limiter.acquire()
+
+    async def main():
+        waiting = asyncio.create_task(limiter.acquire_async())
+        queued = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        # the slot is handed to ``waiting`` before it gets to run
+        limiter.release()
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        await asyncio.wait_for(queued, 1)
+
+    asyncio.run(main())
+    stats = limiter.stats()
+    assert stats["active"] == 1 and stats["waiting"] == 0
@@ -0,0 +1,65 @@
+import threading
+from pathlib import Path
+
+from digital_persona.scheduler import LaneScheduler
+
+
+def _classify(path: Path) -> str:
+    return "video" if path.suffix == ".mp4" else "text"
+
+
+def test_text_not_blocked_by_video(tmp_path):
+    video = tmp_path / "long.mp4"
+    notes = [tmp_path / f"n{i}.txt" for i in range(5)]
+    for p in [video, *notes]:
+        p.write_text("x")
+    release = threading.Event()
+    done = []
+
+    def handler(path):
+        if path == video:
+            assert release.wait(5)
+        done.append(path)
+        return True
+
+    with LaneScheduler(handler, _classify, {"text": 1, "video": 1}) as scheduler:
+        futures = scheduler.submit_all([video, *notes])
+        for f in futures[1:]:
+            assert f.result(timeout=5)
+        assert done == notes
+        release.set()
+        assert futures[0].result(timeout=5)
+
+    stats = scheduler.stats()
+    assert stats["text"]["files"] == 5
+    assert stats["video"]["files"] == 1
+
+
+def test_duplicate_submissions_ignored(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("x")
+    release = threading.Event()
+
+    def handler(p):
+        release.wait(5)
+        return True
+
+    with LaneScheduler(handler, _classify, {"text": 2}) as scheduler:
+        first = scheduler.submit(path)
+        assert scheduler.submit(path) is None
+        assert scheduler.pending() == 1
+        release.set()
+        assert first.result(timeout=5)
+    assert scheduler.pending() == 0
+
+
+def test_handler_errors_count_as_failures(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("x")
+
+    def handler(p):
+        raise RuntimeError("boom")
+
+    with LaneScheduler(handler, _classify, {"text": 1}) as scheduler:
+        assert scheduler.submit(path).result(timeout=5) is False
+    assert scheduler.stats()["text"]["failed"] == 1
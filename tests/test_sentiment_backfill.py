@@ -0,0 +1,50 @@
+import importlib
+import json
+import sys
+import types
+
+from digital_persona.secure_storage import load_json_encrypted, save_json_encrypted
+
+
+def setup(monkeypatch, tmp_path):
+    monkeypatch.setenv("PERSONA_DIR", str(tmp_path))
+    monkeypatch.setenv("CAPTION_PROVIDER", "ollama")
+    import digital_persona.ingest as ingest
+    ingest = importlib.reload(ingest)
+    import digital_persona.sentiment_backfill as backfill
+    return ingest, importlib.reload(backfill)
+
+
+def test_make_batches_respects_budget():
+    from digital_persona.sentiment_backfill import make_batches
+
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 400]
+    assert list(make_batches(texts, max_tokens=20, max_items=10)) == [[0, 1], [2], [3]]
+    assert list(make_batches(texts[:3], max_tokens=100, max_items=2)) == [[0, 1], [2]]
+
+
+def test_backfill_writes_labels(monkeypatch, tmp_path):
+    ingest, backfill = setup(monkeypatch, tmp_path)
+    for i, text in enumerate(["great day", "awful day", "a day"]):
+        save_json_encrypted({"content": text}, ingest.MEMORY_DIR / f"{i}.json", ingest.FERNET)
+    save_json_encrypted(
+        {"content": "done", "sentiment": "neutral"}, ingest.MEMORY_DIR / "3.json", ingest.FERNET
+    )
+    prompts = []
+
+    def fake_generate(model=None, prompt=None, format=None, **kwargs):
+        prompts.append(prompt)
+        if format == "json":
+            # third item deliberately omitted
+            results = [{"id": 1, "sentiment": "positive"}, {"id": 2, "sentiment": "Negative"}]
+            return types.SimpleNamespace(response=json.dumps({"results": results}))
+        return types.SimpleNamespace(response="neutral")
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(generate=fake_generate))
+
+    assert backfill.backfill_sentiment() == 3
+
+    assert len(prompts) == 2
+    assert "1. great day" in prompts[0] and "3. a day" in prompts[0]
+    labels = [load_json_encrypted(ingest.MEMORY_DIR / f"{i}.json", ingest.FERNET)["sentiment"] for i in range(4)]
+    assert labels == ["positive", "negative", "neutral", "neutral"]
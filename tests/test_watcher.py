@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+from digital_persona.watcher import create_watcher
+
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+
+
+def test_reports_file_after_close(tmp_path):
+    watcher = create_watcher(tmp_path)
+    if watcher is None:
+        pytest.skip("inotify unavailable")
+    with watcher:
+        f = open(tmp_path / "note.txt", "w", encoding="utf-8")
+        f.write("partial")
+        f.flush()
+        assert watcher.wait(timeout=0.1) == []
+        f.close()
+        assert watcher.wait(timeout=1) == [tmp_path / "note.txt"]
+
+
+def test_reports_rename_into_folder(tmp_path):
+    inbox = tmp_path / "input"
+    inbox.mkdir()
+    staged = tmp_path / "staged.json"
+    staged.write_text("{}", encoding="utf-8")
+    watcher = create_watcher(inbox)
+    if watcher is None:
+        pytest.skip("inotify unavailable")
+    with watcher:
+        os.replace(staged, inbox / "item.json")
+        assert watcher.wait(timeout=1) == [inbox / "item.json"]